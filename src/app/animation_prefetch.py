@@ -0,0 +1,86 @@
+# animation_prefetch.py
+# Background warming of animation sheets that the state machine is about to need.
+
+import queue
+import sys
+import threading
+
+
+class AnimationPrefetcher:
+    """
+    Decodes animation sources of a LazyAnimationRegistry on a worker thread.
+
+    Only the decode stage (image load, slicing, scaling, atlas pixel conversion) runs
+    in the background; pump() hands finished sheets back to the registry on the main
+    thread, where the display-format conversion happens.
+
+    A request stands until release() drops it: while it stands the source is decoded at most once,
+    so a sheet the registry evicts again (memory budget) is not re-queued on every frame.
+    """
+
+    def __init__(self, registry, lead_time_ms):
+        self.registry = registry
+        self.lead_time_ms = lead_time_ms
+
+        self._jobs = queue.Queue()
+        self._done = queue.Queue()
+        self._in_flight = set()
+        self._standing = set()  # Requested sources whose request has not been released yet
+        self.stats = {"requested": 0, "completed": 0, "failed": 0}
+
+        self._thread = threading.Thread(target=self._worker, name="AnimationPrefetcher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def request(self, *names):
+        """[Main thread] Queues sources for background decoding unless already requested, resident or in flight."""
+        for name in names:
+            if name not in self.registry or name in self._standing:
+                continue
+            self._standing.add(name)
+            if self.registry.is_resident(name) or name in self._in_flight:
+                continue
+            self._in_flight.add(name)
+            self.stats["requested"] += 1
+            self._jobs.put(name)
+
+    def release(self, keep=()):
+        """[Main thread] Ends the standing requests of every source not in keep (they may be requested again)."""
+        self._standing.intersection_update(keep)
+
+    def is_pending(self, name):
+        return name in self._in_flight
+
+    def pump(self):
+        """[Main thread] Installs every sheet the worker has finished decoding."""
+        while True:
+            try:
+                name, decoded = self._done.get_nowait()
+            except queue.Empty:
+                break
+
+            self._in_flight.discard(name)
+            if decoded is None:
+                self.stats["failed"] += 1
+                continue
+
+            self.registry.install(name, decoded)
+            self.stats["completed"] += 1
+
+    def shutdown(self):
+        """Stops the worker thread after the current job."""
+        self._jobs.put(None)
+
+    def _worker(self):
+        while True:
+            name = self._jobs.get()
+            if name is None:
+                break
+
+            try:
+                decoded = self.registry.decode(name, prepare=True)
+            except Exception as e:
+                print(f"ERROR: [Prefetch Thread] Failed to decode '{name}': {e}", file=sys.stderr, flush=True)
+                decoded = None
+
+            self._done.put((name, decoded))
@@ -1,8 +1,10 @@
 # config_manager.py
 
-import json
 import os
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, Optional
+from state_store import JournaledStateStore
 
 # --- 全局常量定义 ---
 # 应用程序名称，用于创建 Windows AppData 目录下的文件夹
@@ -12,6 +14,11 @@ DEFAULT_CONFIG_FILE_NAME = "src/config/pet_config.json"
 # 用户数据文件的名称（用于 get_user_data_path 定位用户可写文件）
 USER_DATA_FILE_NAME = "user_data.json"
 
+# 后台写入的防抖窗口：窗口内的多次修改合并为一次写入
+CONFIG_DEBOUNCE_SECONDS = 1.0
+# 持续修改（例如长时间拖动）时，最多延迟这么久也要落盘一次
+CONFIG_MAX_DELAY_SECONDS = 5.0
+
 PERSISTENT_CONFIG_KEYS = [
     "current_x",
     "current_y",
@@ -20,9 +27,9 @@ PERSISTENT_CONFIG_KEYS = [
     "rest_duration_seconds",
 ]
 
-def get_user_data_path() -> str:
+def get_user_data_dir() -> str:
     """
-    计算并返回 Windows 系统上用户可写配置文件的标准路径 (%APPDATA% 目录)。
+    计算并返回 Windows 系统上用户可写数据目录的标准路径 (%APPDATA%\\DeskFox)。
     """
 
     # 1. 获取 APPDATA 目录路径 (优先 Roaming)
@@ -38,14 +45,21 @@ def get_user_data_path() -> str:
 
     # 3. 确保目录存在 (初次运行时创建)
     os.makedirs(config_dir, exist_ok=True)
+    return config_dir
+
 
-    # 4. 组合用户可写文件的完整路径
-    return os.path.join(config_dir, USER_DATA_FILE_NAME)
+def get_user_data_path() -> str:
+    """
+    计算并返回 Windows 系统上用户可写配置文件的标准路径 (%APPDATA% 目录)。
+    """
+    # 组合用户可写文件的完整路径
+    return os.path.join(get_user_data_dir(), USER_DATA_FILE_NAME)
 
 
 def load_config(default_config: Dict[str, Any]) -> Dict[str, Any]:
     """
-    尝试从用户可写目录加载 user_data.json，并与内置的 default_config 合并。
+    从用户可写目录恢复用户数据（user_data.json 快照 + user_data.journal 日志），
+    并与内置的 default_config 合并。
 
     Args:
         default_config: 默认配置字典，通常是通过 resource_path 读取的 pet_config.json 内容。
@@ -53,58 +67,197 @@ def load_config(default_config: Dict[str, Any]) -> Dict[str, Any]:
     Returns:
         合并后的配置字典。
     """
-    # 获取用户可写文件的路径
-    user_config_path = get_user_data_path()
+    try:
+        loaded_data = get_state_store().load()
+    except Exception as e:
+        # 读取错误，退回到默认配置
+        print(f"WARNING: Could not load user data: {e}")
+        return default_config
 
-    # 如果用户文件不存在，直接返回默认配置
-    if not os.path.exists(user_config_path):
+    # 如果没有任何用户数据，直接返回默认配置
+    if not loaded_data:
         return default_config
 
-    try:
-        with open(user_config_path, 'r', encoding='utf-8') as f:
-            loaded_data = json.load(f)
+    # 核心逻辑：复制默认配置，并用用户数据覆盖
+    config = default_config.copy()
+    config.update(loaded_data)
+    return config
 
-            # 核心逻辑：复制默认配置，并用用户数据覆盖
-            config = default_config.copy()
-            config.update(loaded_data)
-            return config
+def _filter_config(full_config_data: Dict[str, Any], keys_to_save: list) -> Dict[str, Any]:
+    """只保留需要持久化的键值对。"""
+    return {
+        key: full_config_data[key]
+        for key in keys_to_save
+        if key in full_config_data  # 确保键在字典中存在
+    }
 
-    except json.JSONDecodeError:
-        # JSON 解析错误，退回到默认配置
-        return default_config
-    except Exception:
-        # 其他读取错误，退回到默认配置
-        return default_config
 
-def save_config(full_config_data: Dict[str, Any], keys_to_save: list):
+_state_store = None
+
+
+def get_state_store() -> JournaledStateStore:
+    """返回进程内共享的用户数据存储（首次调用时创建，不会自动加载）。"""
+    global _state_store
+    if _state_store is None:
+        _state_store = JournaledStateStore(get_user_data_path())
+    return _state_store
+
+
+class ConfigWriter:
+    """
+    Debounced, coalescing background writer for the user data store.
+
+    mark_dirty() only snapshots the persistent keys and returns; a worker thread writes the
+    latest snapshot once no new change arrived for debounce_seconds (or at the latest
+    max_delay_seconds after the first pending change). Each write appends one journal record
+    holding only the keys whose values changed (see state_store.JournaledStateStore).
+    """
+
+    def __init__(self, store: Optional[JournaledStateStore] = None, debounce_seconds: float = CONFIG_DEBOUNCE_SECONDS,
+                 max_delay_seconds: float = CONFIG_MAX_DELAY_SECONDS):
+        self.store = store or get_state_store()
+        if not self.store.loaded:
+            # The store diffs against the persisted state, so it has to know it first
+            self.store.load()
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # Serialises file writes (worker vs. flush)
+        self._pending = None  # Latest snapshot not yet on disk
+        self._first_dirty = 0.0
+        self._last_dirty = 0.0
+        self._closed = False
+
+        # requests: save requests received (each one was a full file write before)
+        # unchanged: snapshots that matched the stored state, so nothing was written
+        self.stats = {"requests": 0, "writes": 0, "coalesced": 0, "unchanged": 0, "errors": 0}
+
+        self._thread = threading.Thread(target=self._worker, name="ConfigWriter")
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def writes_avoided(self) -> int:
+        return self.stats["requests"] - self.stats["writes"]
+
+    def mark_dirty(self, full_config_data: Dict[str, Any], keys_to_save: list):
+        """Records the current values of keys_to_save for a later, coalesced write."""
+        data = _filter_config(full_config_data, keys_to_save)
+        if not data:
+            return
+        now = time.monotonic()
+        with self._cond:
+            self.stats["requests"] += 1
+            if self._pending is not None:
+                self.stats["coalesced"] += 1
+            else:
+                self._first_dirty = now
+            self._pending = data
+            self._last_dirty = now
+            self._cond.notify()
+
+    def flush(self):
+        """Writes the pending snapshot now, in the calling thread (no-op if nothing is pending)."""
+        self._write_pending()
+
+    def save_now(self, full_config_data: Dict[str, Any], keys_to_save: list):
+        """Immediate save (explicit user actions): supersedes any pending snapshot."""
+        self.mark_dirty(full_config_data, keys_to_save)
+        self.flush()
+
+    def close(self):
+        """Final flush and worker shutdown (called on exit)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self.flush()
+        self._thread.join(timeout=2)
+        with self._write_lock:
+            try:
+                self.store.close()
+            except Exception as e:
+                print(f"Error compacting user data: {e}")
+
+    def _write_pending(self):
+        """
+        Takes the latest pending snapshot and writes it.
+
+        The snapshot is taken only once the write lock is held: whoever writes first (worker or
+        flush) writes the newest snapshot, and the other one finds nothing pending. Taking it
+        before the lock would let an older snapshot be written over a newer, flushed one.
+        """
+        with self._write_lock:
+            with self._cond:
+                data, self._pending = self._pending, None
+            if data is None:
+                return
+            try:
+                if self.store.update(data):
+                    self.stats["writes"] += 1
+                else:
+                    self.stats["unchanged"] += 1
+            except Exception as e:
+                # 文件写入错误
+                self.stats["errors"] += 1
+                print(f"Error saving config: {e}")
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+
+                # Wait until the changes settle (debounce) or the maximum delay is reached
+                while self._pending is not None and not self._closed:
+                    now = time.monotonic()
+                    due = min(self._last_dirty + self.debounce_seconds,
+                              self._first_dirty + self.max_delay_seconds)
+                    if now >= due:
+                        break
+                    self._cond.wait(due - now)
+                if self._closed:
+                    return
+
+            self._write_pending()
+
+
+_config_writer = None
+_config_writer_lock = threading.Lock()
+
+
+def get_config_writer() -> ConfigWriter:
+    """返回进程内共享的 ConfigWriter（首次调用时创建）。"""
+    global _config_writer
+    with _config_writer_lock:
+        if _config_writer is None:
+            _config_writer = ConfigWriter()
+        return _config_writer
+
+
+def save_config(full_config_data: Dict[str, Any], keys_to_save: list, immediate: bool = True):
     """
     Saves a filtered subset of the configuration to the user-writable file.
 
     Args:
         full_config_data: 完整的配置字典 (app_config)。
         keys_to_save: 需要持久化到磁盘的键列表。
+        immediate: True 时立即（原子地）写入；False 时交给后台 ConfigWriter 防抖合并写入，
+                   适用于拖动这类每帧都会触发的保存。
     """
+    writer = get_config_writer()
+    if immediate:
+        writer.save_now(full_config_data, keys_to_save)
+    else:
+        writer.mark_dirty(full_config_data, keys_to_save)
 
-    # 1. 过滤数据：只保留需要保存的键值对
-    data_to_save = {
-        key: full_config_data[key]
-        for key in keys_to_save
-        if key in full_config_data  # 确保键在字典中存在
-    }
-
-    # 如果要保存的数据为空，则无需继续写入文件
-    if not data_to_save:
-        return
-
-    # 2. 获取用户可写文件的路径
-    user_config_path = get_user_data_path()
 
-    try:
-        with open(user_config_path, 'w', encoding='utf-8') as f:
-            # 写入过滤后的数据 (data_to_save)，确保只包含用户状态
-            json.dump(data_to_save, f, indent=4, ensure_ascii=False)
-
-    except Exception as e:
-        # 文件写入错误
-        print(f"Error saving config: {e}")
-        pass
\ No newline at end of file
+def flush_config():
+    """退出前调用：写入尚未落盘的修改并停止后台写入线程。"""
+    if _config_writer is not None:
+        _config_writer.close()
+        stats = _config_writer.stats
+        print(f"DEBUG: Config writes: {stats['writes']} of {stats['requests']} requests "
+              f"({_config_writer.writes_avoided} avoided, {stats['errors']} errors)")
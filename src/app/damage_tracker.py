@@ -0,0 +1,99 @@
+# damage_tracker.py
+# Decides how much of the layered window has to be redrawn and presented each tick.
+
+import weakref
+
+# Render actions returned by DamageTracker.plan()
+RENDER_FULL = "full"        # Redraw and present the whole surface
+RENDER_PARTIAL = "partial"  # Redraw and present only the dirty rectangle
+RENDER_MOVE = "move"        # Content unchanged, only the window position changed
+RENDER_SKIP = "skip"        # Nothing changed, do not touch the window at all
+
+
+class DamageTracker:
+    """
+    Tracks what was last presented to the layered window and turns the next frame into a render action.
+
+    The sprite's damage is its bounding rect (non-transparent pixels) at its draw position;
+    the dirty rectangle of a partial update is the union of the previous and the current damage,
+    so pixels the old frame covered get cleared as well.
+    Any change of draw surface (resize / teleport) or an active full-screen effect forces a full redraw.
+    """
+
+    def __init__(self):
+        self.stats = {RENDER_FULL: 0, RENDER_PARTIAL: 0, RENDER_MOVE: 0, RENDER_SKIP: 0}
+        # Frame -> bounding rect; entries disappear with the frames (e.g. evicted sheets)
+        self._bounds = weakref.WeakKeyDictionary()
+        self.reset()
+
+    def reset(self):
+        """Forgets the presented content; the next plan() returns RENDER_FULL."""
+        self._surface = None
+        self._frame = None
+        self._sprite_rect = None
+        self._window_pos = None
+        self._effect_active = False
+
+    def _frame_bounds(self, frame):
+        """Bounding rect of the frame's visible pixels (computed once per frame Surface)."""
+        bounds = self._bounds.get(frame)
+        if bounds is None:
+            bounds = frame.get_bounding_rect()
+            self._bounds[frame] = bounds
+        return bounds
+
+    def plan(self, surface, frame, frame_pos, window_pos, effect_active=False):
+        """
+        Compares the next frame with the last presented one.
+
+        Args:
+            surface (pygame.Surface): The draw surface that will be presented.
+            frame (pygame.Surface): The sprite frame about to be drawn.
+            frame_pos (tuple): Top-left position of the frame on the draw surface.
+            window_pos (tuple): Screen position of the window.
+            effect_active (bool): Whether a full-screen dynamic effect is drawn this frame.
+
+        Returns:
+            tuple: (action, dirty_rect). dirty_rect is a pygame.Rect for RENDER_PARTIAL, else None.
+        """
+        window_pos = tuple(window_pos)
+        sprite_rect = self._frame_bounds(frame).move(frame_pos)
+
+        if surface is not self._surface or effect_active or self._effect_active:
+            action, dirty_rect = RENDER_FULL, None
+        elif frame is not self._frame or sprite_rect != self._sprite_rect:
+            damaged = [rect for rect in (sprite_rect, self._sprite_rect) if rect.width and rect.height]
+            dirty_rect = damaged[0].unionall(damaged[1:]).clip(surface.get_rect()) if damaged else None
+            if dirty_rect is not None and dirty_rect.width and dirty_rect.height:
+                action = RENDER_PARTIAL
+            else:
+                # Old and new frame are both fully transparent: the content did not change
+                action, dirty_rect = (RENDER_MOVE if window_pos != self._window_pos else RENDER_SKIP), None
+        elif window_pos != self._window_pos:
+            action, dirty_rect = RENDER_MOVE, None
+        else:
+            action, dirty_rect = RENDER_SKIP, None
+
+        self._surface = surface
+        self._frame = frame  # Holding the reference keeps the identity check valid
+        self._sprite_rect = sprite_rect
+        self._window_pos = window_pos
+        self._effect_active = effect_active
+
+        self.stats[action] += 1
+        return action, dirty_rect
+
+    @property
+    def presented(self):
+        """Number of ticks that actually called into the window (full, partial or move)."""
+        return self.stats[RENDER_FULL] + self.stats[RENDER_PARTIAL] + self.stats[RENDER_MOVE]
+
+    @property
+    def skipped(self):
+        return self.stats[RENDER_SKIP]
+
+    def summary(self):
+        total = self.presented + self.skipped
+        skipped_pct = self.skipped / total * 100 if total else 0.0
+        return (f"presented {self.presented} (full {self.stats[RENDER_FULL]}, partial {self.stats[RENDER_PARTIAL]}, "
+                f"move {self.stats[RENDER_MOVE]}), skipped {self.skipped} ({skipped_pct:.1f}%)")
@@ -0,0 +1,81 @@
+# deadline_scheduler.py
+# Central min-heap of named deadlines, replacing per-frame polling of individual timers.
+
+import heapq
+import itertools
+
+
+class DeadlineScheduler:
+    """
+    Named one-shot deadlines kept in a min-heap ordered by due time.
+
+    Each key has at most one live entry. Cancelling or rescheduling marks the old heap entry
+    as dead instead of searching for it (lazy deletion), so every operation is O(log n) and
+    asking "is anything due?" when nothing is due costs a single comparison.
+
+    Times are plain numbers in the caller's unit (DesktopPet uses pygame ticks in ms);
+    the scheduler never reads a clock itself.
+    """
+
+    def __init__(self):
+        self._heap = []  # [due, seq, key, alive]
+        self._entries = {}  # key -> live heap entry
+        self._counter = itertools.count()  # Tie-breaker: equal due times pop in scheduling order
+
+    def schedule(self, key, due):
+        """Schedules key at the absolute time due, replacing any pending deadline for the same key."""
+        self.cancel(key)
+        entry = [due, next(self._counter), key, True]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    # Alias that reads better at call sites that move an existing deadline
+    reschedule = schedule
+
+    def cancel(self, key):
+        """Removes the pending deadline of key. Returns True if there was one."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[3] = False
+        return True
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def due_time(self, key):
+        """Absolute due time of key, or None if it is not scheduled."""
+        entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+    def time_until(self, key, now):
+        """Time from now until key is due (negative once overdue), or None if it is not scheduled."""
+        due = self.due_time(key)
+        return None if due is None else due - now
+
+    def _discard_dead(self):
+        while self._heap and not self._heap[0][3]:
+            heapq.heappop(self._heap)
+
+    def pop_due(self, now):
+        """
+        Removes and returns the keys whose deadline is <= now, earliest first.
+        """
+        due_keys = []
+        self._discard_dead()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, key, _ = heapq.heappop(self._heap)
+            del self._entries[key]
+            due_keys.append(key)
+            self._discard_dead()
+        return due_keys
+
+    def time_until_next(self, now):
+        """Time until the earliest pending deadline (0 if already due), or None if nothing is scheduled."""
+        self._discard_dead()
+        if not self._heap:
+            return None
+        return max(0, self._heap[0][0] - now)
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,66 +1,181 @@
 # effects.py
+import numpy as np
 import pygame
-import random
 
+# Rain look (matches the original per-object Raindrop effect)
+RAIN_COLOR = (200, 200, 255)
+RAIN_ALPHA_RANGE = (150, 200)
+RAIN_LENGTH_RANGE = (20, 50)
+RAIN_SPEED_RANGE = (10, 25)
+DARKNESS = 30
+# Lowest supported effect_scale: below half resolution the upscale costs more than the smaller buffer saves
+MIN_EFFECT_SCALE = 0.5
 
-class Raindrop:
-    """Represents a single particle in a rain effect."""
 
-    def __init__(self, screen_w, screen_h):
+class RainParticles:
+    """
+    Structure-of-arrays rain: every attribute of every drop lives in one NumPy array,
+    so updating and recycling the whole system is a handful of vector operations.
+    """
+
+    def __init__(self, screen_w, screen_h, count, rng=None, scale=1.0):
         self.screen_w = screen_w
         self.screen_h = screen_h
-        self.reset()
-
-    def reset(self):
-        """Resets the raindrop's position and attributes for recycling."""
-        self.x = random.randint(0, self.screen_w)
-        # Start from above the screen
-        self.y = random.randint(-self.screen_h * 2, 0)
-        self.length = random.randint(20, 50)
-        self.speed = random.randint(10, 25)
-        # Ensure alpha for visibility
-        alpha = random.randint(150, 200)
-        self.color = (200, 200, 255, alpha)
+        self.count = count
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # Lengths and speeds are given in full-resolution pixels; scale them to the buffer
+        self.length_range = tuple(max(1, round(v * scale)) for v in RAIN_LENGTH_RANGE)
+        self.speed_range = tuple(max(1, round(v * scale)) for v in RAIN_SPEED_RANGE)
+
+        self.x = np.empty(count, dtype=np.int32)
+        self.y = np.empty(count, dtype=np.int32)
+        self.length = np.empty(count, dtype=np.int32)
+        self.speed = np.empty(count, dtype=np.int32)
+        self.alpha = np.empty(count, dtype=np.uint8)
+        self.reset(np.ones(count, dtype=bool))
+
+    def _randint(self, low, high, n, dtype=np.int32):
+        """Inclusive bounds, like random.randint."""
+        return self.rng.integers(low, high + 1, size=n, dtype=dtype)
+
+    def reset(self, mask):
+        """Recycles the selected drops: new column, start above the screen, new length/speed/alpha."""
+        n = int(np.count_nonzero(mask))
+        if not n:
+            return
+        self.x[mask] = self._randint(0, self.screen_w, n)
+        self.y[mask] = self._randint(-self.screen_h * 2, 0, n)
+        self.length[mask] = self._randint(*self.length_range, n)
+        self.speed[mask] = self._randint(*self.speed_range, n)
+        self.alpha[mask] = self._randint(*RAIN_ALPHA_RANGE, n, dtype=np.uint8)
 
     def update(self):
-        """Moves the raindrop downwards."""
+        """Moves all drops down and recycles the ones that left the screen."""
         self.y += self.speed
-        if self.y > self.screen_h + self.length:
-            # Recycle the raindrop when it moves off-screen
-            self.reset()
-            # Adjust speed and length slightly for variation upon reset
-            self.speed = random.randint(10, 25)
-            self.length = random.randint(20, 50)
+        self.reset(self.y > self.screen_h + self.length)
+
+    def spans(self):
+        """
+        Visible vertical spans of all drops, clipped to the screen.
+
+        Returns:
+            tuple: (x, top, count, alpha) arrays, one entry per drop that has at least one visible pixel,
+                   in drawing order. Each span covers rows top .. top + count - 1 (both line ends inclusive).
+        """
+        top = np.maximum(self.y, 0)
+        bottom = np.minimum(self.y + self.length, self.screen_h - 1)
+        visible = (bottom >= top) & (self.x < self.screen_w)
+        return self.x[visible], top[visible], (bottom - top + 1)[visible], self.alpha[visible]
+
+
+def rasterize_spans(pixels, x, top, count, colors):
+    """
+    Writes vertical 1-pixel spans into a 2D uint32 pixel array (h, w) in one scatter.
+
+    Later spans overwrite earlier ones where they overlap (same result as drawing the
+    lines one after another with pygame.draw.line, which does not blend).
 
-    def draw(self, surface):
-        """Draws the raindrop line onto the given surface."""
-        # Draw line from (x, y) to (x, y + length)
-        # We use int() cast for coordinates as draw functions often require them
-        pygame.draw.line(surface, self.color, (self.x, int(self.y)), (self.x, int(self.y + self.length)), 1)
+    Args:
+        pixels (np.ndarray): Packed pixel view of the target (rows, columns).
+        x, top, count (np.ndarray): Column, first row and length of every span.
+        colors (np.ndarray): Packed uint32 color of every span.
+    """
+    total = int(count.sum())
+    if not total:
+        return
+    starts = np.cumsum(count) - count
+    # Row of every pixel: span top + offset inside the span
+    rows = np.arange(total, dtype=np.int32) - np.repeat(starts - top, count).astype(np.int32)
+    pixels[rows, np.repeat(x, count)] = np.repeat(colors, count)
 
 
 class DynamicEffectController:
-    """Manages a collection of Raindrop objects to create a rain effect."""
+    """
+    Full-screen rain effect built on a vectorized particle system.
 
-    def __init__(self, screen_w, screen_h, count=300):
+    With scale < 1 (down to MIN_EFFECT_SCALE) the rain and the darkening layer are rendered into a
+    reduced-resolution buffer and upscaled onto the target surface in one nearest-neighbour stretch.
+    This trades look (thicker streaks, blocky overlay edge) for speed, so it is opt-in.
+    """
+
+    def __init__(self, screen_w, screen_h, count=300, rng=None, scale=1.0):
         self.screen_w = screen_w
         self.screen_h = screen_h
-        # Initialize the specified number of raindrops
-        self.drops = [Raindrop(screen_w, screen_h) for _ in range(count)]
+        self.scale = scale
+
+        if scale < 1.0:
+            buffer_w, buffer_h = max(1, round(screen_w * scale)), max(1, round(screen_h * scale))
+            self.buffer = pygame.Surface((buffer_w, buffer_h), pygame.SRCALPHA)
+        else:
+            buffer_w, buffer_h = screen_w, screen_h
+            self.buffer = None
+
+        self.particles = RainParticles(buffer_w, buffer_h, count, rng, scale=min(scale, 1.0))
+
+        # Full-resolution darkening layer (the reduced buffer is filled with it directly instead)
+        # (0, 0, 0, a) is identical in straight and premultiplied form
+        self.dark_overlay = None
+        if self.buffer is None:
+            self.dark_overlay = pygame.Surface((screen_w, screen_h), pygame.SRCALPHA)
+            self.dark_overlay.fill((0, 0, 0, DARKNESS))
+
+        # Packed drop color per alpha value, built lazily per (pixel format, premultiplied)
+        self._color_luts = {}
+
+    @property
+    def replaces_target(self):
+        """True when update_and_draw overwrites the whole target (reduced-resolution mode)."""
+        return self.buffer is not None
 
-        self.dark_overlay = pygame.Surface((screen_w, screen_h), pygame.SRCALPHA)
-        darkness = 30
-        self.dark_overlay.fill((0, 0, 0, darkness))
+    def _color_lut(self, surface, premultiplied):
+        key = (surface.get_masks(), premultiplied)
+        lut = self._color_luts.get(key)
+        if lut is None:
+            lut = np.empty(256, dtype=np.uint32)
+            for a in range(256):
+                if premultiplied:
+                    color = tuple((c * a + 127) // 255 for c in RAIN_COLOR) + (a,)
+                else:
+                    color = RAIN_COLOR + (a,)
+                lut[a] = surface.map_rgb(color) & 0xFFFFFFFF  # map_rgb returns a signed int
+            self._color_luts[key] = lut
+        return lut
 
-    def update_and_draw(self, surface):
+    def _draw_streaks(self, surface, premultiplied):
+        """Updates all drops, then rasterizes every streak in one scatter."""
+        self.particles.update()
+        x, top, count, alpha = self.particles.spans()
+        colors = self._color_lut(surface, premultiplied)[alpha]
+
+        pixels = pygame.surfarray.pixels2d(surface).T  # (h, w) view, surface locked while alive
+        rasterize_spans(pixels, x, top, count, colors)
+        del pixels
+
+    def update_and_draw(self, surface, premultiplied=False):
         """
         Updates the position of all drops and draws them onto the surface,
         including a darkening overlay for atmospheric effect.
+
+        Args:
+            surface (pygame.Surface): 32-bit per-pixel-alpha target.
+            premultiplied (bool): The surface holds premultiplied pixels; the overlay is composited
+                with BLEND_PREMULTIPLIED and the streaks are written premultiplied.
+
+        Note:
+            The effect is meant as the bottom layer. At scale < 1 the upscaled buffer replaces
+            the surface contents instead of being blended over them.
         """
+        if self.buffer is not None:
+            # Darkening layer and streaks at reduced resolution, then one nearest-neighbour upscale
+            self.buffer.fill((0, 0, 0, DARKNESS))
+            self._draw_streaks(self.buffer, premultiplied)
+            pygame.transform.scale(self.buffer, surface.get_size(), surface)
+            return
+
         # Blit the darkening layer onto the main surface
-        surface.blit(self.dark_overlay, (0, 0))
+        if premultiplied:
+            surface.blit(self.dark_overlay, (0, 0), special_flags=pygame.BLEND_PREMULTIPLIED)
+        else:
+            surface.blit(self.dark_overlay, (0, 0))
 
-        # Update and draw each individual raindrop
-        for drop in self.drops:
-            drop.update()
-            drop.draw(surface)
\ No newline at end of file
+        self._draw_streaks(surface, premultiplied)
@@ -0,0 +1,298 @@
+# frame_atlas.py
+# Baked frame atlas: pre-scaled, premultiplied BGRA frames stored in one memory-mapped file,
+# so warm starts skip PNG decoding, slicing and smoothscale entirely.
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+from collections.abc import Sequence
+
+import numpy as np
+
+from pixel_ops import premultiply_bgra, unpremultiply_bgra, surface_to_bgra, surface_from_bgra, surface_over_bgra
+from utils import resource_path
+
+ATLAS_FILE_NAME = "frame_atlas.bin"
+ATLAS_MAGIC = b"DFXATLAS"
+ATLAS_VERSION = 1
+
+# Header: magic, format version, cache key (sha256 digest), number of index entries
+_HEADER = struct.Struct("<8sI32sI")
+# Index entry: name (utf-8, NUL padded), frame width, frame height, frame count, data offset
+_ENTRY = struct.Struct("<32sIIIQ")
+# Frame data offsets are aligned so every frame can be viewed as a NumPy array directly
+_DATA_ALIGN = 64
+
+
+def _collect_filepaths(node):
+    """Yields every 'filepath' value found in a (nested) animation config."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "filepath":
+                yield value
+            else:
+                yield from _collect_filepaths(value)
+    elif isinstance(node, (list, tuple)):
+        for item in node:
+            yield from _collect_filepaths(item)
+
+
+def compute_atlas_key(animation_config, target_size):
+    """
+    Computes the cache key of an atlas: a hash of the animation config, the target frame size
+    and the modification time of every source sheet. Any change invalidates the baked atlas.
+    """
+    digest = hashlib.sha256()
+    digest.update(struct.pack("<I", ATLAS_VERSION))
+    digest.update(json.dumps(animation_config, sort_keys=True).encode("utf-8"))
+    digest.update(json.dumps(list(target_size)).encode("utf-8"))
+
+    for filepath in sorted(set(_collect_filepaths(animation_config))):
+        try:
+            mtime = os.stat(resource_path(filepath)).st_mtime_ns
+        except OSError:
+            mtime = -1
+        digest.update(f"{filepath}:{mtime}".encode("utf-8"))
+
+    return digest.digest()
+
+
+def write_atlas(path, key, sheets):
+    """
+    Writes an atlas file atomically (temp file + rename).
+
+    Args:
+        path (str): Destination file.
+        key (bytes): Cache key returned by compute_atlas_key.
+        sheets (dict): Mapping of atlas entry name to premultiplied BGRA arrays of shape (n, h, w, 4).
+    """
+    entries = []
+    offset = _HEADER.size + _ENTRY.size * len(sheets)
+    for name, frames in sheets.items():
+        offset = -(-offset // _DATA_ALIGN) * _DATA_ALIGN
+        count, height, width = frames.shape[:3]
+        entries.append((name, width, height, count, offset, frames))
+        offset += frames.nbytes
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(ATLAS_MAGIC, ATLAS_VERSION, key, len(entries)))
+        for name, width, height, count, data_offset, _ in entries:
+            f.write(_ENTRY.pack(name.encode("utf-8"), width, height, count, data_offset))
+        for _, _, _, _, data_offset, frames in entries:
+            f.write(b"\0" * (data_offset - f.tell()))
+            f.write(np.ascontiguousarray(frames, dtype=np.uint8).tobytes())
+    os.replace(tmp_path, path)
+
+
+class AtlasFrameList(Sequence):
+    """
+    List-like sequence of Surfaces backed by an atlas entry.
+
+    Straight-alpha frames are converted from the memory map the first time they are accessed.
+    Premultiplied frames are zero-copy Surfaces over the memory map itself.
+    """
+
+    def __init__(self, frame_array, premultiplied=False):
+        self._frame_array = frame_array
+        self._surfaces = [None] * len(frame_array)
+        self._prepared = None
+        self.premultiplied = premultiplied
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    @property
+    def nbytes(self):
+        """Pixel memory of the sequence once every frame has been materialised."""
+        return self._frame_array.nbytes
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        surface = self._surfaces[index]
+        if surface is None and self.premultiplied:
+            surface = surface_over_bgra(self._frame_array[index])
+            self._surfaces[index] = surface
+        elif surface is None:
+            if self._prepared is not None and self._prepared[index] is not None:
+                straight = self._prepared[index]
+                self._prepared[index] = None
+            else:
+                straight = unpremultiply_bgra(self._frame_array[index])
+            surface = surface_from_bgra(straight)
+            self._surfaces[index] = surface
+        return surface
+
+    def prepare(self):
+        """
+        Converts every frame's pixels to straight alpha ahead of time (thread-safe),
+        leaving only the cheap Surface creation for the first access on the main thread.
+        """
+        if self.premultiplied:
+            return
+        self._prepared = [unpremultiply_bgra(frame) for frame in self._frame_array]
+
+
+class FrameAtlas:
+    """Read-only view over a baked atlas file. Frame data is served straight from the memory map."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (ValueError, OSError):
+            self._file.close()
+            raise
+
+        magic, version, self.key, count = _HEADER.unpack_from(self._map, 0)
+        if magic != ATLAS_MAGIC or version != ATLAS_VERSION:
+            self.close()
+            raise ValueError(f"Not a frame atlas (or unsupported version): {path}")
+
+        self.entries = {}
+        for i in range(count):
+            raw_name, width, height, frames, offset = _ENTRY.unpack_from(self._map, _HEADER.size + i * _ENTRY.size)
+            self.entries[raw_name.rstrip(b"\0").decode("utf-8")] = (width, height, frames, offset)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def frame_array(self, name):
+        """Returns the premultiplied BGRA frames of an entry as a zero-copy array of shape (n, h, w, 4)."""
+        width, height, count, offset = self.entries[name]
+        return np.frombuffer(self._map, dtype=np.uint8, count=count * height * width * 4,
+                             offset=offset).reshape(count, height, width, 4)
+
+    def load_frames(self, name, premultiplied=False):
+        """
+        Returns the frames of an entry as Pygame Surfaces (no decode or rescale): straight-alpha
+        copies by default, or zero-copy premultiplied views over the map when premultiplied is True.
+        """
+        return AtlasFrameList(self.frame_array(name), premultiplied=premultiplied)
+
+    def close(self):
+        try:
+            self._map.close()
+        except BufferError:
+            # Frames still reference the map; it is released once they are garbage collected.
+            pass
+        self._file.close()
+
+
+class FrameAtlasCache:
+    """
+    First-run atlas cache used by load_frames_from_sheet.
+
+    Lookups are served from a valid atlas; frames decoded the slow way are recorded and
+    baked into a fresh atlas by commit(), so the next launch hits the cache.
+
+    If the atlas cannot be written (read-only or full profile directory), recording stops for the
+    session: nothing more is staged, and callers skip the first-run bake (see recording).
+    A failed write leaves a note with the size it needed, so later launches only bake again
+    once that much disk space is free.
+    """
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self.atlas = None
+        self.recording = True  # False once the atlas turned out not to be writable
+        self._pending = {}
+
+        self._open()
+        if self.atlas is None:
+            self._check_writable()
+
+    def _open(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            atlas = FrameAtlas(self.path)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"WARNING: Ignoring unreadable frame atlas: {e}")
+        else:
+            if atlas.key == self.key:
+                self.atlas = atlas
+            else:
+                atlas.close()
+
+    def _check_writable(self):
+        """Stops recording up front when the atlas directory does not accept the temp file or lacks the space."""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "wb"):
+                pass
+            os.remove(tmp_path)
+            needed = self._failed_write_size()
+            if needed is not None and shutil.disk_usage(os.path.dirname(self.path) or ".").free < needed:
+                raise OSError(f"needs {needed / (1024 * 1024):.0f} MB of free disk space")
+        except OSError as e:
+            print(f"WARNING: Frame atlas is not writable, sheets are decoded on demand: {e}")
+            self.recording = False
+
+    def _failed_write_size(self):
+        """Size (bytes) of the last atlas write that failed, or None."""
+        try:
+            with open(f"{self.path}.failed", encoding="utf-8") as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @property
+    def is_valid(self):
+        """True when an up-to-date atlas is available for lookups."""
+        return self.atlas is not None
+
+    def lookup(self, name, premultiplied=False):
+        """Returns the cached frames for name, or None on a cache miss."""
+        if self.atlas is not None and name in self.atlas:
+            return self.atlas.load_frames(name, premultiplied=premultiplied)
+        return None
+
+    def record(self, name, frames):
+        """Stages freshly decoded straight-alpha frames (Pygame Surfaces) for the next commit()."""
+        if frames and self.recording:
+            self._pending[name] = np.stack([premultiply_bgra(surface_to_bgra(f)) for f in frames])
+
+    def commit(self):
+        """Bakes the staged frames (plus any still-valid cached entries) into the atlas file."""
+        if not self._pending:
+            return
+
+        sheets = {}
+        if self.atlas is not None:
+            for name in self.atlas.entries:
+                sheets[name] = np.array(self.atlas.frame_array(name))
+            self.atlas.close()
+            self.atlas = None
+        sheets.update(self._pending)
+        self._pending = {}
+
+        try:
+            write_atlas(self.path, self.key, sheets)
+        except OSError as e:
+            print(f"WARNING: Failed to write frame atlas, not recording any more sheets this session: {e}")
+            self.recording = False
+            self._remove(f"{self.path}.tmp")
+            try:
+                with open(f"{self.path}.failed", "w", encoding="utf-8") as f:
+                    f.write(str(sum(frames.nbytes for frames in sheets.values())))
+            except OSError:
+                pass
+        else:
+            self._remove(f"{self.path}.failed")
+        # Serve later lookups from the freshly baked file (or the previous one if the write failed)
+        self._open()
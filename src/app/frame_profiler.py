@@ -0,0 +1,179 @@
+# frame_profiler.py
+# Per-stage timing of the main loop: ring buffer, periodic JSONL export and an optional on-sprite overlay.
+
+import json
+import os
+import time
+import numpy as np
+import pygame
+from pixel_ops import premultiply_surface
+
+FRAME_PROFILE_FILE_NAME = "frame_profile.jsonl"
+# Ring buffer size (one minute at 15 FPS)
+PROFILE_FRAMES = 900
+PROFILE_DUMP_SECONDS = 60
+# The JSONL file is rotated to <name>.1 once it grows past this
+PROFILE_MAX_FILE_BYTES = 1024 * 1024
+OVERLAY_REFRESH_SECONDS = 0.5
+
+# Stages of one main-loop iteration, in order:
+# Tk pump, pygame event dispatch, state.handle_input, update, render (effect draw / clear, sprite blit,
+# debug overlay, BGRA conversion into the presenter, UpdateLayeredWindow), frame pacing sleep,
+# worker message handlers (MessageBus.dispatch, at the start of the frame and when a message ends the sleep)
+STAGES = ("tk", "events", "input", "update", "effect", "blit", "overlay", "convert", "present", "sleep",
+          "messages")
+_STAGE_INDEX = {name: i for i, name in enumerate(STAGES)}
+_BUSY = [i for i, name in enumerate(STAGES) if name != "sleep"]
+
+
+class FrameProfiler:
+    """
+    Lap timer for the main loop.
+
+    begin_frame() starts a frame, mark(stage) charges the time since the previous mark to that stage,
+    end_frame() stores the row in a fixed-size ring buffer (NumPy, no per-frame allocations).
+    Every dump_interval seconds the frames since the last dump are aggregated into one JSON line
+    (per-stage mean / p50 / p95 / p99) appended to dump_path.
+    """
+
+    def __init__(self, capacity=PROFILE_FRAMES, dump_path=None, dump_interval=PROFILE_DUMP_SECONDS, enabled=True):
+        self.enabled = enabled
+        self.capacity = capacity
+        self.samples = np.zeros((capacity, len(STAGES)), dtype=np.float64)
+        self.count = 0  # Frames recorded in total
+        self._row = np.zeros(len(STAGES), dtype=np.float64)
+        self._mark = time.perf_counter()
+
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self._last_dump = time.monotonic()
+        self._dumped_count = 0
+
+        self.overlay_visible = False
+        self._overlay = None
+        self._overlay_built_at = 0.0
+        self._font = None
+
+    # --- Timing ---
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self._row[:] = 0.0
+        self._mark = time.perf_counter()
+
+    def mark(self, stage):
+        """Charges the time since the previous mark to stage."""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._row[_STAGE_INDEX[stage]] += (now - self._mark) * 1000
+        self._mark = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.samples[self.count % self.capacity] = self._row
+        self.count += 1
+        if self.dump_path and time.monotonic() - self._last_dump >= self.dump_interval:
+            self.dump()
+
+    # --- Statistics ---
+    def recent(self, frames=None):
+        """The last `frames` rows (all buffered ones by default), oldest first. Shape (n, len(STAGES))."""
+        n = min(self.count, self.capacity if frames is None else min(frames, self.capacity))
+        if n == 0:
+            return self.samples[:0]
+        end = self.count % self.capacity
+        indices = np.arange(end - n, end) % self.capacity
+        return self.samples[indices]
+
+    @staticmethod
+    def stage_stats(rows):
+        """Per-stage and whole-frame (busy = without sleep) mean / p50 / p95 / p99 in ms."""
+        if len(rows) == 0:
+            return {}
+        columns = {name: rows[:, i] for i, name in enumerate(STAGES)}
+        columns["busy"] = rows[:, _BUSY].sum(axis=1)
+        columns["frame"] = rows.sum(axis=1)
+        stats = {}
+        for name, values in columns.items():
+            p50, p95, p99 = np.percentile(values, (50, 95, 99))
+            stats[name] = {"mean_ms": round(float(values.mean()), 4), "p50_ms": round(float(p50), 4),
+                           "p95_ms": round(float(p95), 4), "p99_ms": round(float(p99), 4)}
+        return stats
+
+    def summary(self):
+        rows = self.recent()
+        if len(rows) == 0:
+            return "no frames"
+        stats = self.stage_stats(rows)
+        top = sorted(_BUSY, key=lambda i: -stats[STAGES[i]]["mean_ms"])[:3]
+        top = ", ".join(f"{STAGES[i]} {stats[STAGES[i]]['mean_ms']:.2f}" for i in top)
+        return (f"last {len(rows)} frames: busy mean {stats['busy']['mean_ms']:.2f} ms, "
+                f"p95 {stats['busy']['p95_ms']:.2f} ms; top stages (ms) {top}")
+
+    # --- Export ---
+    def dump(self):
+        """Appends one JSON line summarizing the frames recorded since the last dump."""
+        self._last_dump = time.monotonic()
+        new_frames = self.count - self._dumped_count
+        self._dumped_count = self.count
+        if not self.dump_path or new_frames <= 0:
+            return
+        rows = self.recent(new_frames)
+        record = {
+            "time": round(time.time(), 3),
+            "frames": int(new_frames),
+            "buffered": len(rows),
+            "stages": self.stage_stats(rows),
+        }
+        try:
+            if os.path.exists(self.dump_path) and os.path.getsize(self.dump_path) > PROFILE_MAX_FILE_BYTES:
+                os.replace(self.dump_path, self.dump_path + ".1")
+            with open(self.dump_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        except OSError as e:
+            print(f"WARNING: Could not write frame profile: {e}")
+
+    # --- Overlay ---
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+        self._overlay = None
+        return self.overlay_visible
+
+    def overlay_surface(self, label=""):
+        """
+        The debug overlay (premultiplied, for BLEND_PREMULTIPLIED), rebuilt at most every OVERLAY_REFRESH_SECONDS.
+
+        Returns:
+            tuple: (surface, changed) - changed is True when the surface was rebuilt this call.
+        """
+        now = time.perf_counter()
+        if self._overlay is not None and now - self._overlay_built_at < OVERLAY_REFRESH_SECONDS:
+            return self._overlay, False
+
+        rows = self.recent(60)
+        lines = [label]
+        if len(rows):
+            stats = self.stage_stats(rows)
+            fps = 1000 / stats["frame"]["mean_ms"] if stats["frame"]["mean_ms"] > 0 else 0.0
+            lines.append(f"{fps:.1f} fps  {stats['busy']['p50_ms']:.1f}/{stats['busy']['p95_ms']:.1f} ms")
+            top = sorted(_BUSY, key=lambda i: -stats[STAGES[i]]["mean_ms"])[:4]
+            for a, b in zip(top[::2], top[1::2]):
+                lines.append(f"{STAGES[a]} {stats[STAGES[a]]['mean_ms']:.2f}  {STAGES[b]} {stats[STAGES[b]]['mean_ms']:.2f}")
+
+        if self._font is None:
+            self._font = pygame.font.Font(None, 15)
+        rendered = [self._font.render(line, True, (255, 255, 255)) for line in lines if line]
+        width = max(text.get_width() for text in rendered) + 6
+        height = sum(text.get_height() for text in rendered) + 4
+        overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 170))
+        y = 2
+        for text in rendered:
+            overlay.blit(text, (3, y))
+            y += text.get_height()
+
+        self._overlay = premultiply_surface(overlay)
+        self._overlay_built_at = now
+        return self._overlay, True
@@ -0,0 +1,202 @@
+# frame_scheduler.py
+# Adaptive frame pacing for the main loop: full FPS while something moves, low FPS otherwise.
+
+import time
+import pygame
+
+# Events that mean the user is interacting with the pet; they end the low-FPS mode at once
+ACTIVITY_EVENTS = {
+    pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEWHEEL,
+    pygame.KEYDOWN, pygame.WINDOWENTER, pygame.QUIT,
+}
+
+MODE_ACTIVE = "active"
+MODE_IDLE = "idle"
+
+# Video drivers whose SDL_WaitEventTimeout really blocks on the OS message queue.
+# Others (e.g. "dummy") implement it as a 1 ms polling loop, which costs more CPU than it saves.
+NATIVE_WAIT_DRIVERS = {"windows", "x11", "wayland", "cocoa"}
+# Sleep slice used instead on the other drivers (upper bound of the wake-up latency there)
+POLL_SLICE_MS = 50
+
+
+class FrameScheduler:
+    """
+    Decides how long the main loop sleeps between ticks.
+
+    - Active mode: fixed pacing at active_fps (like clock.tick), so animations keep their speed.
+    - Idle mode: entered after idle_after_frames consecutive ticks in which nothing was presented.
+      The loop then blocks in pygame.event.wait() for up to 1 / idle_fps seconds, but never past
+      the next timer deadline, and wakes immediately on mouse / keyboard events.
+    - Low-power mode (set_low_power, IdleState after a while without input): stays in idle mode although
+      the slowed-down idle loop still presents a frame every 1 / idle_fps; the next input event ends it.
+
+    With a message_bus (MessageBus) attached, a worker message ends the sleep early: an active-mode
+    sleep blocks on the bus and returns with interrupted set (the caller dispatches, then calls wait()
+    again to sleep out the rest of the tick); an idle wait is ended by the bus's wakeup event.
+    Handlers never run inside wait(), so their cost is not hidden in the sleep time.
+
+    CPU time (time.process_time) and wall time are accounted per mode, so the cost of running
+    for an hour in each mode can be read from cpu_seconds_per_hour().
+    """
+
+    def __init__(self, active_fps, idle_fps, idle_after_frames=None):
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.idle_after_frames = idle_after_frames if idle_after_frames is not None else active_fps
+        self.mode = MODE_ACTIVE
+        self.low_power = False
+
+        self.clock = pygame.time.Clock()
+        self._last_tick_ms = pygame.time.get_ticks()
+        self.message_bus = None
+        self.interrupted = False  # The last active-mode wait() returned before the tick was due
+        self._held_frames = 0
+        try:
+            self.native_wait = pygame.display.get_driver() in NATIVE_WAIT_DRIVERS
+        except pygame.error:
+            self.native_wait = False
+
+        self.stats = {"frames": 0, "idle_frames": 0, "event_wakeups": 0, "deadline_wakeups": 0,
+                      "message_wakeups": 0}
+        self._cpu = {MODE_ACTIVE: 0.0, MODE_IDLE: 0.0}
+        self._wall = {MODE_ACTIVE: 0.0, MODE_IDLE: 0.0}
+        self._last_cpu = time.process_time()
+        self._last_wall = time.perf_counter()
+
+    def note_activity(self):
+        """Switches straight back to full FPS (input event, hover, state change...)."""
+        self._held_frames = 0
+        self.low_power = False
+        self.mode = MODE_ACTIVE
+
+    def set_low_power(self, enabled):
+        """Enters (or leaves) low-power mode: idle pacing even for frames that are presented."""
+        self.low_power = enabled
+        if enabled:
+            self.mode = MODE_IDLE
+
+    def note_event(self, event):
+        if event.type in ACTIVITY_EVENTS:
+            self.note_activity()
+
+    def frame_done(self, presented):
+        """
+        Reports whether the tick that just ran changed anything on screen.
+
+        Args:
+            presented (bool): False when the renderer skipped presentation entirely.
+        """
+        self.stats["frames"] += 1
+        if self.mode == MODE_IDLE:
+            self.stats["idle_frames"] += 1
+
+        if self.low_power:
+            self.mode = MODE_IDLE
+        elif presented:
+            self._held_frames = 0
+            self.mode = MODE_ACTIVE
+        else:
+            self._held_frames += 1
+            if self._held_frames >= self.idle_after_frames:
+                self.mode = MODE_IDLE
+
+    def wait(self, ms_until_deadline=None):
+        """
+        Sleeps until the next tick is due.
+
+        Args:
+            ms_until_deadline (float, optional): Time until the soonest pending timer; idle waits never overshoot it.
+
+        Returns:
+            pygame.event.Event or None: The event that ended an idle wait early (the caller must handle it).
+        """
+        self._account()
+        mode = self.mode
+        self.interrupted = False
+
+        if mode == MODE_ACTIVE:
+            # Fixed pacing: events queue up and are handled on the next tick (worker messages end the sleep)
+            event = None
+            if self.message_bus is not None and self._sleep_on_message_bus():
+                self.interrupted = True
+                self.stats["message_wakeups"] += 1
+                self._account(mode)
+                return event
+            self.clock.tick(self.active_fps)
+            self._last_tick_ms = pygame.time.get_ticks()
+        else:
+            timeout_ms = 1000 / self.idle_fps
+            if ms_until_deadline is not None:
+                timeout_ms = min(timeout_ms, max(0, ms_until_deadline))
+
+            event = self._wait_for_event(max(1, int(timeout_ms)))
+            # Restart the clock's reference point so the next active tick is not shortened
+            self.clock.tick()
+            self._last_tick_ms = pygame.time.get_ticks()
+            if event.type == pygame.NOEVENT:
+                self.stats["deadline_wakeups"] += 1
+                event = None
+            else:
+                self.stats["event_wakeups"] += 1
+                self.note_event(event)
+
+        self._account(mode)
+        return event
+
+    def _sleep_on_message_bus(self):
+        """Sleeps until (almost) the next active tick; returns True early if a worker message is queued."""
+        remaining_ms = 1000 / self.active_fps - (pygame.time.get_ticks() - self._last_tick_ms)
+        # clock.tick sleeps the last millisecond
+        return remaining_ms > 1 and self.message_bus.wait((remaining_ms - 1) / 1000)
+
+    def _wait_for_event(self, timeout_ms):
+        """Blocks until an event arrives or timeout_ms passes (returns a NOEVENT event then)."""
+        if self.native_wait:
+            # timeout_ms is at least 1: a timeout of 0 would block forever in pygame.event.wait
+            return pygame.event.wait(timeout_ms)
+
+        end = pygame.time.get_ticks() + timeout_ms
+        while True:
+            event = pygame.event.poll()
+            remaining = end - pygame.time.get_ticks()
+            if event.type != pygame.NOEVENT or remaining <= 0:
+                return event
+            if self.message_bus is not None:
+                # Ends the slice as soon as a worker message (and its wakeup event) is queued
+                self.message_bus.wait(min(POLL_SLICE_MS, remaining) / 1000)
+            else:
+                pygame.time.wait(min(POLL_SLICE_MS, remaining))
+
+    def _account(self, mode=None):
+        """Adds the CPU / wall time since the last call to the given (or the current) mode."""
+        cpu, wall = time.process_time(), time.perf_counter()
+        mode = mode or self.mode
+        self._cpu[mode] += cpu - self._last_cpu
+        self._wall[mode] += wall - self._last_wall
+        self._last_cpu, self._last_wall = cpu, wall
+
+    def cpu_seconds_per_hour(self, mode=None):
+        """
+        Measured CPU seconds consumed per hour of wall time, for one mode or overall.
+        Returns None before anything was measured.
+        """
+        modes = (mode,) if mode else (MODE_ACTIVE, MODE_IDLE)
+        cpu = sum(self._cpu[m] for m in modes)
+        wall = sum(self._wall[m] for m in modes)
+        if wall <= 0:
+            return None
+        return cpu / wall * 3600
+
+    def summary(self):
+        parts = []
+        for mode in (MODE_ACTIVE, MODE_IDLE):
+            per_hour = self.cpu_seconds_per_hour(mode)
+            per_hour = f"{per_hour:.0f} CPU-s/h" if per_hour is not None else "n/a"
+            parts.append(f"{mode} {self._wall[mode]:.0f}s wall ({per_hour})")
+        overall = self.cpu_seconds_per_hour()
+        overall = f"{overall:.0f} CPU-s/h" if overall is not None else "n/a"
+        return (f"{', '.join(parts)}, overall {overall}; frames {self.stats['frames']} "
+                f"(idle {self.stats['idle_frames']}), wakeups by event {self.stats['event_wakeups']}, "
+                f"by deadline {self.stats['deadline_wakeups']}, sleeps ended by messages "
+                f"{self.stats['message_wakeups']}")
@@ -0,0 +1,178 @@
+# io_service.py
+# Bounded worker pool for blocking network I/O (story fetches, prefetches, uploads).
+
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+
+IO_WORKERS = 2
+
+
+class CancelToken:
+    """Cooperative cancellation flag shared by a task, its worker and its result callbacks."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+class IOTask:
+    """Handle of a submitted job: a concurrent.futures.Future plus its CancelToken."""
+
+    def __init__(self, key, fn, args):
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+        self.token = CancelToken()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self):
+        """Result of a finished task (None if it failed or was cancelled)."""
+        if not self.future.done() or self.future.cancelled() or self.future.exception() is not None:
+            return None
+        return self.future.result()
+
+    def cancel(self):
+        """Drops the task: it will not start if still queued, and its result is never delivered."""
+        self.token.cancel()
+        self.future.cancel()
+
+    def add_done_callback(self, callback):
+        """
+        Calls callback(result) once the task finishes (immediately if it already has), on the worker thread.
+        Not called if the task was cancelled in the meantime; a failed task delivers None.
+        """
+        def deliver(future):
+            if self.token.cancelled or future.cancelled():
+                return
+            callback(self.result())
+
+        self.future.add_done_callback(deliver)
+
+
+class IOService:
+    """
+    Runs blocking I/O jobs on a fixed number of daemon worker threads (at most max_workers in flight).
+
+    - submit(key, fn, *args) deduplicates: while a job with the same key is queued or running,
+      the existing task is returned instead of starting a second request.
+    - Every task carries a CancelToken; cancelled tasks are skipped and their results dropped.
+    - shutdown() cancels everything still pending and never waits for a hanging request:
+      the workers are daemon threads, so the process can exit while a socket is still blocked.
+    """
+
+    def __init__(self, max_workers=IO_WORKERS, name="IOService"):
+        self.max_workers = max(1, int(max_workers))
+        self._jobs = queue.Queue()
+        self._tasks = {}  # key -> live (queued / running) task
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"submitted": 0, "deduplicated": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+        self._threads = []
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f"{name}-{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, key, fn, *args) -> IOTask:
+        """Queues fn(*args) under key, or returns the live task that already has this key."""
+        with self._lock:
+            existing = self._tasks.get(key)
+            if existing is not None and not existing.token.cancelled:
+                self.stats["deduplicated"] += 1
+                return existing
+
+            task = IOTask(key, fn, args)
+            if self._closed:
+                task.cancel()
+                self.stats["cancelled"] += 1
+                return task
+
+            self._tasks[key] = task
+            self.stats["submitted"] += 1
+        self._jobs.put(task)
+        return task
+
+    def cancel(self, key):
+        """Cancels the live task with this key. Returns True if there was one."""
+        with self._lock:
+            task = self._tasks.pop(key, None)
+        if task is None:
+            return False
+        task.cancel()
+        return True
+
+    def pending(self):
+        with self._lock:
+            return len(self._tasks)
+
+    def shutdown(self, timeout=None):
+        """
+        Cancels all queued and running tasks and stops the workers.
+
+        Args:
+            timeout (float, optional): Seconds to wait for the workers to exit; by default does not wait.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            tasks = list(self._tasks.values())
+            self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        for _ in self._threads:
+            self._jobs.put(None)
+        if timeout is not None:
+            for thread in self._threads:
+                thread.join(timeout)
+
+    def _finish(self, task):
+        with self._lock:
+            if self._tasks.get(task.key) is task:
+                del self._tasks[task.key]
+
+    def _worker(self):
+        while True:
+            task = self._jobs.get()
+            if task is None:
+                break
+
+            if task.token.cancelled or not task.future.set_running_or_notify_cancel():
+                self._finish(task)
+                with self._lock:
+                    self.stats["cancelled"] += 1
+                continue
+
+            try:
+                result = task.fn(*task.args)
+            except Exception as e:
+                print(f"ERROR: [IO Thread] Task {task.key!r} failed: {e}", file=sys.stderr, flush=True)
+                self._finish(task)
+                with self._lock:
+                    self.stats["failed"] += 1
+                task.future.set_exception(e)
+                continue
+
+            # Remove from the dedupe table before callbacks run, so they may resubmit the same key
+            self._finish(task)
+            with self._lock:
+                self.stats["completed"] += 1
+            task.future.set_result(result)
+
+    def summary(self):
+        s = self.stats
+        return (f"{s['submitted']} tasks on {self.max_workers} workers, {s['deduplicated']} deduplicated, "
+                f"{s['completed']} completed, {s['failed']} failed, {s['cancelled']} cancelled")
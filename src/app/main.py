@@ -4,6 +4,7 @@ import customtkinter as ctk
 import tkinter as tk
 from config_manager import DEFAULT_CONFIG_FILE_NAME, PERSISTENT_CONFIG_KEYS, load_config
 from utils import resource_path
+from animation_config import ANIMATION_CONFIG
 from pet_desktop import DesktopPet
 import sys
 import json
@@ -22,107 +23,6 @@ except AttributeError:
 WIDTH, HEIGHT = 150, 150  # Default window size for the idle state
 FPS = 15  # Target frame rate
 
-# Animation resource configuration dictionary
-ANIMATION_CONFIG = {
-    "idle": {
-        "filepath": "assets/idle.png",
-        "frame_w": 350,
-        "frame_h": 350,
-        "total_frames": 120,
-        "ranges": {"idle": (0, 119)}
-    },
-    "dragging": [
-        {
-            "prefix": "drag_A",
-            "filepath": "assets/dragging_1.png",
-            "frame_w": 350,
-            "frame_h": 350,
-            "total_frames": 120,
-            "ranges": {
-                "start": (0, 12),  # Animation for picking up
-                "hold": (12, 119),  # Loop animation while holding
-                "release": (0, 12)  # Animation for releasing (will be played in reverse)
-            }
-        },
-        {
-            "prefix": "drag_B",
-            "filepath": "assets/dragging_2.png",
-            "frame_w": 350,
-            "frame_h": 350,
-            "total_frames": 120,
-            "ranges": {
-                "start": (0, 24),  # Animation for picking up
-                "hold": (24, 119),  # Loop animation while holding
-                "release": (0, 24)  # Animation for releasing (will be played in reverse)
-            }
-        }
-    ],
-    "display": {
-        "filepath": "assets/display.png",
-        "frame_w": 350,
-        "frame_h": 350,
-        "total_frames": 120,
-        "ranges": {"display": (0, 119)}
-    },
-    "teleport": {
-        "filepath": "assets/teleport.png",
-        "frame_w": 350,
-        "frame_h": 350,
-        "total_frames": 120,
-        "ranges": {"teleport": (0, 119)}
-    },
-    "magic": {
-        "filepath": "assets/magic.png",
-        "frame_w": 350,
-        "frame_h": 350,
-        "total_frames": 120,
-        "ranges": {
-            "magic_start": (0, 103),
-            "magic_keep": (103, 119),
-        }
-    },
-    "fishing": {
-        "filepath": "assets/fishing.png",
-        "frame_w": 350,
-        "frame_h": 350,
-        "total_frames": 120,
-        "ranges": {"fishing": (0, 119)}
-    },
-    "result": {
-        "filepath": "assets/result.jpg",
-        "frame_w": 150,
-        "frame_h": 150
-    },
-    "bye": {
-        "filepath": "assets/bye.png",
-        "frame_w": 350,
-        "frame_h": 350,
-        "total_frames": 120,
-        "ranges": {"bye": (0, 80)}
-    },
-    "angry": {
-        "filepath": "assets/angry.png",
-        "frame_w": 350,
-        "frame_h": 350,
-        "total_frames": 120,
-        "ranges": {"angry": (0, 119)}
-    },
-    "upset": {
-        "filepath": "assets/upset.png",
-        "frame_w": 350,
-        "frame_h": 350,
-        "total_frames": 120,
-        "ranges": {"upset": (0, 119)}
-    },
-    "butterfly": {
-        "filepath": "assets/butterfly.png",
-        "frame_w": 350,
-        "frame_h": 350,
-        "total_frames": 120,
-        "ranges": {"butterfly": (0, 112)}
-    }
-}
-
 try:
     default_path = resource_path(DEFAULT_CONFIG_FILE_NAME)
     with open(default_path, 'r', encoding='utf-8') as f:
@@ -136,7 +36,21 @@ except Exception:
         "fishing_cooldown_minutes": 10,
         "fishing_success_rate": 0.6489,
         "upset_interval_minutes": 7,
-        "angry_possibility": 0.54
+        "angry_possibility": 0.54,
+        "animation_memory_budget_mb": 96,
+        "prefetch_lead_seconds": 10,
+        "effect_scale": 1.0,
+        "idle_fps": 2,
+        "idle_low_power_seconds": 0,
+        "http_pool_size": 4,
+        "http_max_retries": 2,
+        "http_backoff_factor": 0.5,
+        "story_cache_ttl_hours": 24,
+        "io_workers": 2,
+        "profiler_enabled": True,
+        "profiler_dump_seconds": 60,
+        "tk_budget_ms": 4,
+        "tk_idle_pump_ms": 250
     }
 
 # Default configuration used if the config file does not exist
@@ -174,9 +88,8 @@ if __name__ == "__main__":
         pet.persistent_keys = PERSISTENT_CONFIG_KEYS
 
         # 3. Store tk_root in the pet instance for use by SettingsWindow and States
-        pet.tk_root = tk_root
-        # 启动轮询（主线程调用）
-        pet._start_queue_poller()
+        #    (Tk events and the worker queue are then handled by the pet's main loop)
+        pet.attach_tk_root(tk_root)
 
         # 4. Start the main application loop
         pet.run()
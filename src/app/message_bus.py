@@ -0,0 +1,179 @@
+# message_bus.py
+# Worker threads -> main loop messages, with a pygame wakeup event so results are handled in the frame they arrive.
+
+import queue
+import threading
+import time
+from collections import namedtuple
+import pygame
+
+# Posted (at most one outstanding) when a message is queued; carries the sequence number of that message.
+# An idle FrameScheduler.wait() blocks in pygame.event.wait(), so this ends the wait at once.
+WAKEUP_EVENT = pygame.event.custom_type()
+
+# Upper bounds (ms) of the queue latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# --- Messages ---
+# Result of StoryManager.fetch_story_async: payload is the story dict, or an error message / None on failure
+StoryResult = namedtuple("StoryResult", ["is_successful", "payload", "story_id"])
+
+
+class LatencyHistogram:
+    """Counts of queue latencies (post -> handler) per LATENCY_BUCKETS_MS bucket."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, latency_ms):
+        index = 0
+        while index < len(LATENCY_BUCKETS_MS) and latency_ms > LATENCY_BUCKETS_MS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += 1
+        self.sum_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-quantile (max_ms for the open-ended bucket)."""
+        if not self.total:
+            return None
+        rank = p * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def as_dict(self):
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.total,
+            "mean_ms": round(self.sum_ms / self.total, 3) if self.total else None,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+    def summary(self):
+        if not self.total:
+            return "no messages"
+        buckets = ", ".join(f"{label} {count}" for label, count in self.as_dict()["buckets"].items())
+        return (f"{self.total} messages, mean {self.sum_ms / self.total:.1f} ms, p99 <= {self.percentile(0.99):.0f} ms, "
+                f"max {self.max_ms:.1f} ms [{buckets}]")
+
+
+class MessageBus:
+    """
+    Thread-safe queue from worker threads to the main loop, with typed handlers.
+
+    - post(message) may be called from any thread. The message is stamped with a sequence number and its
+      post time; if no wakeup is outstanding, a WAKEUP_EVENT carrying that sequence number is posted to
+      pygame's event queue (SDL_PushEvent is thread-safe), which wakes an idle main loop.
+    - dispatch() runs on the main thread: it calls the handler registered for each queued message's type
+      and records the queue latency per type. Wakeup events whose sequence number was already dispatched
+      (the message was handled at the start of the frame) are counted as stale and ignored.
+    - The main loop can also block on the bus itself (wait(), a threading.Event acting as a self-pipe):
+      FrameScheduler sleeps on it between ticks and returns as soon as a message is queued; the loop
+      then dispatches it (a profiled stage of its own) before sleeping out the rest of the tick.
+    - Without pygame (scripts driving StoryManager directly) messages are taken with get() instead.
+    """
+
+    def __init__(self, wakeup=True):
+        self.wakeup = wakeup
+        self.event_type = WAKEUP_EVENT
+        self._queue = queue.Queue()
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._wake_pending = False
+        self._signal = threading.Event()  # Set while undispatched messages are queued
+        self._dispatched_seq = 0
+        self.latency = {}  # message type name -> LatencyHistogram
+        self.stats = {"posted": 0, "dispatched": 0, "wakeups": 0, "stale_wakeups": 0, "unhandled": 0}
+
+    def subscribe(self, message_type, handler):
+        """Registers handler(message) for messages of message_type (main thread)."""
+        self._handlers[message_type] = handler
+
+    def post(self, message):
+        """[Any thread] Queues message for the main loop and wakes it up."""
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            self._queue.put((seq, time.perf_counter(), message))
+            self._signal.set()
+            self.stats["posted"] += 1
+            send_wakeup = self.wakeup and not self._wake_pending
+            if send_wakeup:
+                self._wake_pending = True
+        if send_wakeup:
+            try:
+                pygame.event.post(pygame.event.Event(self.event_type, seq=seq))
+                self.stats["wakeups"] += 1
+            except pygame.error:
+                # pygame not initialized (no main loop): the message is picked up with get() / dispatch()
+                with self._lock:
+                    self._wake_pending = False
+
+    def get(self, block=True, timeout=None):
+        """Takes the next message without handlers (raises queue.Empty like Queue.get)."""
+        return self._queue.get(block, timeout)[2]
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def wait(self, timeout):
+        """[Main thread] Blocks up to timeout seconds for a message; returns True if one is queued."""
+        return self._signal.wait(timeout)
+
+    def dispatch(self, wakeup_seq=None):
+        """
+        [Main thread] Handles every message queued so far.
+
+        Args:
+            wakeup_seq (int, optional): Sequence number of the WAKEUP_EVENT that triggered this call.
+
+        Returns:
+            int: Number of messages handled.
+        """
+        if wakeup_seq is not None and wakeup_seq <= self._dispatched_seq:
+            self.stats["stale_wakeups"] += 1
+            return 0
+        with self._lock:
+            # Later posts send a new wakeup; everything queued up to here is drained below
+            self._wake_pending = False
+            self._signal.clear()
+            count = self._queue.qsize()
+
+        handled = 0
+        for _ in range(count):
+            try:
+                seq, posted_at, message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._dispatched_seq = max(self._dispatched_seq, seq)
+            name = type(message).__name__
+            histogram = self.latency.get(name)
+            if histogram is None:
+                histogram = self.latency[name] = LatencyHistogram()
+            histogram.add((time.perf_counter() - posted_at) * 1000)
+
+            handler = self._handlers.get(type(message))
+            if handler is None:
+                self.stats["unhandled"] += 1
+                print(f"WARNING: No handler for message: {message}", flush=True)
+                continue
+            handler(message)
+            handled += 1
+        self.stats["dispatched"] += handled
+        return handled
+
+    def summary(self):
+        latency = "; ".join(f"{name}: {histogram.summary()}" for name, histogram in sorted(self.latency.items()))
+        return (f"posted {self.stats['posted']}, dispatched {self.stats['dispatched']}, "
+                f"wakeups {self.stats['wakeups']} ({self.stats['stale_wakeups']} stale); "
+                f"queue latency {latency or 'n/a'}")
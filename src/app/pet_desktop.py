@@ -1,20 +1,30 @@
 # pet_desktop.py
 
+import os
+import random
+import numpy as np
 import pygame
 import sys
-import win32con
-import win32gui
-import queue
 import time
 from typing import Union, Dict
 # Import created modules
-import window_manager as wm
-from pet_states import IdleState, TeleportState, MagicState, FishingState, UpsetState, ButterflyState
-from settings_gui import SettingsWindow
-from sprite_animation import load_animation, load_dragging_animations, AnimationController
-from effects import DynamicEffectController
+from pet_states import IdleState, TeleportState, MagicState, FishingState, UpsetState, ButterflyState, DraggingState, \
+    RANDOM_STORY_IDS
+from sprite_animation import load_all_animations, AnimationController, LazyAnimationRegistry
+from animation_prefetch import AnimationPrefetcher
+from frame_atlas import FrameAtlasCache, compute_atlas_key, ATLAS_FILE_NAME
+from config_manager import get_user_data_dir, get_config_writer, flush_config
+from effects import DynamicEffectController, MIN_EFFECT_SCALE
+from damage_tracker import DamageTracker, RENDER_SKIP, RENDER_MOVE, RENDER_PARTIAL
+from frame_scheduler import FrameScheduler
+from deadline_scheduler import DeadlineScheduler
 from story_manager import StoryManager
-from story_display import show_story_prompt
+from story_cache import StoryCache, STORY_CACHE_DIR_NAME
+from io_service import IOService
+from platform_backend import Win32Backend, is_profiler_hotkey
+from frame_profiler import FrameProfiler, FRAME_PROFILE_FILE_NAME
+from tk_pump import TkPump
+from message_bus import MessageBus, StoryResult
 
 
 class DesktopPet:
@@ -22,8 +32,15 @@ class DesktopPet:
 
     # Constant: Easing rate for smooth window following
     FOLLOW_EASING_RATE = 0.2  # Value between 0 and 1. Smaller value means smoother/delayed following.
+    # Constant: How long the cursor must rest on the head before the butterfly appears (ms)
+    HOVER_DELAY_MS = 1989.0604
 
-    def __init__(self, width, height, fps, animation_config, initial_config):
+    def __init__(self, width, height, fps, animation_config, initial_config, backend=None):
+        """
+        Args:
+            backend (optional): Platform backend (platform_backend.HeadlessBackend for profiling / tests);
+                by default the Win32 layered window is used.
+        """
         pygame.init()
 
         # --- Configuration Initialization ---
@@ -39,13 +56,17 @@ class DesktopPet:
         self.fox_story_possibility = self.config.get('fox_story_possibility', 0.5)
         self.max_fox_story_num = self.config.get("max_fox_story_num", 7)
         self.last_read_index = self.config.get("last_read_index", 0)
-
-        # Timer start point (in milliseconds since Pygame init)
-        self.rest_timer_start_time = pygame.time.get_ticks()
-        self.fishing_timer_start_time = pygame.time.get_ticks()
-        self.upset_timer_start_time = pygame.time.get_ticks()
-        self.angry_counter = 0
-        self.havering_start_time = pygame.time.get_ticks()
+        self.animation_memory_budget_mb = self.config.get("animation_memory_budget_mb", 96)
+        self.prefetch_lead_ms = self.config.get("prefetch_lead_seconds", 10) * 1000
+        # Resolution of the full-screen rain layer relative to the screen (1 = native, down to 0.5 = half:
+        # faster on large screens, but the streaks get thicker)
+        self.effect_scale = self.config.get("effect_scale", 1.0)
+        self.idle_fps = self.config.get("idle_fps", 2)
+        # IdleState plays its loop at idle_fps after this long without input (0 = never, the default:
+        # the slowed-down loop is visible, so it is an opt-in power saving)
+        self.idle_low_power_ms = self.config.get("idle_low_power_seconds", 0) * 1000
+        self.tk_budget_ms = self.config.get("tk_budget_ms", 4)
+        self.tk_idle_pump_ms = self.config.get("tk_idle_pump_ms", 250)
 
         # --- Size and Performance ---
         self.width = width
@@ -57,25 +78,51 @@ class DesktopPet:
         self.head_hover_height = 49
         self.fps = fps
         self.running = True
-        self.clock = pygame.time.Clock()
+        # Adaptive frame pacing (replaces a fixed clock.tick(fps))
+        self.scheduler = FrameScheduler(self.fps, self.idle_fps)
+        # Per-stage frame timing (ring buffer + periodic JSONL summary in the user data directory)
+        self.profiler = FrameProfiler(
+            dump_path=os.path.join(get_user_data_dir(), FRAME_PROFILE_FILE_NAME),
+            dump_interval=self.config.get("profiler_dump_seconds", 60),
+            enabled=self.config.get("profiler_enabled", True),
+        )
 
         # --- Web Service and Story Management ---
         self.web_service_url = self.config.get("web_service_url", "https://deskfox.deno.dev")
         self.pathname = self.config.get("pathname", "/stories")
-        self.story_manager = StoryManager(self, self.web_service_url, self.pathname)
+        # On-disk story cache: repeated IDs are served locally, stale ones revalidated via ETag, offline fallback
+        self.story_cache = StoryCache(
+            os.path.join(get_user_data_dir(), STORY_CACHE_DIR_NAME),
+            ttl_seconds=self.config.get("story_cache_ttl_hours", 24) * 3600,
+        )
+        # Bounded worker pool for story fetches / prefetches (results go back through the message bus)
+        self.io = IOService(max_workers=self.config.get("io_workers", 2), name="StoryIO")
+        self.story_manager = StoryManager(
+            self, self.web_service_url, self.pathname,
+            pool_size=self.config.get("http_pool_size", 4),
+            max_retries=self.config.get("http_max_retries", 2),
+            backoff_factor=self.config.get("http_backoff_factor", 0.5),
+            cache=self.story_cache,
+            io_service=self.io,
+        )
+        # Warm the cache with every story fishing can return (fox arc + random pool) in one batch request
+        self.story_manager.prefetch_many(list(range(1, self.max_fox_story_num + 1)) + list(RANDOM_STORY_IDS))
+        # End-of-fishing-animation -> prompt latency (the story is prefetched during the animation)
+        self.fishing_finished_at = None
+        self.fishing_prompt_latencies = []
 
         # --- Window Setup ---
         pygame.display.set_mode((self.width, self.height), pygame.NOFRAME)
-        self.hwnd = pygame.display.get_wm_info()["window"]
+        # Platform backend: presenter, window moves, cursor and clock all go through it
+        self.backend = backend if backend is not None else Win32Backend(pygame.display.get_wm_info()["window"])
+        self.hwnd = self.backend.hwnd
+        if self.backend.seed is not None:
+            # Deterministic run: state machine choices follow the backend's seed
+            random.seed(self.backend.seed)
 
         # Calculate initial position (screen center)
         # Get screen resolution
-        screen_modes = pygame.display.get_desktop_sizes()
-        if screen_modes and screen_modes[0] != -1:
-            self.full_screen_width, self.full_screen_height = screen_modes[0]
-        else:
-            self.full_screen_width = pygame.display.Info().current_w
-            self.full_screen_height = pygame.display.Info().current_h
+        self.full_screen_width, self.full_screen_height = self.backend.screen_size()
         start_x = self.config.get("current_x", (self.full_screen_width - self.width) // 2)
         start_y = self.config.get("current_y", (self.full_screen_height - self.height) // 2)
 
@@ -83,19 +130,42 @@ class DesktopPet:
         self.current_window_pos = [start_x, start_y]
         self.position_before_display = [start_x, start_y]  # Position to return to after large mode
 
+        self.presenter = self.backend.presenter
+        self.presenter.profiler = self.profiler
+        # Damage tracking: skip or shrink presentation when little or nothing changed
+        self.damage = DamageTracker()
+
         # Configure layered window style
         try:
-            wm.setup_layered_window(self.hwnd, self.width, self.height, start_x, start_y)
+            self.backend.setup_window(self.width, self.height, start_x, start_y)
             time.sleep(0.1)
         except Exception as e:
             # Handle window configuration failure, often harmless in initial Pygame setup
             pass
 
+        # Timers (deadlines in milliseconds on the backend clock), kept in one min-heap.
+        # A timer that fired stays in expired_timers until it is reset, because it only
+        # triggers its state once the pet is back in IdleState.
+        self.timers = DeadlineScheduler()
+        self.expired_timers = set()
+        start_time = self.now_ms()
+        self.timers.schedule('rest', start_time + self.rest_interval_ms)
+        self.timers.schedule('fishing', start_time + self.fishing_cooldown_ms)
+        self.timers.schedule('upset', start_time + self.upset_interval_ms)
+        self.angry_counter = 0
+
+
         # --- Animation Loading ---
-        self.all_animations = {}
+        # Frames are stored premultiplied so rendering needs no per-frame alpha math
+        self.premultiplied_frames = True
+        self.all_animations = LazyAnimationRegistry(
+            memory_budget_bytes=int(self.animation_memory_budget_mb * 1024 * 1024),
+            pinned=('idle',)
+        )
         self.animation_ranges = {}
         self._load_animations()
         self.animator = AnimationController(self.all_animations, self.animation_ranges)
+        self.prefetcher = AnimationPrefetcher(self.all_animations, self.prefetch_lead_ms)
 
         # --- Runtime State and Resources ---
         self.drag_start_pos = None  # Mouse screen position at drag start
@@ -108,106 +178,111 @@ class DesktopPet:
         self.change_state(IdleState(self))
         self.settings_window = None
         self.dynamic_effect = None
-        self.tk_root = None  # Tkinter root will be set by main.py
-        # 队列初始化
-        self._tk_queue = queue.Queue()
-        # 用于存储 after() 返回的 ID，以便取消重复的轮询
-        self._poller_id = None
+        self.tk_root = None  # Tkinter root will be set by main.py (attach_tk_root)
+        self.tk_pump = None
+        # 工作线程 -> 主循环的消息（到达时唤醒主循环，同一帧内处理）
+        self.bus = MessageBus()
+        self.bus.subscribe(StoryResult, self._on_story_result)
+        # Messages arriving while the loop sleeps end the sleep, so they are handled right away
+        self.scheduler.message_bus = self.bus
         self.if_first_havering = True
 
     def _load_animations(self):
-        """加载所有动画"""
-        # Load Idle animation
-        load_animation(self, 'idle')
-        # Load Display animation
-        load_animation(self, 'display', no_scaling=True)
-        # Load Teleport animation
-        load_animation(self, 'teleport')
-        # Load Magic animation (for full screen effect)
-        load_animation(self, 'magic', no_scaling=True, is_magic_type=True)
-        # Load Fishing animation
-        load_animation(self, 'fishing')
-        # Load Bye animation
-        load_animation(self, 'bye')
-        # Load Upset animation
-        load_animation(self, 'upset')
-        # Load Angry animation
-        load_animation(self, 'angry')
-        # Load Butterfly animation
-        load_animation(self, 'butterfly')
-        # Load all Dragging options
-        load_dragging_animations(self)
-
-    # --- Queue Poller Methods ---
-    def _start_queue_poller(self):
-        """
-        [主執行緒調用] 啟動週期性輪詢隊列的機制。
-        必須在 self.tk_root 被賦值且 GUI 啟動後調用一次。
-        """
-        if self._poller_id:
-            try:
-                self.tk_root.after_cancel(self._poller_id)
-            except Exception:
-                pass
-
-        # 每 100ms 檢查一次隊列
-        self._poller_id = self.tk_root.after(100, self._process_queue)
-        print("DEBUG: Queue poller started.", flush=True)
+        """注册所有动画（帧按需加载，优先使用烘焙好的帧图集）"""
+        self.frame_atlas = FrameAtlasCache(
+            os.path.join(get_user_data_dir(), ATLAS_FILE_NAME),
+            compute_atlas_key(self.animation_config, (self.width, self.height))
+        )
+        load_all_animations(self)
+
+        if not self.frame_atlas.is_valid and self.frame_atlas.recording:
+            # First run (or assets changed): decode every sheet once and bake the atlas,
+            # then drop everything but the pinned sources; later loads hit the atlas.
+            # Without a writable atlas the sheets are simply decoded on demand.
+            for name in list(self.all_animations.keys()):
+                self.all_animations[name]
+            self.frame_atlas.commit()
+            self.all_animations.evict_unpinned()
+
+        # Idle is pinned and needed immediately
+        self.all_animations['idle']
+
+    # --- Tk and Message Methods ---
+    def attach_tk_root(self, tk_root):
+        """
+        [主執行緒調用] 設置 Tk 根窗口；Tk 事件由主循環通過 TkPump 處理（不再每幀 update()）。
+        """
+        self.tk_root = tk_root
+        self.tk_pump = TkPump(
+            tk_root,
+            budget_ms=self.tk_budget_ms,
+            idle_interval_ms=self.tk_idle_pump_ms,
+            window_interval_ms=1000 / self.fps,
+        )
+        print("DEBUG: Tk pump attached.", flush=True)
 
-    def _process_queue(self):
+    def _on_story_result(self, message: StoryResult):
         """
-        主线程处理事件队列
+        [主线程，MessageBus.dispatch 调用] 故事获取结果
         """
-        # 每轮最多处理 5 个事件
-        MAX_ITEMS_PER_TICK = 5
-
-        processed = 0
-        while processed < MAX_ITEMS_PER_TICK:
-            try:
-                item = self._tk_queue.get_nowait()
-            except queue.Empty:
-                break
-
-            processed += 1
-            print(f"DEBUG: Queue item: {item}", flush=True)
-
-            # 处理钓鱼结果
-            if isinstance(item, tuple) and item[0] == "story_result":
-                _, is_successful, payload, story_id = item
-                self.handle_fishing_result(
-                    is_successful=is_successful,
-                    story_data_or_error=payload,
-                    story_id=story_id
-                )
-            else:
-                print(f"WARNING: Unknown item in queue: {item}", flush=True)
-
-        # GUI 永远不会被阻塞
-        if self.tk_root and self.tk_root.winfo_exists():
-            self._poller_id = self.tk_root.after(250, self._process_queue)
-        else:
-            print("WARNING: Tk root destroyed, stopping poller", flush=True)
+        print(f"DEBUG: Story result: {message}", flush=True)
+        self.handle_fishing_result(
+            is_successful=message.is_successful,
+            story_data_or_error=message.payload,
+            story_id=message.story_id
+        )
 
     def handle_fishing_result(self, is_successful, story_data_or_error: Union[Dict, str], story_id=None):
         """
         [在主线程中被调用] 处理异步钓鱼结果。如果成功，则调用 GUI 函数展示故事。
         """
+        self._record_fishing_latency()
         if is_successful and story_data_or_error and story_id:
             self.update_fox_story_index()
-            show_story_prompt(self.tk_root, story_data_or_error, story_id, self)
+            self._show_story_prompt(story_data_or_error, story_id, self)
 
         else:
             fail_message = story_data_or_error if story_data_or_error else "网络君罢工了T-T\n漂流瓶自己跑走了..."
-            show_story_prompt(self.tk_root, fail_message)
-
+            self._show_story_prompt(fail_message)
+
+    def _show_story_prompt(self, content, story_id=None, pet_instance=None):
+        """Shows the story / failure prompt (Tk); without a Tk root (headless) the result is only logged."""
+        if self.tk_root is None:
+            print(f"DEBUG: No Tk root, story prompt skipped (story {story_id})")
+            return
+        from story_display import show_story_prompt
+        show_story_prompt(self.tk_root, content, story_id, pet_instance)
+
+
+    def _record_fishing_latency(self):
+        """Records the time from the end of the fishing animation to the prompt."""
+        if self.fishing_finished_at is None:
+            return
+        latency_ms = (time.perf_counter() - self.fishing_finished_at) * 1000
+        self.fishing_finished_at = None
+        self.fishing_prompt_latencies.append(latency_ms)
+        print(f"DEBUG: Fishing result ready {latency_ms:.1f} ms after the animation ended")
+
+    def fishing_latency_summary(self):
+        latencies = sorted(self.fishing_prompt_latencies)
+        if not latencies:
+            return "no fishes"
+        return (f"{len(latencies)} fishes, median {latencies[len(latencies) // 2]:.1f} ms, "
+                f"max {latencies[-1]:.1f} ms")
 
     def start_dynamic_effect(self):
         """Initializes and starts the dynamic effect controller (e.g., rain)."""
         # The effect controller uses the CURRENT window size (which should be full screen)
+        scale = self.effect_scale
+        if not MIN_EFFECT_SCALE <= scale <= 1:
+            print(f"WARNING: Invalid effect_scale {scale}, rendering the effect at native resolution.")
+            scale = 1.0
         self.dynamic_effect = DynamicEffectController(
             self.width,
             self.height,
-            count=600  # Default count increased for better visibility
+            count=600,  # Default count increased for better visibility
+            rng=np.random.default_rng(self.backend.seed),  # Seeded on the headless backend, OS entropy otherwise
+            scale=scale  # Effect layer is upscaled on composition; the sprite stays native
         )
 
     def stop_dynamic_effect(self):
@@ -218,16 +293,23 @@ class DesktopPet:
         """
         Handles state updates, animation advancement, and eye rest timer checks.
         """
+        # Install any sheets the prefetch worker has finished decoding
+        self.prefetcher.pump()
+
         # Update the current state logic (animation, position, transitions)
         self.state.update()
 
+        # Collect the deadlines that passed since the last frame
+        current_time = self.now_ms()
+        self.expired_timers.update(self.timers.pop_due(current_time))
+
         # 只有在 IdleState 或 ButterflyState 之間切換
         is_hovering = self.is_mouse_over_head()
 
         if is_hovering and isinstance(self.state, IdleState):
-            # Only update havering_start_time when havering for the first time
+            # Only start the hover timer when havering for the first time
             if self.if_first_havering:
-                self.havering_start_time = pygame.time.get_ticks()
+                self.timers.schedule('hover', current_time + self.HOVER_DELAY_MS)
                 self.if_first_havering = False
 
             if self._is_hovering_ready():
@@ -238,58 +320,129 @@ class DesktopPet:
             # 鼠標移走，從 Butterfly 退出回到 Idle 狀態
             self.change_state(IdleState(self))
             self.if_first_havering = True
-
-        # Check the reminder timers
-        self._check_rest_timer()
-        self._check_fishing_timer()
-        self._check_upset_timer()
+            self._clear_timer('hover')
+
+        # Trigger the reminder timers that expired (no-op while none has)
+        if self.expired_timers:
+            self._check_rest_timer()
+            self._check_fishing_timer()
+            self._check_upset_timer()
+
+        # Warm the sheets of whatever is likely to play next
+        self._schedule_prefetch(is_hovering)
+
+    def _schedule_prefetch(self, is_hovering):
+        """
+        Requests background decoding of the sheets for states that are about to start:
+        timer-driven states within the prefetch lead time of their deadline (only in IdleState,
+        the one state they can start from), the butterfly while hovering the head, and the
+        dragging sheets while the cursor is over the sprite.
+        Sheets no longer wanted are released, so each is decoded once per stretch of wanting it.
+        """
+        current_time = self.now_ms()
+        lead = self.prefetch_lead_ms
+        wanted = []
+
+        if self.state.__class__ is IdleState:
+            if self._time_until_timer('rest', current_time) <= lead:
+                wanted += ['teleport', 'magic']
+            if self._time_until_timer('fishing', current_time) <= lead:
+                wanted.append('fishing')
+            if self._time_until_timer('upset', current_time) <= lead:
+                wanted.append('upset')
+
+        if is_hovering:
+            wanted.append('butterfly')
+
+        if isinstance(self.state, DraggingState):
+            # The release may turn into an angry fox
+            wanted.append('angry')
+        elif isinstance(self.state, (IdleState, UpsetState, ButterflyState)) and self.is_mouse_over_sprite():
+            wanted += [f"{prefix}_frames" for prefix in self.available_drag_prefixes]
+
+        self.prefetcher.release(keep=wanted)
+        self.prefetcher.request(*wanted)
+
+    def now_ms(self):
+        """Milliseconds on the backend clock (pygame.time.get_ticks, or virtual time when headless)."""
+        return self.backend.get_ticks()
+
+    def _time_until_timer(self, name, current_time):
+        """Milliseconds until the named timer fires (0 once expired, infinity if not running)."""
+        if name in self.expired_timers:
+            return 0
+        remaining = self.timers.time_until(name, current_time)
+        return float('inf') if remaining is None else remaining
+
+    def _rearm_timer(self, name, interval_ms):
+        """Restarts the named timer so it fires interval_ms from now."""
+        self.expired_timers.discard(name)
+        self.timers.reschedule(name, self.now_ms() + interval_ms)
+
+    def _clear_timer(self, name):
+        """Stops the named timer, whether pending or expired."""
+        self.expired_timers.discard(name)
+        self.timers.cancel(name)
 
     def _is_hovering_ready(self):
         """
         Checks if the hover timer has expired.
         """
-        current_time = pygame.time.get_ticks()
-        elapsed_time = current_time - self.havering_start_time
+        return 'hover' in self.expired_timers
 
-        if elapsed_time >= 1989.0604:
-            return True
-        return False
+    def _ms_until_next_deadline(self):
+        """
+        Time until the soonest pending timer (rest, fishing, upset, hover delay).
+        The frame scheduler never sleeps past it.
+        Expired timers are not pending: they only fire once the state allows it,
+        and that state change is drawn at full FPS anyway.
 
-    def _check_rest_timer(self):
+        Returns:
+            int or None: Milliseconds until the next deadline, or None if none is pending.
+        """
+        return self.timers.time_until_next(self.now_ms())
+
+    def _ms_until_next_wakeup(self):
         """
-        Checks if the rest interval has been reached and triggers the Teleport State if conditions are met.
+        How long an idle wait may last: until the next timer deadline, but never past the next Tk pump
+        (Tk windows stay responsive while the pet is idle; worker results wake the loop on their own).
+
+        Returns:
+            float or None: Milliseconds, or None if nothing is pending.
         """
-        current_time = pygame.time.get_ticks()
-        elapsed_time = current_time - self.rest_timer_start_time
+        wait_ms = self._ms_until_next_deadline()
+        if self.tk_pump is not None:
+            tk_ms = self.tk_pump.ms_until_next_pump()
+            wait_ms = tk_ms if wait_ms is None else min(wait_ms, tk_ms)
+        return wait_ms
 
+    def _check_rest_timer(self):
+        """
+        Triggers the Teleport State once the rest interval has expired and conditions are met.
+        """
         # Conditions for triggering rest:
         # 1. Pet must be in the IdleState (avoiding interruption during interaction)
-        # 2. Elapsed time must be greater than or equal to the interval
-        if (self.state.__class__ is IdleState) and (elapsed_time >= self.rest_interval_ms):
+        # 2. The rest deadline must have passed
+        if (self.state.__class__ is IdleState) and ('rest' in self.expired_timers):
             # Trigger state change: Enter Teleport state
             self.change_state(TeleportState(self))
 
     def _check_fishing_timer(self):
         """
-        Checks if the fishing interval has been reached and triggers the Fishing State if conditions are met.
+        Triggers the Fishing State once the fishing cooldown has expired and conditions are met.
         """
-        current_time = pygame.time.get_ticks()
-        elapsed_time = current_time - self.fishing_timer_start_time
-
-        # Conditions for triggering rest:
+        # Conditions for triggering fishing:
         # 1. Pet must be in the IdleState (avoiding interruption during interaction)
-        # 2. Elapsed time must be greater than or equal to the interval
-        if isinstance(self.state, IdleState) and (elapsed_time >= self.fishing_cooldown_ms):
+        # 2. The fishing deadline must have passed
+        if isinstance(self.state, IdleState) and ('fishing' in self.expired_timers):
             # Trigger state change: Enter Fishing state
             self.change_state(FishingState(self))
 
     def _check_upset_timer(self):
         """
-        Checks if the upset has been reached and triggers the Upset State if conditions are met.
+        Triggers the Upset State once the upset interval has expired and conditions are met.
         """
-        current_time = pygame.time.get_ticks()
-        elapsed_time = current_time - self.upset_timer_start_time
-        if (self.state.__class__ is IdleState) and (elapsed_time >= self.upset_interval_ms):
+        if (self.state.__class__ is IdleState) and ('upset' in self.expired_timers):
             self.change_state(UpsetState(self))
 
     def smooth_move_to_target(self, target_x, target_y):
@@ -313,9 +466,8 @@ class DesktopPet:
             new_x = int(current_x + move_x)
             new_y = int(current_y + move_y)
 
-        # Update the Win32 window position
-        wm.set_window_position(
-            self.hwnd,
+        # Update the window position
+        self.backend.set_window_position(
             new_x,
             new_y,
             self.width,
@@ -372,12 +524,10 @@ class DesktopPet:
             self.height = target_h
 
             # Reconfigure layered window
-            wm.setup_layered_window(self.hwnd, target_w, target_h, self.current_window_pos[0],
-                                    self.current_window_pos[1])
+            self.backend.setup_window(target_w, target_h, self.current_window_pos[0], self.current_window_pos[1])
 
             # Force top-most status
-            win32gui.SetWindowPos(self.hwnd, win32con.HWND_TOPMOST, 0, 0, 0, 0,
-                                  win32con.SWP_NOMOVE | win32con.SWP_NOSIZE)
+            self.backend.set_topmost(True)
 
         else:
             # Exit Display Mode: Restore original size and position
@@ -394,11 +544,10 @@ class DesktopPet:
             target_x = self.position_before_display[0]
             target_y = self.position_before_display[1]
 
-            wm.setup_layered_window(self.hwnd, target_w, target_h, target_x, target_y)
+            self.backend.setup_window(target_w, target_h, target_x, target_y)
 
             # Remove top-most status
-            win32gui.SetWindowPos(self.hwnd, win32con.HWND_NOTOPMOST, 0, 0, 0, 0,
-                                  win32con.SWP_NOMOVE | win32con.SWP_NOSIZE)
+            self.backend.set_topmost(False)
 
             # Update internal position
             self.current_window_pos[0] = target_x
@@ -427,9 +576,8 @@ class DesktopPet:
         self.width = target_w
         self.height = target_h
 
-        # 5. Force Win32 window resize and reposition (Teleport)
-        wm.set_window_position(
-            self.hwnd,
+        # 5. Force window resize and reposition (Teleport)
+        self.backend.set_window_position(
             target_x,
             target_y,
             target_w,
@@ -437,11 +585,10 @@ class DesktopPet:
         )
 
         # 6. Reconfigure layered window
-        wm.setup_layered_window(self.hwnd, target_w, target_h, target_x, target_y)
+        self.backend.setup_window(target_w, target_h, target_x, target_y)
 
         # 7. Force top-most status
-        win32gui.SetWindowPos(self.hwnd, win32con.HWND_TOPMOST, 0, 0, 0, 0,
-                              win32con.SWP_NOMOVE | win32con.SWP_NOSIZE)
+        self.backend.set_topmost(True)
 
         # 8. Update internal position
         self.current_window_pos[0] = target_x
@@ -452,21 +599,21 @@ class DesktopPet:
         Resets the eye rest timer, starting the interval countdown from the current time.
         Called after the rest state exits.
         """
-        self.rest_timer_start_time = pygame.time.get_ticks()
+        self._rearm_timer('rest', self.rest_interval_ms)
 
     def reset_fishing_cooldown(self):
         """
         Resets the fishing timer, starting the interval countdown from the current time.
         Called after the fishing state exits.
         """
-        self.fishing_timer_start_time = pygame.time.get_ticks()
+        self._rearm_timer('fishing', self.fishing_cooldown_ms)
 
     def reset_upset_timer(self):
         """
         Resets the upset timer, starting the interval countdown from the current time.
         Called after the upset state exits.
         """
-        self.upset_timer_start_time = pygame.time.get_ticks()
+        self._rearm_timer('upset', self.upset_interval_ms)
 
     def update_fox_story_index(self):
         """
@@ -478,7 +625,8 @@ class DesktopPet:
         else:
             self.last_read_index += 1
 
-        self.tk_root.config["last_read_index"] = self.last_read_index
+        # self.config is the same dict as tk_root.config (see main.py)
+        self.config["last_read_index"] = self.last_read_index
 
     def update_rest_config(self, interval_ms, duration_ms):
         """
@@ -492,14 +640,15 @@ class DesktopPet:
         self.rest_interval_ms = interval_ms
         self.rest_duration_ms = duration_ms
 
-        # Immediately reset the timer to start calculating the new interval
-        self.rest_timer_start_time = pygame.time.get_ticks()
+        # Immediately reschedule the timer to start calculating the new interval
+        self._rearm_timer('rest', self.rest_interval_ms)
 
     def open_settings(self):
         """Opens or activates the settings window."""
         # Avoid creating duplicate windows
         if not hasattr(self,
                        'settings_window') or self.settings_window is None or not self.settings_window.winfo_exists():
+            from settings_gui import SettingsWindow
             # Pass the Tk root and the pet instance
             self.settings_window = SettingsWindow(self.tk_root, self)
 
@@ -524,10 +673,10 @@ class DesktopPet:
         if self.width != self.original_width or self.height != self.original_height:
             return False
         # 1. 检查鼠标是否在窗口内（获得焦点）
-        if not pygame.mouse.get_focused():
+        if not self.backend.mouse_focused():
             return False
         # 2. 获取当前鼠标位置
-        mouse_x, mouse_y = pygame.mouse.get_pos()
+        mouse_x, mouse_y = self.backend.mouse_pos()
         # 3. 检查鼠标是否在窗口内
         is_in_window = 0 <= mouse_x < self.width and 0 <= mouse_y < self.height
         # 4. 如果不在窗口内，返回 False
@@ -538,6 +687,15 @@ class DesktopPet:
 
         return is_in_head
 
+    def is_mouse_over_sprite(self):
+        """Checks whether the cursor currently hovers a non-transparent part of the sprite."""
+        if self.width != self.original_width or self.height != self.original_height:
+            return False
+        if not self.backend.mouse_focused():
+            return False
+        mouse_x, mouse_y = self.backend.mouse_pos()
+        return self.is_click_on_sprite(mouse_x, mouse_y)
+
     def is_click_on_sprite(self, mouse_x, mouse_y):
         """Checks if the mouse click is on a non-transparent area of the pet sprite."""
         current_frame = self.animator.get_current_frame()
@@ -554,10 +712,18 @@ class DesktopPet:
         return False
 
     def render(self):
-        """Renders the current frame and dynamic effects to the layered window."""
+        """
+        Renders the current frame and dynamic effects to the layered window.
+        draw_surface holds premultiplied BGRA: sprite frames are stored premultiplied and
+        composited with BLEND_PREMULTIPLIED, and the dynamic effect writes premultiplied pixels.
 
-        # 1. Clear Surface with transparent color
-        self.draw_surface.fill((0, 0, 0, 0))
+        The damage tracker decides how much work a tick needs: nothing at all when the frame,
+        the window position and the effect layer are unchanged, a window move when only the
+        position changed, and a dirty-rectangle update when only the sprite frame changed.
+
+        Returns:
+            str: The render action taken (see damage_tracker).
+        """
 
         # Get the current animation frame
         pet_frame = self.animator.get_current_frame()
@@ -566,50 +732,122 @@ class DesktopPet:
         pet_x = (self.width - pet_frame.get_width()) // 2
         pet_y = (self.height - pet_frame.get_height()) // 2
 
-        # Draw full-screen dynamic background in MagicState
-        if isinstance(self.state, MagicState) and self.animator.current_sequence_name == 'magic_keep' and self.dynamic_effect:
-            # 1. Draw dynamic effect over the entire draw_surface
-            self.dynamic_effect.update_and_draw(self.draw_surface)
+        effect_active = (isinstance(self.state, MagicState) and self.animator.current_sequence_name == 'magic_keep'
+                         and self.dynamic_effect is not None)
 
-        # 2. Draw the pet sprite frame (on top of effects)
-        self.draw_surface.blit(pet_frame, (pet_x, pet_y))
+        # Profiler overlay (top-left corner); a rebuilt overlay needs a full redraw
+        overlay = None
+        if self.profiler.overlay_visible:
+            overlay, overlay_changed = self.profiler.overlay_surface(type(self.state).__name__)
+            if overlay_changed:
+                self.damage.reset()
 
-        # 3. Call window_manager to update the layered window
-        wm.update_layered_window(
-            self.hwnd,
+        action, dirty_rect = self.damage.plan(
+            self.draw_surface, pet_frame, (pet_x, pet_y), self.current_window_pos, effect_active
+        )
+        if action == RENDER_SKIP:
+            return action
+        if action == RENDER_MOVE:
+            self.presenter.move(self.current_window_pos[0], self.current_window_pos[1])
+            return action
+
+        if action == RENDER_PARTIAL:
+            # 1. Clear and redraw only the dirty rectangle
+            self.draw_surface.fill((0, 0, 0, 0), dirty_rect)
+            self.profiler.mark("effect")
+            self.draw_surface.set_clip(dirty_rect)
+            self.draw_surface.blit(pet_frame, (pet_x, pet_y), special_flags=pygame.BLEND_PREMULTIPLIED)
+            self.profiler.mark("blit")
+            if overlay is not None:
+                self.draw_surface.blit(overlay, (0, 0), special_flags=pygame.BLEND_PREMULTIPLIED)
+                self.profiler.mark("overlay")
+            self.draw_surface.set_clip(None)
+        else:
+            # 1. Clear Surface with transparent color (a reduced-resolution effect overwrites it anyway)
+            if not (effect_active and self.dynamic_effect.replaces_target):
+                self.draw_surface.fill((0, 0, 0, 0))
+
+            # Draw full-screen dynamic background in MagicState
+            if effect_active:
+                # Dynamic effect rasterizes its streaks straight into the premultiplied surface
+                self.dynamic_effect.update_and_draw(self.draw_surface, premultiplied=True)
+            self.profiler.mark("effect")
+
+            # 2. Draw the pet sprite frame (on top of effects)
+            self.draw_surface.blit(pet_frame, (pet_x, pet_y), special_flags=pygame.BLEND_PREMULTIPLIED)
+            self.profiler.mark("blit")
+            if overlay is not None:
+                self.draw_surface.blit(overlay, (0, 0), special_flags=pygame.BLEND_PREMULTIPLIED)
+                self.profiler.mark("overlay")
+
+        # 3. Present through the persistent layered-window presenter (the pixel copy is charged to "convert")
+        self.presenter.present(
             self.draw_surface,
             self.current_window_pos[0],
-            self.current_window_pos[1]
+            self.current_window_pos[1],
+            premultiplied=True,
+            dirty_rect=dirty_rect
         )
+        return action
 
     def trigger_exit(self):
         """Triggered by ByeState"""
         self.running = False  # Set the main loop exit flag
+        # Write any debounced config changes (e.g. the last drag position) right away
+        get_config_writer().flush()
         if self.tk_root:
             self.tk_root.quit()
 
-    def run(self):
-        """Main application loop."""
+    def run(self, max_frames=None):
+        """
+        Main application loop.
 
-        def check_tk_root():
-            """Handles events for the hidden Tkinter root and any Toplevel windows."""
-            try:
-                # Process Tkinter events (button clicks, window updates)
-                self.tk_root.update_idletasks()
-                self.tk_root.update()
-            except Exception:
-                # Ignore common Tkinter errors that occur when the root window is destroyed
-                pass
+        Args:
+            max_frames (int, optional): Return after this many frames instead of running until the pet exits
+                (without cleanup, so run() can be called again; used to drive the loop on the headless backend).
 
+        Returns:
+            int: Number of frames run.
+        """
+
+        frames = 0
+        pending_event = None  # Event that woke an idle wait; handled with the rest of the queue
+        profiler = self.profiler
         while self.running:
-            check_tk_root()
+            if max_frames is not None and frames >= max_frames:
+                return frames
+            frames += 1
+
+            profiler.begin_frame()
+            # Worker results (story fetches) that arrived during the last frame, then Tk events within the budget
+            self.bus.dispatch()
+            profiler.mark("messages")
+            if self.tk_pump is not None:
+                self.tk_pump.pump()
+            profiler.mark("tk")
+            # Scripted input (headless backend) and the profiler hotkey are posted as pygame events here
+            self.backend.begin_frame()
 
             # --- Event Handling ---
             is_exiting = self.state.__class__.__name__ == 'ByeState'
-            for event in pygame.event.get():
+            events = pygame.event.get()
+            if pending_event is not None:
+                events.insert(0, pending_event)
+                pending_event = None
+            for event in events:
+                self.scheduler.note_event(event)
                 if event.type == pygame.QUIT:
                     self.running = False
                     break
+                elif event.type == self.bus.event_type:
+                    # A worker result woke the loop: handle it in this frame
+                    self.bus.dispatch(event.seq)
+                    continue
+                elif is_profiler_hotkey(event):
+                    # Ctrl + Shift + F3: toggle the profiler overlay (full redraw to draw / erase it)
+                    profiler.toggle_overlay()
+                    self.damage.reset()
+                    continue
                 # 检查右键点击事件
                 elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
                     # 只有在非退出状态时，才允许右键打开设置
@@ -624,20 +862,64 @@ class DesktopPet:
 
             if not self.running:
                 break
+            profiler.mark("events")
 
             # --- Game Logic Update ---
             self.state.handle_input()
+            profiler.mark("input")
             self.update()
+            profiler.mark("update")
 
             # --- Rendering ---
-            self.render()
+            action = self.render()
+            # Window update call (or damage planning alone when the frame was skipped)
+            profiler.mark("present")
+
+            # Pace the loop: full FPS while something changes, idle FPS / event wakeups otherwise
+            # (the headless backend advances its virtual clock instead of sleeping)
+            self.scheduler.frame_done(action != RENDER_SKIP)
+            pending_event = self.backend.wait_frame(self.scheduler, self._ms_until_next_wakeup())
+            profiler.mark("sleep")
+            # Worker results that arrived during the sleep are handled before the next frame starts;
+            # a message ends an active-mode sleep early, the rest of the tick is slept afterwards
+            while self.bus.pending():
+                self.bus.dispatch()
+                profiler.mark("messages")
+                if not self.scheduler.interrupted:
+                    break
+                pending_event = self.backend.wait_frame(self.scheduler, self._ms_until_next_wakeup())
+                profiler.mark("sleep")
+            profiler.end_frame()
 
-            # Cap frame rate
-            self.clock.tick(self.fps)
+        # A scripted run (max_frames) keeps the process alive when the pet exits early
+        self.cleanup(exit_process=max_frames is None)
+        return frames
 
-        self.cleanup()
+    def cleanup(self, exit_process=True):
+        """
+        Cleans up Pygame and exits the application.
 
-    def cleanup(self):
-        """Cleans up Pygame and exits the application."""
+        Args:
+            exit_process (bool): Call sys.exit() at the end (False when the pet is driven from a script).
+        """
+        self.prefetcher.shutdown()
+        # Cancel pending fetches first so no stale result reaches the queue while quitting
+        self.io.shutdown()
+        print(f"DEBUG: Story I/O: {self.io.summary()}")
+        print(f"DEBUG: Message bus: {self.bus.summary()}")
+        self.story_manager.close()
+        print(f"DEBUG: Story cache: {self.story_cache.summary()}")
+        print(f"DEBUG: Fishing prompt latency: {self.fishing_latency_summary()}")
+        print(f"DEBUG: Render stats: {self.damage.summary()}")
+        print(f"DEBUG: Animation sheets: {self.all_animations.summary()}; prefetch {self.prefetcher.stats}")
+        print(f"DEBUG: Time to first frame: {self.animator.first_frame_summary()}")
+        print(f"DEBUG: Frame pacing: {self.scheduler.summary()}")
+        print(f"DEBUG: Frame profile: {self.profiler.summary()}")
+        if self.tk_pump is not None:
+            print(f"DEBUG: Tk pump: {self.tk_pump.summary()}")
+        self.profiler.dump()
+        self.backend.release()
+        flush_config()
         pygame.quit()
-        sys.exit()
\ No newline at end of file
+        if exit_process:
+            sys.exit()
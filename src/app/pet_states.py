@@ -1,10 +1,13 @@
 # pet_states.py
 
-import win32con
-import win32gui
 import pygame
 import random
-import window_manager as wm
+import time
+
+from frame_scheduler import ACTIVITY_EVENTS
+
+# Story IDs of the random (non-fox) drift bottles
+RANDOM_STORY_IDS = range(11, 20)
 
 
 class PetState:
@@ -38,16 +41,31 @@ class PetState:
 # --- Concrete State Implementations ---
 
 class IdleState(PetState):
-    """Pet Idle State: Plays the standby animation, waiting for drag or automatic behavior (rest timer)."""
+    """
+    Pet Idle State: Plays the standby animation, waiting for drag or automatic behavior (rest timer).
+
+    Opt-in (idle_low_power_seconds): after idle_low_power_ms without input the idle loop is only advanced
+    at idle_fps (the frames in between are held) and the frame scheduler is put into low-power mode;
+    the next input restores full FPS.
+    """
 
     def enter(self):
         # Log entry
         self.pet.animator.set_animation('idle')
+        self.last_input_ms = self.pet.now_ms()
+        self.next_frame_ms = None  # Next low-power animation step (None while at full FPS)
+
+    def exit(self):
+        self.pet.scheduler.set_low_power(False)
 
     def handle_event(self, event):
         """Detects left mouse button down for dragging."""
+        if event.type in ACTIVITY_EVENTS:
+            self.last_input_ms = self.pet.now_ms()
+            self.next_frame_ms = None
+
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # Left click
-            mouse_rel_pos = pygame.mouse.get_pos()
+            mouse_rel_pos = self.pet.backend.mouse_pos()
 
             # Check if the click is on a non-transparent area of the sprite
             if self.pet.is_click_on_sprite(mouse_rel_pos[0], mouse_rel_pos[1]):
@@ -58,8 +76,22 @@ class IdleState(PetState):
         pass
 
     def update(self):
-        super().update()
         # Idle state remains here, waiting for the rest timer to trigger a TeleportState change (in DesktopPet.update)
+        now = self.pet.now_ms()
+        low_power_ms = self.pet.idle_low_power_ms
+        if not low_power_ms or now - self.last_input_ms < low_power_ms:
+            super().update()
+            return
+
+        # 长时间无输入：待机动画降到 idle_fps，中间的帧保持不变（不渲染），主循环按空闲节奏睡眠
+        if self.next_frame_ms is None:
+            self.pet.scheduler.set_low_power(True)
+            self.next_frame_ms = now
+        # An idle wakeup may come up to one active tick early; waiting for the next one would halve the rate
+        if now >= self.next_frame_ms - 1000 / self.pet.fps:
+            super().update()
+            step_ms = 1000 / self.pet.idle_fps
+            self.next_frame_ms = max(self.next_frame_ms + step_ms, now)
 
 
 class DraggingState(PetState):
@@ -67,12 +99,10 @@ class DraggingState(PetState):
 
     def enter(self):
         # Force top-most status for the window to ensure mouse capture
-        win32gui.SetWindowPos(self.pet.hwnd, win32con.HWND_TOPMOST,
-                              0, 0, 0, 0,
-                              win32con.SWP_NOMOVE | win32con.SWP_NOSIZE)
+        self.pet.backend.set_topmost(True)
 
         # Record starting positions
-        self.pet.drag_start_pos = wm.get_mouse_screen_pos()
+        self.pet.drag_start_pos = self.pet.backend.cursor_screen_pos()
         self.pet.drag_window_pos = (self.pet.current_window_pos[0], self.pet.current_window_pos[1])
 
         # 1. Select a random drag animation set
@@ -106,7 +136,7 @@ class DraggingState(PetState):
 
     def handle_input(self):
         """Checks for mouse button release to trigger the release animation."""
-        mouse_pressed = pygame.mouse.get_pressed()[0]
+        mouse_pressed = self.pet.backend.mouse_pressed()
 
         # Check for mouse release if we are not already playing the release animation
         if not mouse_pressed and self.current_drag_stage != 'release' and self.can_release:
@@ -145,7 +175,7 @@ class DraggingState(PetState):
         try:
             from config_manager import save_config
             # Get current absolute mouse position
-            current_mouse_pos = wm.get_mouse_screen_pos()
+            current_mouse_pos = self.pet.backend.cursor_screen_pos()
 
             # Calculate mouse movement distance
             dx = current_mouse_pos[0] - self.pet.drag_start_pos[0]
@@ -156,12 +186,7 @@ class DraggingState(PetState):
             new_y = self.pet.drag_window_pos[1] + dy
 
             # Get screen resolution
-            screen_modes = pygame.display.get_desktop_sizes()
-            if screen_modes and screen_modes[0] != -1:
-                screen_width, screen_height = screen_modes[0]
-            else:
-                screen_width = pygame.display.Info().current_w
-                screen_height = pygame.display.Info().current_h
+            screen_width, screen_height = self.pet.backend.screen_size()
 
             # --- Elastic Boundary and Smoothing Logic ---
 
@@ -198,15 +223,17 @@ class DraggingState(PetState):
             final_y = int(self.pet.current_smooth_pos[1])
 
             # Move window
-            wm.set_window_position(self.pet.hwnd, final_x, final_y, self.pet.width, self.pet.height)
+            self.pet.backend.set_window_position(final_x, final_y, self.pet.width, self.pet.height)
 
             # Update stored window position
             self.pet.current_window_pos[0] = final_x
             self.pet.current_window_pos[1] = final_y
 
-            self.pet.tk_root.config["current_x"] = final_x
-            self.pet.tk_root.config["current_y"] = final_y
-            save_config(self.pet.tk_root.config, self.pet.persistent_keys)
+            # pet.config is the same dict as tk_root.config (see main.py)
+            self.pet.config["current_x"] = final_x
+            self.pet.config["current_y"] = final_y
+            # Debounced: the background writer coalesces the per-frame position updates
+            save_config(self.pet.config, self.pet.persistent_keys, immediate=False)
 
         except Exception:
             # Safety fallback: switch back to IdleState on error (e.g., if Pygame window is missing)
@@ -275,7 +302,7 @@ class MagicState(PetState):
         self.pet.start_dynamic_effect()
 
         # 3. Record rest start time and duration
-        self.rest_start_time = pygame.time.get_ticks()
+        self.rest_start_time = self.pet.now_ms()
         self.rest_duration_ms = self.pet.rest_duration_ms
 
     def update(self):
@@ -285,7 +312,7 @@ class MagicState(PetState):
         self.pet.animator.check_finished_and_advance()
 
         # 1. Check if the rest duration is over
-        if (pygame.time.get_ticks() - self.rest_start_time) > self.rest_duration_ms:
+        if (self.pet.now_ms() - self.rest_start_time) > self.rest_duration_ms:
             # Restore window size to normal and switch back to IdleState
             self.pet.set_display_mode(False)
             self.pet.change_state(IdleState(self.pet))
@@ -315,6 +342,22 @@ class FishingState(PetState):
         print("Starting one-shot fishing animation.")
         self.pet.animator.set_animation('fishing')
 
+        # 动画开始时就决定钓鱼结果，并在动画播放期间预取故事，动画结束时结果通常已经就绪
+        self.is_successful, self.story_id = self._roll_outcome()
+        if self.story_id is not None:
+            self.pet.story_manager.prefetch(self.story_id)
+
+    def _roll_outcome(self):
+        """决定是否成功以及要获取的故事 ID（失败时 ID 为 None）。"""
+        is_successful = random.random() < self.success_rate
+        story_id = None
+
+        if is_successful:
+            if random.random() < self.fox_story_possibility:
+                story_id = self.pet.story_manager.get_next_story_id()
+            else:
+                story_id = random.choice(RANDOM_STORY_IDS)
+        return is_successful, story_id
 
     def update(self):
         """在每一帧更新状态：检查动画是否播放完毕。"""
@@ -328,25 +371,24 @@ class FishingState(PetState):
             self.pet.change_state(IdleState(self.pet))
 
     def handle_fishing_finished(self):
-        """处理动画播放完毕后的逻辑：决定成功/失败、重置冷却、切换状态。"""
+        """处理动画播放完毕后的逻辑：重置冷却，展示预取好的结果（未就绪时再异步获取）。"""
 
         # 1. 关键：重置冷却计时器
         self.pet.reset_fishing_cooldown()
+        # 从这里开始计算“动画结束 -> 弹出提示”的延迟
+        self.pet.fishing_finished_at = time.perf_counter()
 
-        # 2. 决定是否成功并获取故事 (与之前逻辑相同)
-        is_successful = random.random() < self.success_rate
-        story_content = None
-        story_id_to_fetch = None
-
-        if is_successful:
-            if random.random() < self.fox_story_possibility:
-                story_id_to_fetch = self.pet.story_manager.get_next_story_id()
-            else:
-                story_id_to_fetch = random.choice(range(11, 20))
+        # 2. 结果已在 enter() 中决定
+        story_id_to_fetch = self.story_id
 
+        if self.is_successful:
             if story_id_to_fetch is not None:
-                # 🌟 关键：启动异步获取，不阻塞主线程 🌟
-                self.pet.story_manager.fetch_story_async(story_id_to_fetch)
+                ready, story_data = self.pet.story_manager.take_prefetched(story_id_to_fetch)
+                if ready:
+                    self.pet.handle_fishing_result(True, story_data, story_id_to_fetch)
+                else:
+                    # 🌟 关键：预取尚未完成，启动异步获取（会复用进行中的请求），不阻塞主线程 🌟
+                    self.pet.story_manager.fetch_story_async(story_id_to_fetch)
             else:
                 self.pet.handle_fishing_result(False, "漂流瓶自己跑走了...（真的不是狐狸放跑的哇！！）")
         else:
@@ -400,9 +442,8 @@ class UpsetState(PetState):
         # 随机选择一个角落
         target_x, target_y = random.choice(corners)
 
-        # 立即移动窗口到目标位置 (使用 DesktopPet 中已有的 Win32 移动函数)
-        wm.set_window_position(
-            self.pet.hwnd,
+        # 立即移动窗口到目标位置 (通过 DesktopPet 的平台后端)
+        self.pet.backend.set_window_position(
             target_x,
             target_y,
             pet_w,
@@ -419,7 +460,7 @@ class UpsetState(PetState):
     def handle_event(self, event):
         """Detects left mouse button down for dragging."""
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # Left click
-            mouse_rel_pos = pygame.mouse.get_pos()
+            mouse_rel_pos = self.pet.backend.mouse_pos()
 
             # Check if the click is on a non-transparent area of the sprite
             if self.pet.is_click_on_sprite(mouse_rel_pos[0], mouse_rel_pos[1]):
@@ -462,7 +503,7 @@ class ButterflyState(PetState):
     def handle_event(self, event):
         """Detects left mouse button down for dragging."""
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # Left click
-            mouse_rel_pos = pygame.mouse.get_pos()
+            mouse_rel_pos = self.pet.backend.mouse_pos()
 
             # Check if the click is on a non-transparent area of the sprite
             if self.pet.is_click_on_sprite(mouse_rel_pos[0], mouse_rel_pos[1]):
@@ -0,0 +1,153 @@
+# pixel_ops.py
+# Platform-independent pixel conversion helpers (premultiplied BGRA <-> Pygame surfaces).
+
+import numpy as np
+import pygame
+
+# Channel masks of a 32-bit surface whose bytes are laid out B, G, R, A in memory
+# (what convert_alpha() produces on little-endian machines, and what GDI expects)
+BGRA_MASKS = (0x00FF0000, 0x0000FF00, 0x000000FF, 0xFF000000)
+
+
+def convert_to_bgra(surface):
+    """
+    Converts a Pygame Surface to BGRA byte data with pre-multiplied alpha,
+    which is required for UpdateLayeredWindow.
+
+    Not used by the app any more (LayeredWindowPresenter premultiplies straight into its DIB with
+    premultiply_into); kept only as the reference / baseline of tools/bench_blit.py and
+    tools/bench_premultiplied.py.
+    """
+    rgba_data = pygame.image.tostring(surface, "RGBA")
+    width, height = surface.get_size()
+
+    # Convert RGBA data to a NumPy array
+    arr = np.frombuffer(rgba_data, dtype=np.uint8).reshape(height, width, 4)
+
+    # Separate R, G, B, A channels
+    r, g, b, a = arr[..., 0], arr[..., 1], arr[..., 2], arr[..., 3]
+
+    # Critical: Pre-multiplied Alpha
+    a_f = a / 255.0
+    r_pre = (r * a_f).astype(np.uint8)
+    g_pre = (g * a_f).astype(np.uint8)
+    b_pre = (b * a_f).astype(np.uint8)
+
+    # Re-stack into BGRA order
+    bgra = np.dstack([b_pre, g_pre, r_pre, a])
+
+    return bgra.tobytes()
+
+
+def surface_bgra_view(surface):
+    """
+    Returns the pixels of a Surface as a BGRA array of shape (h, w, 4).
+
+    For 32-bit surfaces in BGRA layout this is a zero-copy view over the surface buffer
+    (the surface stays locked while the view is alive, so drop it before blitting).
+    Other pixel formats fall back to a copy.
+    """
+    if surface.get_bitsize() == 32 and surface.get_masks() == BGRA_MASKS:
+        return np.asarray(surface.get_view('2')).T[..., None].view(np.uint8)
+    return surface_to_bgra(surface)
+
+
+def premultiply_into(dst, src, scratch=None):
+    """
+    Writes premultiplied BGRA pixels of the straight-alpha BGRA array src into dst
+    (both uint8, shape (h, w, 4)), using integer math only.
+
+    Pixels are processed as packed uint32 words: B and R share one multiply in two 16-bit
+    lanes, G gets its own, and c * a / 255 is rounded exactly via t = c * a + 128; (t + (t >> 8)) >> 8.
+
+    Args:
+        scratch (np.ndarray, optional): Reusable uint32 buffer of shape (3, h, w) to avoid per-call allocations.
+    """
+    if scratch is None:
+        scratch = np.empty((3,) + src.shape[:2], dtype=np.uint32)
+    src32 = src.view(np.uint32)[..., 0]
+    dst32 = dst.view(np.uint32)[..., 0]
+    rb, g, a = scratch
+
+    np.right_shift(src32, 24, out=a)
+
+    # Blue and red (bits 0-7 and 16-23) in parallel
+    np.bitwise_and(src32, 0x00FF00FF, out=rb)
+    np.multiply(rb, a, out=rb)
+    np.add(rb, 0x00800080, out=rb)
+    np.right_shift(rb, 8, out=g)
+    np.bitwise_and(g, 0x00FF00FF, out=g)
+    np.add(rb, g, out=rb)
+    np.right_shift(rb, 8, out=rb)
+    np.bitwise_and(rb, 0x00FF00FF, out=rb)
+
+    # Green (bits 8-15), kept in place
+    np.bitwise_and(src32, 0x0000FF00, out=g)
+    np.multiply(g, a, out=g)
+    np.add(g, 0x00008000, out=g)
+    np.right_shift(g, 8, out=dst32)
+    np.add(g, dst32, out=g)
+    np.right_shift(g, 8, out=g)
+    np.bitwise_and(g, 0x0000FF00, out=g)
+
+    np.left_shift(a, 24, out=dst32)
+    np.bitwise_or(dst32, rb, out=dst32)
+    np.bitwise_or(dst32, g, out=dst32)
+
+
+def premultiply_bgra(bgra):
+    """Returns a premultiplied copy of a straight-alpha BGRA array (uint8, shape (h, w, 4))."""
+    out = np.empty(bgra.shape, dtype=np.uint8)
+    premultiply_into(out, np.ascontiguousarray(bgra))
+    return out
+
+
+def _build_unpremultiply_lut():
+    """Flat (alpha << 8 | color) -> straight color lookup table."""
+    alpha = np.arange(256, dtype=np.uint32)[:, None]
+    color = np.arange(256, dtype=np.uint32)[None, :]
+    straight = (color * 255 + alpha // 2) // np.maximum(alpha, 1)
+    return np.where(alpha > 0, np.minimum(straight, 255), 0).astype(np.uint8).ravel()
+
+
+_UNPREMULTIPLY_LUT = _build_unpremultiply_lut()
+
+
+def unpremultiply_bgra(bgra):
+    """
+    Returns a straight-alpha copy of a premultiplied BGRA array (uint8, shape (h, w, 4)).
+    Fully transparent pixels become (0, 0, 0, 0).
+    """
+    out = np.empty_like(bgra)
+    index = (bgra[..., 3:4].astype(np.uint16) << 8) | bgra[..., :3]
+    out[..., :3] = _UNPREMULTIPLY_LUT[index]
+    out[..., 3] = bgra[..., 3]
+    return out
+
+
+def surface_to_bgra(surface):
+    """Returns the straight-alpha pixels of a Surface as a new BGRA array (uint8, shape (h, w, 4))."""
+    width, height = surface.get_size()
+    rgba = np.frombuffer(pygame.image.tostring(surface, "RGBA"), dtype=np.uint8).reshape(height, width, 4)
+    return np.ascontiguousarray(rgba[..., [2, 1, 0, 3]])
+
+
+def surface_over_bgra(bgra):
+    """Wraps a C-contiguous BGRA array (h, w, 4) in a Surface that shares its memory (no copy)."""
+    height, width = bgra.shape[:2]
+    return pygame.image.frombuffer(bgra, (width, height), "BGRA")
+
+
+def premultiply_surface(surface):
+    """Returns a copy of a straight-alpha Surface with its color channels premultiplied by alpha."""
+    premultiplied = surface.convert_alpha() if surface.get_masks() != BGRA_MASKS else surface.copy()
+    pixels = surface_bgra_view(premultiplied)
+    premultiply_into(pixels, pixels)
+    del pixels
+    return premultiplied
+
+
+def surface_from_bgra(bgra):
+    """Creates a new per-pixel-alpha Surface from a straight-alpha BGRA array."""
+    height, width = bgra.shape[:2]
+    return pygame.image.frombuffer(np.ascontiguousarray(bgra).tobytes(), (width, height), "BGRA").convert_alpha()
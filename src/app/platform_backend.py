@@ -0,0 +1,336 @@
+# platform_backend.py
+# Platform abstraction for DesktopPet: where frames are presented, where the cursor comes from, what time it is.
+#
+# - Win32Backend: the real layered window (window_manager, pywin32), imported lazily so that the rest of
+#   the app can be imported on any platform.
+# - HeadlessBackend: presents into an in-memory buffer, reads the cursor from a script and runs on a
+#   virtual clock, so DesktopPet.run can be driven for N frames deterministically under SDL's dummy driver.
+
+import bisect
+import zlib
+import numpy as np
+import pygame
+from frame_scheduler import MODE_ACTIVE
+from pixel_ops import surface_bgra_view, premultiply_into
+
+# Screen size reported by the headless backend unless told otherwise
+HEADLESS_SCREEN_SIZE = (1920, 1080)
+# Frame profiler overlay hotkey: Ctrl + Shift + F3 (virtual key codes VK_CONTROL, VK_SHIFT, VK_F3)
+PROFILER_HOTKEY_VKS = (0x11, 0x10, 0x72)
+
+
+def profiler_hotkey_event():
+    """The pygame event DesktopPet.run treats as the profiler overlay hotkey."""
+    return pygame.event.Event(pygame.KEYDOWN, key=pygame.K_F3, mod=pygame.KMOD_LCTRL | pygame.KMOD_LSHIFT,
+                              unicode="", scancode=0)
+
+
+def is_profiler_hotkey(event):
+    return (event.type == pygame.KEYDOWN and event.key == pygame.K_F3
+            and event.mod & pygame.KMOD_CTRL and event.mod & pygame.KMOD_SHIFT)
+
+
+class Win32Backend:
+    """Layered, topmost Win32 window presented with UpdateLayeredWindow (the production backend)."""
+
+    name = "win32"
+    seed = None  # Effects use fresh OS entropy
+
+    def __init__(self, hwnd):
+        # Windows-only modules: imported here rather than at module import
+        import window_manager as wm
+        self._wm = wm
+        self.hwnd = hwnd
+        # Persistent layered-window presenter (DIB section reused between frames)
+        self.presenter = wm.LayeredWindowPresenter(hwnd)
+        self._hotkey_down = False
+
+    # --- Window ---
+    def setup_window(self, width, height, x, y):
+        self._wm.setup_layered_window(self.hwnd, width, height, x, y)
+
+    def set_window_position(self, x, y, width, height):
+        self._wm.set_window_position(self.hwnd, x, y, width, height)
+
+    def set_topmost(self, topmost=True):
+        self._wm.set_topmost(self.hwnd, topmost)
+
+    def screen_size(self):
+        screen_modes = pygame.display.get_desktop_sizes()
+        if screen_modes and screen_modes[0] != -1:
+            return screen_modes[0]
+        info = pygame.display.Info()
+        return info.current_w, info.current_h
+
+    # --- Cursor ---
+    def cursor_screen_pos(self):
+        return self._wm.get_mouse_screen_pos()
+
+    def mouse_focused(self):
+        return bool(pygame.mouse.get_focused())
+
+    def mouse_pos(self):
+        """Cursor position relative to the window."""
+        return pygame.mouse.get_pos()
+
+    def mouse_pressed(self):
+        """Whether the left button is held."""
+        return pygame.mouse.get_pressed()[0]
+
+    # --- Time and frame pacing ---
+    def get_ticks(self):
+        return pygame.time.get_ticks()
+
+    def begin_frame(self):
+        """
+        Polls the profiler hotkey: the layered window never takes keyboard focus (WS_EX_NOACTIVATE),
+        so the key state is read globally and turned into a pygame event on the press.
+        """
+        hotkey_down = self._wm.are_keys_down(*PROFILER_HOTKEY_VKS)
+        if hotkey_down and not self._hotkey_down:
+            pygame.event.post(profiler_hotkey_event())
+        self._hotkey_down = hotkey_down
+
+    def wait_frame(self, scheduler, ms_until_deadline):
+        """Sleeps until the next tick (see FrameScheduler.wait); returns the event that woke an idle wait."""
+        return scheduler.wait(ms_until_deadline)
+
+    def release(self):
+        self.presenter.release()
+
+
+class MemoryPresenter:
+    """
+    Presenter with the LayeredWindowPresenter interface that keeps the window content in a NumPy
+    buffer (premultiplied BGRA, like the DIB section) instead of handing it to the OS.
+    """
+
+    def __init__(self):
+        self.size = None
+        self.pixels = None  # np.ndarray (h, w, 4)
+        self.position = (0, 0)
+        self.allocations = 0
+        self.profiler = None
+        self.stats = {"presents": 0, "partial": 0, "moves": 0}
+        self._scratch = None
+        self._digest = None
+
+    def _allocate(self, width, height):
+        self.pixels = np.zeros((height, width, 4), dtype=np.uint8)
+        self._scratch = np.empty((3, height, width), dtype=np.uint32)
+        self.size = (width, height)
+        self.allocations += 1
+
+    def present(self, surface, window_x, window_y, premultiplied=False, dirty_rect=None):
+        width, height = surface.get_size()
+        if self.size != (width, height):
+            self._allocate(width, height)
+            dirty_rect = None
+
+        if dirty_rect is None:
+            rows, cols = slice(0, height), slice(0, width)
+        else:
+            rows, cols = slice(dirty_rect.top, dirty_rect.bottom), slice(dirty_rect.left, dirty_rect.right)
+            self.stats["partial"] += 1
+
+        source = surface_bgra_view(surface)[rows, cols]
+        if premultiplied:
+            np.copyto(self.pixels[rows, cols], source)
+        else:
+            premultiply_into(self.pixels[rows, cols], source, self._scratch[:, rows, cols])
+        del source
+        if self.profiler is not None:
+            self.profiler.mark("convert")
+
+        self.position = (window_x, window_y)
+        self.stats["presents"] += 1
+        self._digest = None
+
+    def move(self, window_x, window_y):
+        self.position = (window_x, window_y)
+        self.stats["moves"] += 1
+
+    def digest(self):
+        """CRC-32 of the current window content (cached until the next present)."""
+        if self._digest is None:
+            self._digest = zlib.crc32(self.pixels) if self.pixels is not None else 0
+        return self._digest
+
+    def release(self):
+        self.pixels = None
+        self.size = None
+        self._scratch = None
+        self._digest = None
+
+
+class ScriptedCursor:
+    """
+    Replays a cursor script: keyframes (time_ms, x, y, pressed) in screen coordinates, sorted by time.
+    Between two keyframes the position is interpolated linearly; the button state changes at the keyframe.
+    Before the first keyframe the cursor is off-screen and released.
+    """
+
+    OFF_SCREEN = (-10000, -10000)
+
+    def __init__(self, keyframes=()):
+        self.keyframes = sorted(keyframes, key=lambda keyframe: keyframe[0])
+        self._times = [keyframe[0] for keyframe in self.keyframes]
+
+    @classmethod
+    def from_trace(cls, events):
+        """
+        Builds a cursor from input trace events [time_ms, kind, *args], sorted by time:
+
+        - [t, "move", x, y]: the cursor glides linearly from where it was at the previous event to (x, y)
+          (recorded traces sample the cursor every frame, so the glides are one frame long)
+        - [t, "hover", x, y]: the cursor jumps to (x, y) and rests there
+        - [t, "down"] / [t, "up"]: left button pressed / released at the current position
+
+        Other kinds (GUI actions such as opening the settings) are left to the caller.
+        """
+        keyframes = []
+        x, y = cls.OFF_SCREEN
+        pressed = False
+        for event in sorted(events, key=lambda event: event[0]):
+            t, kind = event[0], event[1]
+            if kind == "move":
+                x, y = event[2], event[3]
+            elif kind == "hover":
+                # Hold the old position up to t, then jump
+                keyframes.append((t, x, y, pressed))
+                x, y = event[2], event[3]
+            elif kind in ("down", "up"):
+                # Keyframe at the current position: the button changes at t, the cursor does not move
+                pressed = kind == "down"
+            else:
+                continue
+            keyframes.append((t, x, y, pressed))
+        return cls(keyframes)
+
+    def button_changes(self, since_ms, now_ms):
+        """Yields (x, y, pressed) for every button change in (since_ms, now_ms], so quick clicks are not lost."""
+        start = bisect.bisect_right(self._times, since_ms)
+        end = bisect.bisect_right(self._times, now_ms)
+        pressed = self.keyframes[start - 1][3] if start > 0 else False
+        for t, x, y, keyframe_pressed in self.keyframes[start:end]:
+            if keyframe_pressed != pressed:
+                pressed = keyframe_pressed
+                yield x, y, pressed
+
+    def at(self, now_ms):
+        """Returns (x, y, pressed) at virtual time now_ms."""
+        keyframes = self.keyframes
+        # Last keyframe at or before now_ms
+        i = bisect.bisect_right(self._times, now_ms) - 1
+        if i < 0:
+            return self.OFF_SCREEN + (False,)
+
+        t0, x0, y0, pressed = keyframes[i]
+        if i + 1 < len(keyframes):
+            t1, x1, y1, _ = keyframes[i + 1]
+            ratio = (now_ms - t0) / (t1 - t0) if t1 > t0 else 1.0
+            x0 = round(x0 + (x1 - x0) * ratio)
+            y0 = round(y0 + (y1 - y0) * ratio)
+        return x0, y0, pressed
+
+
+class HeadlessBackend:
+    """
+    Backend without a window: frames go to a MemoryPresenter, the cursor comes from a ScriptedCursor
+    and time is virtual. Every frame advances the clock by what the FrameScheduler would have slept
+    (1 / fps while active, up to 1 / idle_fps or the next deadline while idle) without sleeping.
+
+    Cursor changes are posted as pygame mouse events (motion, left button down / up) at the start of
+    the frame, so the states see the same event flow as with a real mouse.
+
+    With realtime=True the clock is pygame's and wait_frame really sleeps (FrameScheduler.wait), for
+    wall-clock timing measurements (e.g. frame jitter next to Tk windows) without the layered window.
+    """
+
+    name = "headless"
+
+    def __init__(self, cursor=None, screen_size=HEADLESS_SCREEN_SIZE, seed=0, record=False, realtime=False):
+        self.hwnd = None
+        self.presenter = MemoryPresenter()
+        self.cursor = cursor or ScriptedCursor()
+        self.seed = seed
+        self.topmost = True
+        self.window_rect = pygame.Rect(0, 0, 0, 0)
+        self._screen_size = tuple(screen_size)
+        self.realtime = realtime
+        self.clock_ms = 0.0
+        self._cursor_state = ScriptedCursor.OFF_SCREEN + (False,)
+        self._sampled_ms = -1.0
+        # (virtual ms, window x, window y, content CRC) per frame when record is set
+        self.record = record
+        self.frame_log = []
+
+    # --- Window ---
+    def setup_window(self, width, height, x, y):
+        self.window_rect = pygame.Rect(x, y, width, height)
+
+    def set_window_position(self, x, y, width, height):
+        # Same as the Win32 version (SWP_NOSIZE): only moves the window
+        self.window_rect.topleft = (x, y)
+
+    def set_topmost(self, topmost=True):
+        self.topmost = topmost
+
+    def screen_size(self):
+        return self._screen_size
+
+    # --- Cursor ---
+    def cursor_screen_pos(self):
+        return self._cursor_state[0], self._cursor_state[1]
+
+    def mouse_focused(self):
+        return self.window_rect.collidepoint(self.cursor_screen_pos())
+
+    def mouse_pos(self):
+        x, y = self.cursor_screen_pos()
+        return x - self.window_rect.x, y - self.window_rect.y
+
+    def mouse_pressed(self):
+        return self._cursor_state[2]
+
+    # --- Time and frame pacing ---
+    def get_ticks(self):
+        if self.realtime:
+            return pygame.time.get_ticks()
+        return int(self.clock_ms)
+
+    def begin_frame(self):
+        """Samples the cursor script at the current virtual time and posts the resulting mouse events."""
+        if self.realtime:
+            self.clock_ms = float(pygame.time.get_ticks())
+        previous = self._cursor_state
+        self._cursor_state = state = self.cursor.at(self.clock_ms)
+
+        if state[:2] != previous[:2] and self.mouse_focused():
+            pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=self.mouse_pos(), rel=(0, 0),
+                                                 buttons=(int(state[2]), 0, 0)))
+        # Button events carry the position of the press / release, like OS mouse events
+        for x, y, pressed in self.cursor.button_changes(self._sampled_ms, self.clock_ms):
+            pos = (x - self.window_rect.x, y - self.window_rect.y)
+            event_type = pygame.MOUSEBUTTONDOWN if pressed else pygame.MOUSEBUTTONUP
+            pygame.event.post(pygame.event.Event(event_type, pos=pos, button=1))
+        self._sampled_ms = self.clock_ms
+
+    def wait_frame(self, scheduler, ms_until_deadline):
+        """Advances the virtual clock by the time the scheduler would have slept. Never blocks (unless realtime)."""
+        if self.record:
+            self.frame_log.append((self.get_ticks(), self.window_rect.x, self.window_rect.y, self.presenter.digest()))
+        if self.realtime:
+            return scheduler.wait(ms_until_deadline)
+
+        if scheduler.mode == MODE_ACTIVE:
+            step_ms = 1000 / scheduler.active_fps
+        else:
+            step_ms = 1000 / scheduler.idle_fps
+            if ms_until_deadline is not None:
+                step_ms = min(step_ms, max(1, ms_until_deadline))
+        self.clock_ms += step_ms
+        return None
+
+    def release(self):
+        self.presenter.release()
@@ -7,10 +7,11 @@ import customtkinter as ctk
 from tkinter import messagebox
 import os
 import sys
-import winreg
-import win32con
-import win32gui
 import ctypes
+try:
+    import winreg  # Windows only: autostart entry in the registry
+except ImportError:
+    winreg = None
 import webbrowser
 
 # DWM Effect Constants (for Acrylic effect)
@@ -387,6 +388,8 @@ class SettingsWindow(ctk.CTkToplevel):
         """Checks if the autostart registry key exists."""
         RUN_KEY = r"Software\Microsoft\Windows\CurrentVersion\Run"
         APP_NAME = "DesktopPet"
+        if winreg is None:
+            return False
 
         try:
             with winreg.OpenKey(winreg.HKEY_CURRENT_USER, RUN_KEY, 0, winreg.KEY_READ) as key:
@@ -404,6 +407,8 @@ class SettingsWindow(ctk.CTkToplevel):
         """Sets or deletes the autostart registry entry."""
         RUN_KEY = r"Software\Microsoft\Windows\CurrentVersion\Run"
         APP_NAME = "DesktopPet"
+        if winreg is None:
+            return False
         app_path = self._get_app_path()
 
         if enable:
@@ -462,11 +467,6 @@ class SettingsWindow(ctk.CTkToplevel):
             self.pet.change_state(IdleState(self.pet))
 
         try:
-            win32gui.SetWindowPos(
-                self.pet.hwnd,
-                win32con.HWND_TOPMOST,
-                0, 0, 0, 0,
-                win32con.SWP_NOMOVE | win32con.SWP_NOSIZE
-            )
+            self.pet.backend.set_topmost(True)
         except Exception as e:
             print(f"Error resetting window Z-order: {e}")
\ No newline at end of file
@@ -2,31 +2,47 @@
 
 import pygame
 import math
+import time
+from collections import OrderedDict, namedtuple, deque
+from functools import partial
 from utils import resource_path  # Kept commented as per original
+from pixel_ops import premultiply_surface
 
-def load_frames_from_sheet(filepath, frame_w, frame_h, target_w, target_h, target_frames, no_scaling=False):
+# Result of the thread-safe decode stage of a sprite sheet:
+# - frames: list of Surfaces (not yet display-converted) or an AtlasFrameList
+# - needs_conversion: frames must still go through convert_alpha() on the main thread
+# - cacheable: frames come from the real sheet and may be baked into the atlas
+# - premultiplied: frames already hold premultiplied alpha (zero-copy atlas views)
+DecodedSheet = namedtuple("DecodedSheet", ["frames", "needs_conversion", "cacheable", "premultiplied"])
+
+
+def decode_frames_from_sheet(filepath, frame_w, frame_h, target_w, target_h, target_frames, no_scaling=False,
+                             atlas_cache=None, atlas_name=None, premultiplied=False, prepare=False):
     """
-    Loads, extracts, and scales animation frames from a sprite sheet.
-    Creates default test frames if loading fails.
+    Decode stage of load_frames_from_sheet: reads, slices and scales the sheet (or serves it
+    from the baked atlas) without touching the display, so it may run on a worker thread.
 
     Args:
-        filepath (str): Path to the sprite sheet image.
-        frame_w (int): Width of a single frame in the source sheet.
-        frame_h (int): Height of a single frame in the source sheet.
-        target_w (int): Desired final width for the scaled frame.
-        target_h (int): Desired final height for the scaled frame.
-        target_frames (int): Total number of frames to extract.
-        no_scaling (bool): If True, frames are loaded but not scaled to target_w/h.
+        premultiplied (bool): For atlas hits, serve zero-copy premultiplied frames.
+        prepare (bool): For atlas hits, convert every frame's pixels up front
+                        (used by background prefetching) instead of on first access.
 
     Returns:
-        list: A list of pygame.Surface objects (animation frames).
+        DecodedSheet: Frames to pass to finalize_frames on the main thread.
     """
+    if atlas_cache is not None:
+        cached_frames = atlas_cache.lookup(atlas_name, premultiplied=premultiplied)
+        if cached_frames:
+            if prepare:
+                cached_frames.prepare()
+            return DecodedSheet(cached_frames, needs_conversion=False, cacheable=False, premultiplied=premultiplied)
+
     absolute_path = resource_path(filepath)
     frames = []
     frame_w = math.ceil(frame_w)
     frame_h = math.ceil(frame_h)
     try:
-        sprite_sheet = pygame.image.load(absolute_path).convert_alpha()
+        sprite_sheet = pygame.image.load(absolute_path)
 
     except Exception as e:
         # Failed to load image, create a visible test image as fallback.
@@ -35,7 +51,8 @@ def load_frames_from_sheet(filepath, frame_w, frame_h, target_w, target_h, targe
         pygame.draw.circle(sprite_sheet, (255, 100, 100, 180), (frame_w // 2, frame_h // 2), frame_w // 2 - 1)
 
         frames.append(sprite_sheet)
-        return [pygame.transform.smoothscale(f, (target_w, target_h)).convert_alpha() for f in frames]
+        frames = [pygame.transform.smoothscale(f, (target_w, target_h)) for f in frames]
+        return DecodedSheet(frames, needs_conversion=True, cacheable=False, premultiplied=False)
 
     # Iterate through the sprite sheet to extract frames
     for y in range(0, sprite_sheet.get_height(), frame_h):
@@ -46,8 +63,8 @@ def load_frames_from_sheet(filepath, frame_w, frame_h, target_w, target_h, targe
             frame_rect = pygame.Rect(x, y, frame_w, frame_h)
 
             if frame_rect.width > 0 and frame_rect.height > 0:
-                # Extract and convert frame to alpha format
-                frame = sprite_sheet.subsurface(frame_rect).convert_alpha()
+                # Extract frame (alpha conversion happens in finalize_frames)
+                frame = sprite_sheet.subsurface(frame_rect)
                 frames.append(frame)
         if len(frames) >= target_frames:
             break
@@ -57,19 +74,71 @@ def load_frames_from_sheet(filepath, frame_w, frame_h, target_w, target_h, targe
         test_frame = pygame.Surface((target_w, target_h), pygame.SRCALPHA)
         test_frame.fill((0, 0, 0, 0))
         pygame.draw.circle(test_frame, (255, 100, 100, 180), (target_w // 2, target_h // 2), 50)
-        frames = [test_frame]
+        return DecodedSheet([test_frame], needs_conversion=False, cacheable=False, premultiplied=False)
+
+    # Conditional scaling: scale frames, or copy them out of the sheet unscaled.
+    if not no_scaling:
+        frames = [pygame.transform.smoothscale(f, (target_w, target_h)) for f in frames]
     else:
-        # Conditional scaling: scale frames or just ensure alpha conversion.
-        if not no_scaling:
-            frames = [pygame.transform.smoothscale(f, (target_w, target_h)).convert_alpha() for f in frames]
-        else:
-            frames = [f.convert_alpha() for f in frames]
+        frames = [f.copy() for f in frames]
+
+    return DecodedSheet(frames, needs_conversion=True, cacheable=True, premultiplied=False)
+
+
+def finalize_frames(decoded, atlas_cache=None, atlas_name=None, premultiplied=False):
+    """
+    Main-thread stage of load_frames_from_sheet: converts decoded frames to the display
+    pixel format, records freshly decoded sheets for the atlas and, if requested,
+    premultiplies their alpha.
+
+    Returns:
+        list: A list of pygame.Surface objects (animation frames).
+    """
+    frames = decoded.frames
+    if decoded.needs_conversion:
+        frames = [f.convert_alpha() for f in frames]
+
+    if decoded.cacheable and atlas_cache is not None:
+        atlas_cache.record(atlas_name, frames)
+
+    if premultiplied and not decoded.premultiplied:
+        frames = [premultiply_surface(f) for f in frames]
 
     return frames
 
+
+def load_frames_from_sheet(filepath, frame_w, frame_h, target_w, target_h, target_frames, no_scaling=False,
+                           atlas_cache=None, atlas_name=None, premultiplied=False):
+    """
+    Loads, extracts, and scales animation frames from a sprite sheet.
+    Creates default test frames if loading fails.
+    When an atlas cache is given, frames are served from the baked atlas on a hit,
+    and recorded for baking on a miss.
+
+    Args:
+        filepath (str): Path to the sprite sheet image.
+        frame_w (int): Width of a single frame in the source sheet.
+        frame_h (int): Height of a single frame in the source sheet.
+        target_w (int): Desired final width for the scaled frame.
+        target_h (int): Desired final height for the scaled frame.
+        target_frames (int): Total number of frames to extract.
+        no_scaling (bool): If True, frames are loaded but not scaled to target_w/h.
+        atlas_cache (FrameAtlasCache, optional): Baked atlas cache to read from / record into.
+        atlas_name (str, optional): Entry name of this sheet in the atlas.
+        premultiplied (bool): If True, frames are stored with premultiplied alpha (BGRA), ready to be
+                              composited with BLEND_PREMULTIPLIED and presented without per-frame alpha math.
+
+    Returns:
+        list: A list of pygame.Surface objects (animation frames).
+    """
+    decoded = decode_frames_from_sheet(filepath, frame_w, frame_h, target_w, target_h, target_frames,
+                                       no_scaling=no_scaling, atlas_cache=atlas_cache, atlas_name=atlas_name,
+                                       premultiplied=premultiplied)
+    return finalize_frames(decoded, atlas_cache=atlas_cache, atlas_name=atlas_name, premultiplied=premultiplied)
+
 def load_animation(pet_instance, animation_name, config_key=None, no_scaling=False, is_magic_type=False):
     """
-    加载动画帧和范围
+    注册动画帧来源和范围（帧在第一次播放时才会被加载）
 
     Args:
         pet_instance: pet实例对象
@@ -83,18 +152,25 @@ def load_animation(pet_instance, animation_name, config_key=None, no_scaling=Fal
         config_key = animation_name
 
     anim_config = pet.animation_config[config_key]
-    frames = load_frames_from_sheet(
-        anim_config["filepath"],
-        anim_config["frame_w"],
-        anim_config["frame_h"],
-        pet.width,
-        pet.height,
-        anim_config["total_frames"],
-        no_scaling=no_scaling
+    pet.all_animations.register(
+        animation_name,
+        decode=partial(
+            decode_frames_from_sheet,
+            anim_config["filepath"],
+            anim_config["frame_w"],
+            anim_config["frame_h"],
+            pet.width,
+            pet.height,
+            anim_config["total_frames"],
+            no_scaling=no_scaling,
+            atlas_cache=pet.frame_atlas,
+            atlas_name=animation_name,
+            premultiplied=pet.premultiplied_frames
+        ),
+        finalize=partial(finalize_frames, atlas_cache=pet.frame_atlas, atlas_name=animation_name,
+                         premultiplied=pet.premultiplied_frames)
     )
 
-    pet.all_animations[animation_name] = frames
-
     if is_magic_type:
         # 处理有子范围的动画（如magic）
         for sub_name, ranges in anim_config["ranges"].items():
@@ -104,7 +180,7 @@ def load_animation(pet_instance, animation_name, config_key=None, no_scaling=Fal
         pet.animation_ranges[animation_name] = anim_config["ranges"][animation_name]
 
 def load_dragging_animations(pet_instance):
-    """加载所有拖拽动画变体"""
+    """注册所有拖拽动画变体"""
     pet = pet_instance
     dragging_options = pet.animation_config["dragging"]
     pet.available_drag_prefixes = []
@@ -113,23 +189,179 @@ def load_dragging_animations(pet_instance):
         prefix = group["prefix"]
         pet.available_drag_prefixes.append(prefix)
 
-        drag_frames = load_frames_from_sheet(
-            group["filepath"],
-            group["frame_w"],
-            group["frame_h"],
-            pet.width,
-            pet.height,
-            group["total_frames"]
-        )
         frame_key = f"{prefix}_frames"
-
-        if drag_frames:
-            pet.all_animations[frame_key] = drag_frames
+        pet.all_animations.register(
+            frame_key,
+            decode=partial(
+                decode_frames_from_sheet,
+                group["filepath"],
+                group["frame_w"],
+                group["frame_h"],
+                pet.width,
+                pet.height,
+                group["total_frames"],
+                atlas_cache=pet.frame_atlas,
+                atlas_name=frame_key,
+                premultiplied=pet.premultiplied_frames
+            ),
+            finalize=partial(finalize_frames, atlas_cache=pet.frame_atlas, atlas_name=frame_key,
+                             premultiplied=pet.premultiplied_frames)
+        )
 
         # 存储拖拽子序列的范围
         for sub_name, ranges in group["ranges"].items():
             pet.animation_ranges[f"{prefix}_{sub_name}"] = ranges
 
+def load_all_animations(pet_instance):
+    """注册所有动画"""
+    pet = pet_instance
+    # Load Idle animation
+    load_animation(pet, 'idle')
+    # Load Display animation
+    load_animation(pet, 'display', no_scaling=True)
+    # Load Teleport animation
+    load_animation(pet, 'teleport')
+    # Load Magic animation (for full screen effect)
+    load_animation(pet, 'magic', no_scaling=True, is_magic_type=True)
+    # Load Fishing animation
+    load_animation(pet, 'fishing')
+    # Load Bye animation
+    load_animation(pet, 'bye')
+    # Load Upset animation
+    load_animation(pet, 'upset')
+    # Load Angry animation
+    load_animation(pet, 'angry')
+    # Load Butterfly animation
+    load_animation(pet, 'butterfly')
+    # Load all Dragging options
+    load_dragging_animations(pet)
+
+def frames_nbytes(frames):
+    """Estimates the resident pixel memory of a frame list (in bytes)."""
+    nbytes = getattr(frames, "nbytes", None)
+    if nbytes is not None:
+        return nbytes
+    return sum(f.get_bytesize() * f.get_width() * f.get_height() for f in frames)
+
+
+class LazyAnimationRegistry:
+    """
+    Dict-like store of animation frame sources, keyed like AnimationController expects
+    (e.g. 'idle', 'drag_A_frames').
+
+    Sheets are only decoded the first time a source is requested. Resident sources are
+    kept in LRU order and evicted once the memory budget is exceeded; pinned sources
+    (e.g. 'idle'), the source being requested and the source the AnimationController is
+    playing (set_playing) are never evicted, so resident_bytes covers every sheet still in use.
+
+    Each source is loaded in two stages: decode() (thread-safe, see decode_frames_from_sheet)
+    and finalize() (main thread), so an AnimationPrefetcher can run the first stage in the background.
+    """
+
+    def __init__(self, memory_budget_bytes=None, pinned=('idle',)):
+        self.memory_budget_bytes = memory_budget_bytes  # None: unlimited
+        self.pinned = set(pinned)
+        self.playing = None  # Source of the sequence being played (see set_playing)
+        self.resident_bytes = 0
+
+        self._decoders = {}
+        self._finalizers = {}
+        self._resident = OrderedDict()  # name -> frames, least recently used first
+        self._sizes = {}
+        self.stats = {"loads": 0, "hits": 0, "evictions": 0}
+
+    def register(self, name, decode, finalize=None):
+        """
+        Registers a source.
+
+        Args:
+            decode: Callable returning a DecodedSheet (accepts a 'prepare' keyword); safe to run off the main thread.
+            finalize: Callable turning the DecodedSheet into the frame list on the main thread.
+        """
+        self.discard(name)
+        self._decoders[name] = decode
+        self._finalizers[name] = finalize or finalize_frames
+
+    def __contains__(self, name):
+        return name in self._decoders
+
+    def __getitem__(self, name):
+        frames = self._resident.get(name)
+        if frames is not None:
+            self._resident.move_to_end(name)
+            self.stats["hits"] += 1
+            return frames
+
+        return self.install(name, self.decode(name))
+
+    def __setitem__(self, name, frames):
+        """Registers an already-loaded frame list (it still counts towards the budget)."""
+        self.register(name, decode=lambda prepare=False: DecodedSheet(frames, False, False, False))
+        self[name]
+
+    def keys(self):
+        return self._decoders.keys()
+
+    def decode(self, name, prepare=False):
+        """Runs the thread-safe decode stage of a source and returns its DecodedSheet."""
+        return self._decoders[name](prepare=prepare)
+
+    def install(self, name, decoded):
+        """Finalizes a decoded source on the main thread and makes it resident."""
+        if name in self._resident:
+            # Already loaded synchronously while the decode was in flight
+            return self[name]
+
+        frames = self._finalizers[name](decoded)
+        self.stats["loads"] += 1
+        self._resident[name] = frames
+        self._sizes[name] = frames_nbytes(frames)
+        self.resident_bytes += self._sizes[name]
+        self._enforce_budget(keep=name)
+        print(f"DEBUG: Loaded animation '{name}', resident {self.resident_bytes / (1024 * 1024):.1f} MB", flush=True)
+        return frames
+
+    def is_resident(self, name):
+        return name in self._resident
+
+    def set_playing(self, name):
+        """Protects the source being played from eviction; the previously played one becomes evictable again."""
+        self.playing = name
+        self._enforce_budget(keep=name)
+
+    def resident_names(self):
+        return list(self._resident)
+
+    def discard(self, name):
+        """Drops the resident frames of a source (it will be reloaded on the next request)."""
+        if name in self._resident:
+            del self._resident[name]
+            self.resident_bytes -= self._sizes.pop(name)
+
+    def evict_unpinned(self):
+        """Drops every resident source that is not pinned."""
+        for name in [n for n in self._resident if n not in self.pinned and n != self.playing]:
+            self.discard(name)
+            self.stats["evictions"] += 1
+
+    def summary(self):
+        budget = f"{self.memory_budget_bytes / (1024 * 1024):.0f} MB" if self.memory_budget_bytes is not None else "none"
+        return (f"resident {self.resident_bytes / (1024 * 1024):.1f} MB (budget {budget}, {len(self._resident)} sheets), "
+                f"loads {self.stats['loads']}, hits {self.stats['hits']}, evictions {self.stats['evictions']}")
+
+    def _enforce_budget(self, keep):
+        if self.memory_budget_bytes is None:
+            return
+
+        for name in list(self._resident):
+            if self.resident_bytes <= self.memory_budget_bytes:
+                break
+            if name == keep or name == self.playing or name in self.pinned:
+                continue
+            self.discard(name)
+            self.stats["evictions"] += 1
+
+
 class AnimationController:
     """
     Manages multiple animation sequences, handles frame indexing, looping rules,
@@ -157,12 +389,14 @@ class AnimationController:
         Initializes the controller with loaded frames and frame ranges.
 
         Args:
-            animations_data (dict): Mapping animation source keys (e.g., 'idle', 'drag_A_frames') to lists of frames.
+            animations_data (dict or LazyAnimationRegistry): Mapping animation source keys
+                (e.g., 'idle', 'drag_A_frames') to lists of frames.
             animation_ranges (dict): Mapping sequence names (e.g., 'idle', 'drag_A_start') to (start, end) frame indices.
         """
         self.animations = animations_data
         self.animation_ranges = animation_ranges
         self.current_sequence_name = None
+        self.current_source_name = None  # Frame source of the current sequence (e.g. 'drag_A_frames')
 
         # Run-time State
         self.current_frames = []
@@ -175,6 +409,9 @@ class AnimationController:
         self.is_finished = False
         self.next_sequence_on_finish = None  # Name of the sequence to switch to after a one-shot finishes
 
+        # Time-to-first-frame of recent transitions (ms), per sequence name
+        self.first_frame_ms = {}
+
     def set_animation(self, sequence_name, next_sequence=None):
         """
         Switches to a new animation sequence and resets index and playback state.
@@ -210,10 +447,15 @@ class AnimationController:
         if not rule or frame_source_name not in self.animations:
             return
 
-        # 2. Update Frame List and Range
+        # 2. Update Frame List and Range (a lazy registry decodes the sheet on first use)
+        transition_start = time.perf_counter()
         self.current_sequence_name = sequence_name
+        self.current_source_name = frame_source_name
         self.current_frames = self.animations[frame_source_name]
         self.total_frames = len(self.current_frames)
+        if isinstance(self.animations, LazyAnimationRegistry):
+            # Keep the sheet resident (and counted) while it plays
+            self.animations.set_playing(frame_source_name)
 
         # Get playback range from ranges dictionary
         if sequence_name in self.animation_ranges:
@@ -238,6 +480,11 @@ class AnimationController:
         # Save the next sequence name for transition
         self.next_sequence_on_finish = next_sequence
 
+        # Time-to-first-frame: sheet lookup/decode plus materialising the first frame
+        self.get_current_frame()
+        elapsed_ms = (time.perf_counter() - transition_start) * 1000
+        self.first_frame_ms.setdefault(sequence_name, deque(maxlen=50)).append(elapsed_ms)
+
     def update_frame(self):
         """
         Updates the animation frame index for the current sequence based on its rule.
@@ -277,6 +524,14 @@ class AnimationController:
             self.current_index = float(self.start_frame + 1) if self.end_frame > self.start_frame else float(
                 self.start_frame)
 
+    def first_frame_summary(self):
+        """Median / max time-to-first-frame (ms) of the recent transitions, per sequence."""
+        parts = []
+        for name, samples in sorted(self.first_frame_ms.items()):
+            values = sorted(samples)
+            parts.append(f"{name} {values[len(values) // 2]:.1f}/{values[-1]:.1f}")
+        return f"median/max ms: {', '.join(parts)}" if parts else "no transitions"
+
     def get_current_frame(self):
         """Returns the current Pygame Surface frame."""
         if not self.current_frames:
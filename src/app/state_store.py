@@ -0,0 +1,215 @@
+# state_store.py
+# Crash-safe key/value store for user_data: JSON snapshot + append-only write-ahead journal.
+
+import json
+import os
+import struct
+import zlib
+from typing import Dict, Any
+
+# Journal record: header (payload length, CRC32 of payload) + compact JSON object of changed keys
+RECORD_HEADER = struct.Struct("<II")
+MAX_RECORD_BYTES = 1 << 20  # Anything larger is treated as corruption
+
+# Compact (rewrite the snapshot and empty the journal) once the journal grows past either limit
+COMPACT_JOURNAL_BYTES = 64 * 1024
+COMPACT_JOURNAL_RECORDS = 1000
+
+_MISSING = object()
+
+
+def write_json_atomic(path: str, data: Dict[str, Any], write=None):
+    """
+    原子写入 JSON：先写入同目录下的临时文件并 fsync，再用 os.replace 替换目标文件。
+    任何时刻磁盘上要么是旧文件，要么是完整的新文件。
+
+    Args:
+        write: 可选的 write(f, data) 函数，替代 f.write（供故障注入使用）。
+    """
+    payload = json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8')
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        if write is not None:
+            write(f, payload)
+        else:
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def encode_record(changes: Dict[str, Any]) -> bytes:
+    payload = json.dumps(changes, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_records(data: bytes):
+    """
+    Parses journal bytes.
+
+    Returns:
+        tuple: (list of change dicts, length of the valid prefix). Parsing stops at the first
+               torn or corrupt record; everything after it is not trusted.
+    """
+    records = []
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        length, crc = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        end = start + length
+        if length > MAX_RECORD_BYTES or end > len(data):
+            break
+        payload = data[start:end]
+        if zlib.crc32(payload) != crc:
+            break
+        try:
+            changes = json.loads(payload.decode('utf-8'))
+        except ValueError:
+            break
+        if not isinstance(changes, dict):
+            break
+        records.append(changes)
+        offset = end
+    return records, offset
+
+
+class JournaledStateStore:
+    """
+    Persistent dict of user state (window position, reading progress, rest settings).
+
+    - Snapshot: the familiar user_data.json, only ever replaced atomically (temp file + rename).
+    - Journal: user_data.journal, append-only records holding just the keys that changed,
+      each framed with its length and CRC32 and fsynced.
+
+    On startup the snapshot is loaded and the journal replayed up to the last intact record;
+    a torn tail from a crash mid-append is cut off. Records hold absolute values, so replaying
+    a journal that was already folded into the snapshot (crash during compaction) is harmless.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.journal_path = os.path.splitext(path)[0] + ".journal"
+        self.state = {}
+        self.journal_bytes = 0
+        self.journal_records = 0
+        self.stats = {"appends": 0, "unchanged": 0, "compactions": 0, "recovered_records": 0, "discarded_bytes": 0}
+        self._journal = None
+        self.loaded = False
+
+    # ------------------------------------------------------------------
+    # Low-level file access (overridden by the fault-injection tool)
+    # ------------------------------------------------------------------
+
+    def _write_bytes(self, f, data: bytes):
+        f.write(data)
+
+    def _truncate_journal(self):
+        """Empties the journal after its records were folded into the snapshot."""
+        self._close_journal()
+        with open(self.journal_path, 'wb') as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_bytes = 0
+        self.journal_records = 0
+
+    def _rollback_append(self):
+        self._close_journal()
+        try:
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(self.journal_bytes)
+        except OSError:
+            pass  # Recovery on the next load() drops the torn record anyway
+
+    # ------------------------------------------------------------------
+
+    def load(self) -> Dict[str, Any]:
+        """Recovers the latest consistent state from the snapshot and the journal."""
+        state = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    loaded = json.load(f)
+                if isinstance(loaded, dict):
+                    state = loaded
+            except (OSError, ValueError) as e:
+                print(f"WARNING: Could not read {self.path}: {e}")
+
+        data = b""
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb') as f:
+                data = f.read()
+
+        records, valid_length = decode_records(data)
+        for changes in records:
+            state.update(changes)
+
+        if valid_length < len(data):
+            # Torn / corrupt tail from an interrupted append: drop it so new records follow valid ones
+            discarded = len(data) - valid_length
+            print(f"WARNING: Discarding {discarded} bytes of incomplete journal data in {self.journal_path}")
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(valid_length)
+                f.flush()
+                os.fsync(f.fileno())
+            self.stats["discarded_bytes"] += discarded
+
+        self.state = state
+        self.loaded = True
+        self.journal_bytes = valid_length
+        self.journal_records = len(records)
+        self.stats["recovered_records"] += len(records)
+        return dict(state)
+
+    def update(self, values: Dict[str, Any]) -> bool:
+        """
+        Persists the keys of values that differ from the stored state (one journal record).
+
+        Returns:
+            bool: True if anything was written.
+        """
+        changes = {key: value for key, value in values.items() if self.state.get(key, _MISSING) != value}
+        if not changes:
+            self.stats["unchanged"] += 1
+            return False
+
+        record = encode_record(changes)
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'ab')
+        try:
+            self._write_bytes(self._journal, record)
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        except Exception:
+            # Failed append (e.g. disk full): cut the partial record off so later appends stay readable
+            self._rollback_append()
+            raise
+
+        self.state.update(changes)
+        self.journal_bytes += len(record)
+        self.journal_records += 1
+        self.stats["appends"] += 1
+
+        if self.journal_bytes >= COMPACT_JOURNAL_BYTES or self.journal_records >= COMPACT_JOURNAL_RECORDS:
+            self.compact()
+        return True
+
+    def compact(self):
+        """Writes the full state as a new snapshot, then empties the journal."""
+        if not self.journal_records and os.path.exists(self.path):
+            return
+        self._close_journal()
+        write_json_atomic(self.path, self.state, write=self._write_bytes)
+        self._truncate_journal()
+        self.stats["compactions"] += 1
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def close(self):
+        """Folds the journal into the snapshot (so user_data.json is complete) and closes files."""
+        if self.journal_records:
+            self.compact()
+        self._close_journal()
+
@@ -0,0 +1,99 @@
+# story_cache.py
+# On-disk cache of fetched stories, keyed by index, with TTL and ETag revalidation.
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from state_store import write_json_atomic
+
+STORY_CACHE_DIR_NAME = "story_cache"
+# Stories rarely change once uploaded: serve from disk without asking the server for this long
+STORY_CACHE_TTL_SECONDS = 24 * 3600
+
+
+class StoryCache:
+    """
+    One JSON file per story index: {"story": {...}, "etag": "...", "fetched_at": <unix time>}.
+
+    - Fresh entries (younger than ttl_seconds) are served without any network request.
+    - Stale entries are revalidated with If-None-Match; a 304 only refreshes fetched_at.
+    - When the server is unreachable, stale entries are still served (offline mode).
+
+    Files are written atomically, and the in-memory copy is shared by the fetch threads (guarded by a lock).
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float = STORY_CACHE_TTL_SECONDS):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+        # hits: served fresh from disk, revalidated: 304 Not Modified, misses: full download,
+        # offline: stale entry served because the network failed
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "offline": 0}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, index) -> str:
+        return os.path.join(self.directory, f"{index}.json")
+
+    def get(self, index) -> Optional[Dict[str, Any]]:
+        """Returns the cache entry of index (fresh or stale), or None."""
+        key = str(index)
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+            entry = None
+            try:
+                with open(self._path(key), 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                if not isinstance(entry, dict) or not isinstance(entry.get("story"), dict):
+                    entry = None
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                print(f"WARNING: Ignoring unreadable story cache entry {key}: {e}")
+            self._entries[key] = entry
+            return entry
+
+    def is_fresh(self, entry: Dict[str, Any], now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return now - entry.get("fetched_at", 0) < self.ttl_seconds
+
+    def put(self, index, story: Dict[str, Any], etag: Optional[str] = None):
+        """Stores a freshly downloaded story."""
+        self._store(str(index), {"story": story, "etag": etag, "fetched_at": time.time()})
+
+    def touch(self, index):
+        """The server answered 304 Not Modified: the cached copy is fresh again."""
+        entry = self.get(index)
+        if entry is not None:
+            self._store(str(index), dict(entry, fetched_at=time.time()))
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            try:
+                write_json_atomic(self._path(key), entry)
+            except OSError as e:
+                # The in-memory copy still serves this session
+                print(f"WARNING: Could not write story cache entry {key}: {e}")
+
+    def record(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def hit_rate(self) -> Optional[float]:
+        """Share of lookups answered without downloading the story (None before the first lookup)."""
+        total = sum(self.stats.values())
+        if not total:
+            return None
+        return (total - self.stats["misses"]) / total
+
+    def summary(self) -> str:
+        rate = self.hit_rate()
+        rate = f"{rate:.0%}" if rate is not None else "n/a"
+        s = self.stats
+        return (f"hit rate {rate} (fresh {s['hits']}, revalidated {s['revalidated']}, "
+                f"offline {s['offline']}, downloaded {s['misses']})")
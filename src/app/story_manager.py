@@ -3,15 +3,87 @@
 import requests
 import threading
 import sys
-from typing import Dict
+from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from io_service import IOService
+from message_bus import StoryResult
+
+# Connection pool / retry defaults (overridable via http_pool_size, http_max_retries, http_backoff_factor)
+HTTP_POOL_SIZE = 4
+HTTP_MAX_RETRIES = 2
+HTTP_BACKOFF_FACTOR = 0.5
+# Transient statuses worth retrying; the story API's GET and POST (set index -> data) are both idempotent
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+REQUEST_TIMEOUT = 5
+# Indices per batch request (the backend accepts up to 100)
+BATCH_SIZE = 50
+REQUIRED_STORY_FIELDS = ('title', 'author', 'content')
+
+
+def is_valid_story(story_data) -> bool:
+    return isinstance(story_data, dict) and all(key in story_data for key in REQUIRED_STORY_FIELDS)
+
+
+def format_index_list(indices) -> str:
+    """把索引列表压缩成后端的批量参数格式，例如 [1, 2, 3, 5] -> "1-3,5"。"""
+    parts = []
+    run_start = run_end = None
+    for index in sorted(set(int(i) for i in indices)):
+        if run_end is not None and index == run_end + 1:
+            run_end = index
+            continue
+        if run_start is not None:
+            parts.append(str(run_start) if run_start == run_end else f"{run_start}-{run_end}")
+        run_start = run_end = index
+    if run_start is not None:
+        parts.append(str(run_start) if run_start == run_end else f"{run_start}-{run_end}")
+    return ",".join(parts)
+
+
+def create_session(pool_size=HTTP_POOL_SIZE, max_retries=HTTP_MAX_RETRIES, backoff_factor=HTTP_BACKOFF_FACTOR):
+    """
+    创建带连接池的 keep-alive 会话：同一主机的 TCP/TLS 连接在请求之间复用，
+    连接错误和临时性的 5xx / 429 按指数退避重试。
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False,  # 重试用尽后返回最后一个响应，由调用方按状态码处理
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 
 class StoryManager:
-    def __init__(self, pet_context, base_url, pathname):
+    def __init__(self, pet_context, base_url, pathname, pool_size=HTTP_POOL_SIZE,
+                 max_retries=HTTP_MAX_RETRIES, backoff_factor=HTTP_BACKOFF_FACTOR, cache=None, io_service=None):
         self.pet = pet_context
         self.base_url = base_url
         self.pathname = pathname
         self.full_url = f"{self.base_url}{self.pathname}"
         self.last_read_index = 0
+        # 所有请求（包括后台线程）共用一个会话，urllib3 连接池本身是线程安全的
+        self.session = create_session(pool_size, max_retries, backoff_factor)
+        # 可选的本地故事缓存（StoryCache）；上传脚本等工具不需要缓存
+        self.cache = cache
+        # 后台 I/O 工作池（由 DesktopPet 持有并在 cleanup 中关闭）；未传入时自建一个
+        self._owns_io = io_service is None
+        self.io = io_service if io_service is not None else IOService()
+        # 预取中的故事：story_id -> IOTask
+        self._prefetches = {}
+        self._prefetch_lock = threading.Lock()
+
+    def close(self):
+        """关闭会话，释放连接池中的 keep-alive 连接（自建的 I/O 工作池一并关闭）。"""
+        if self._owns_io:
+            self.io.shutdown()
+        self.session.close()
 
     def get_next_story_id(self):
         """
@@ -23,12 +95,30 @@ class StoryManager:
     def fetch_story_sync(self, index) -> Dict:
         """
         同步调用 Web GET API 获取指定索引的数据。
+
+        有本地缓存时：未过期的条目直接返回，不发请求；过期条目带 If-None-Match 重新验证（304 即沿用缓存）；
+        网络不可用或服务端出错时退回到缓存中的旧条目。
         """
+        entry = self.cache.get(index) if self.cache else None
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.record("hits")
+            return entry["story"]
+
         try:
             params = {'index': index}
-            response = requests.get(self.full_url, params=params, timeout=5)
+            headers = {}
+            if entry is not None and entry.get("etag"):
+                headers['If-None-Match'] = entry["etag"]
+            response = self.session.get(self.full_url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+
+            if response.status_code == 304 and entry is not None:
+                self.cache.touch(index)
+                self.cache.record("revalidated")
+                return entry["story"]
 
             if response.status_code == 200:
+                if self.cache:
+                    self.cache.record("misses")
                 raw_content = response.text
                 try:
                     # 方法1: 先尝试标准的JSON解析
@@ -45,50 +135,183 @@ class StoryManager:
                         return None
 
                 # 验证必要的字段是否存在
-                if isinstance(story_data, dict) and all(key in story_data for key in ['title', 'author', 'content']):
-
+                if is_valid_story(story_data):
+                    if self.cache:
+                        self.cache.put(index, story_data, response.headers.get('ETag'))
                     return story_data
                 else:
                     print("ERROR: Response missing required fields or not a dict")
                     return None
             else:
                 print(f"ERROR: Failed to fetch story. Status: {response.status_code}")
+                if response.status_code >= 500:
+                    return self._serve_cached(index, entry)
                 return None
 
         except requests.exceptions.RequestException as e:
             print(f"ERROR: Network error during story fetch: {e}")
-            return None
+            return self._serve_cached(index, entry)
 
-    def fetch_story_async(self, story_id):
+    def fetch_stories_many(self, indices) -> Dict[int, Dict]:
         """
-        在後台執行緒中異步執行網路請求，並將結果放入主執行緒隊列。
+        批量获取多个索引的数据（每 BATCH_SIZE 个索引一次 GET 请求）。
+        缓存中未过期的条目不再请求；网络不可用时退回到缓存中的旧条目。
 
-        這是修改後的邏輯：後台執行緒只負責網路I/O，並將結果放入 pet._tk_queue。
-        主執行緒的 _process_queue 方法將會輪詢並處理這個結果。
+        Returns:
+            dict: {index: story_data}，获取失败或不存在的索引不在结果中。
         """
+        stories = {}
+        stale_entries = {}
+        for index in dict.fromkeys(int(i) for i in indices):
+            entry = self.cache.get(index) if self.cache else None
+            if entry is not None and self.cache.is_fresh(entry):
+                self.cache.record("hits")
+                stories[index] = entry["story"]
+            else:
+                stale_entries[index] = entry
 
-        def target():
-            # 1. 異步調用 StoryManager 的獲取邏輯 (在後台執行緒中)
-            story_data_or_error = self.fetch_story_sync(story_id)
+        missing = list(stale_entries)
+        for start in range(0, len(missing), BATCH_SIZE):
+            chunk = missing[start:start + BATCH_SIZE]
+            if len(chunk) == 1:
+                # 单个索引没有 "," 或 "-"，后端会按单条请求返回故事本身（不是 {stories, etags}）：
+                # 直接走单条获取（过期条目带 ETag 重新验证，离线时退回缓存）
+                story_data = self.fetch_story_sync(chunk[0])
+                if story_data is not None:
+                    stories[chunk[0]] = story_data
+                continue
+            fetched = self._fetch_batch(chunk)
+            if fetched is None:
+                # 网络错误：逐个退回到缓存
+                for index in chunk:
+                    story_data = self._serve_cached(index, stale_entries[index])
+                    if story_data is not None:
+                        stories[index] = story_data
+            else:
+                stories.update(fetched)
+        return stories
 
-            is_successful = isinstance(story_data_or_error, dict)
-            payload = story_data_or_error
+    def _fetch_batch(self, indices) -> Optional[Dict[int, Dict]]:
+        """一次批量 GET（至少两个索引）。网络错误或服务端错误时返回 None。"""
+        try:
+            params = {'index': format_index_list(indices)}
+            response = self.session.get(self.full_url, params=params, timeout=REQUEST_TIMEOUT)
 
-            # 2. 構造隊列項
-            # 結構: ("story_result", is_successful, payload, story_id)
-            queue_item = ("story_result", is_successful, payload, story_id)
+            if response.status_code != 200:
+                print(f"ERROR: Failed to fetch stories {params['index']}. Status: {response.status_code}")
+                return None if response.status_code >= 500 else {}
 
-            # 3. 關鍵：直接將結果放入線程安全的隊列
             try:
-                # 使用 self.pet._tk_queue，這是 DesktopPet 實例中的 Queue 物件
-                self.pet._tk_queue.put(queue_item)
+                body = response.json()
+                batch, etags = body["stories"], body.get("etags", {})
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"ERROR: Invalid batch response: {e}")
+                return {}
+
+            stories = {}
+            for key, story_data in batch.items():
+                if not is_valid_story(story_data):
+                    print(f"ERROR: Story {key} missing required fields or not a dict")
+                    continue
+                index = int(key)
+                stories[index] = story_data
+                if self.cache:
+                    self.cache.put(index, story_data, etags.get(key))
+            if self.cache:
+                for _ in indices:
+                    self.cache.record("misses")
+            return stories
+
+        except requests.exceptions.RequestException as e:
+            print(f"ERROR: Network error during batch story fetch: {e}")
+            return None
+
+    def _serve_cached(self, index, entry):
+        """离线兜底：返回缓存中的旧条目（即使已过期），没有则返回 None。"""
+        if entry is None:
+            if self.cache:
+                self.cache.record("misses")
+            return None
+        print(f"DEBUG: Serving cached story {index} while offline")
+        self.cache.record("offline")
+        return entry["story"]
+
+    def _story_task(self, story_id):
+        """提交（或複用進行中的）獲取任務：同一個 story_id 同時只有一個請求。"""
+        return self.io.submit(("story", story_id), self.fetch_story_sync, story_id)
+
+    def fetch_story_async(self, story_id):
+        """
+        在 I/O 工作執行緒中異步執行網路請求，並將結果放入主執行緒隊列。
+
+        後台執行緒只負責網路I/O，並將結果 (StoryResult) 發送到 pet.bus。
+        主循環被喚醒後在同一幀內由 MessageBus.dispatch 處理這個結果。
+        已有預取（或相同 ID 的請求）時直接複用它，不重複請求。
+
+        Returns:
+            IOTask: 可用於取消的任務句柄（與同 ID 的其他請求共享；取消後結果不會再發送）。
+        """
+        # 1. 複用預取任務，否則提交新任務 (在 I/O 工作執行緒中執行)
+        with self._prefetch_lock:
+            task = self._prefetches.pop(story_id, None)
+        if task is None:
+            task = self._story_task(story_id)
+
+        def deliver(story_data_or_error):
+            # 2. 構造類型化的消息（payload: 故事字典，或失敗時的錯誤信息）
+            message = StoryResult(
+                is_successful=isinstance(story_data_or_error, dict),
+                payload=story_data_or_error,
+                story_id=story_id,
+            )
+
+            # 3. 關鍵：發送到線程安全的消息總線，並喚醒主循環
+            try:
+                self.pet.bus.post(message)
             except Exception as e:
-                # 只有在隊列對象無效時才會失敗
-                print(f"ERROR: [Async Thread] Failed to push result to queue: {e}", file=sys.stderr, flush=True)
+                # 只有在總線對象無效時才會失敗
+                print(f"ERROR: [Async Thread] Failed to post result to the message bus: {e}", file=sys.stderr, flush=True)
+
+        task.add_done_callback(deliver)
+        return task
+
+    def prefetch(self, story_id):
+        """
+        在後台提前獲取故事（例如釣魚動畫播放期間），結果由 take_prefetched 或 fetch_story_async 取走。
+        同一個 story_id 只會有一個進行中的請求。
+        """
+        with self._prefetch_lock:
+            if story_id not in self._prefetches:
+                self._prefetches[story_id] = self._story_task(story_id)
+
+    def take_prefetched(self, story_id):
+        """
+        取走已完成的預取結果（主執行緒調用，不阻塞）。
+
+        Returns:
+            tuple: (ready, story_data)。預取未完成、不存在或失敗時 ready 為 False，
+                   調用方應改用 fetch_story_async（未完成的預取會被複用）。
+        """
+        with self._prefetch_lock:
+            task = self._prefetches.get(story_id)
+            if task is None or not task.done():
+                return False, None
+            del self._prefetches[story_id]
+        story_data = task.result()
+        if not isinstance(story_data, dict):
+            # 預取失敗（網絡中斷等），讓調用方重新獲取一次
+            return False, None
+        return True, story_data
 
-        thread = threading.Thread(target=target)
-        thread.daemon = True
-        thread.start()
+    def prefetch_many(self, indices):
+        """
+        在後台用批量請求把多個故事預先寫入本地緩存（例如整條狐狸故事線），之後的獲取直接命中緩存。
+        沒有緩存時無事可做，返回 None。
+        """
+        if not self.cache:
+            return None
+        indices = tuple(sorted(set(int(i) for i in indices)))
+        return self.io.submit(("stories", indices), self.fetch_stories_many, indices)
 
     def write_data_sync(self, index, data):
         """
@@ -107,10 +330,10 @@ class StoryManager:
                 "data": data
             }
             # POST 请求不需要 URL 参数，数据在 JSON body 中
-            response = requests.post(
+            response = self.session.post(
                 self.full_url,
                 json=json_payload,
-                timeout=5,
+                timeout=REQUEST_TIMEOUT,
                 headers={'Content-Type': 'application/json'}  # 显式设置 content-type
             )
 
@@ -123,4 +346,35 @@ class StoryManager:
 
         except requests.exceptions.RequestException as e:
             print(f"ERROR: Network error during data write: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def write_data_many(self, items: Dict) -> Optional[str]:
+        """
+        批量写入数据（每 BATCH_SIZE 条一次 POST，服务端按批原子写入）。
+
+        Args:
+            items (dict): {index: data}。
+
+        Returns:
+            str: 各批次 API 返回信息（按行拼接）；任一批次失败返回 None。
+        """
+        entries = [{"index": str(index), "data": data} for index, data in items.items()]
+        replies = []
+        for start in range(0, len(entries), BATCH_SIZE):
+            chunk = entries[start:start + BATCH_SIZE]
+            try:
+                response = self.session.post(
+                    self.full_url,
+                    json=chunk,
+                    timeout=REQUEST_TIMEOUT,
+                    headers={'Content-Type': 'application/json'}
+                )
+            except requests.exceptions.RequestException as e:
+                print(f"ERROR: Network error during batch data write: {e}")
+                return None
+
+            if response.status_code != 200:
+                print(f"ERROR: Failed to write data batch. Status: {response.status_code}")
+                return None
+            replies.append(response.text)
+        return "\n".join(replies)
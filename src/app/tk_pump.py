@@ -0,0 +1,94 @@
+# tk_pump.py
+# Runs Tk's event loop from inside the pygame main loop: only when Tk has work, and within a time budget per frame.
+
+import time
+import tkinter
+from tkinter import _tkinter
+
+# Tk work allowed per frame (ms); what is left over is handled on the next frame
+TK_BUDGET_MS = 4
+# Without visible Tk windows the hidden root is still pumped this often (its after() timers)
+TK_IDLE_PUMP_MS = 250
+
+
+class TkPump:
+    """
+    Replaces the per-frame tk_root.update_idletasks() + tk_root.update().
+
+    - While a Tk window (settings, story prompt) is visible, Tk is pumped on every frame, and the
+      main loop wakes at least every window_interval_ms so the window stays responsive even when
+      the pet itself is idle.
+    - Without visible windows only every idle_interval_ms (ms_until_next_pump() bounds the idle wait).
+    - A pump handles one Tcl event at a time (Tcl_DoOneEvent with TCL_DONT_WAIT) until Tk has nothing
+      pending or budget_ms is used up; the rest is picked up on the next frame (see backlog), so a burst
+      of redraws is spread over several frames instead of stalling the sprite animation.
+      A single event that is slower than the budget still runs to completion.
+    """
+
+    def __init__(self, root, budget_ms=TK_BUDGET_MS, idle_interval_ms=TK_IDLE_PUMP_MS, window_interval_ms=66):
+        self.root = root
+        self.budget = budget_ms / 1000
+        self.idle_interval = idle_interval_ms / 1000
+        self.window_interval_ms = window_interval_ms
+        self.windows_visible = False
+        self.backlog = False  # The last pump ran out of budget with events still pending
+        self._next_idle_pump = 0.0
+        self.stats = {"pumps": 0, "skipped": 0, "events": 0, "over_budget": 0}
+        self._busy_seconds = 0.0
+
+    def _count_visible_windows(self):
+        """Mapped Toplevels of the root. root.children is a plain dict: no Tcl call while no window exists."""
+        visible = 0
+        for child in list(self.root.children.values()):
+            try:
+                if child.winfo_viewable():
+                    visible += 1
+            except tkinter.TclError:
+                # Destroyed between the lookup and the query
+                pass
+        return visible
+
+    def pump(self):
+        """
+        Processes pending Tk events if it is time to.
+
+        Returns:
+            int: Number of Tcl events handled (0 when the pump was skipped or Tk had nothing to do).
+        """
+        now = time.perf_counter()
+        self.windows_visible = self._count_visible_windows() > 0
+        if not (self.windows_visible or self.backlog) and now < self._next_idle_pump:
+            self.stats["skipped"] += 1
+            return 0
+
+        self._next_idle_pump = now + self.idle_interval
+        deadline = now + self.budget
+        processed = 0
+        self.backlog = False
+        try:
+            while self.root.tk.dooneevent(_tkinter.DONT_WAIT):
+                processed += 1
+                if time.perf_counter() >= deadline:
+                    self.backlog = True
+                    self.stats["over_budget"] += 1
+                    break
+        except tkinter.TclError:
+            # Ignore common Tkinter errors that occur when the root window is destroyed
+            pass
+
+        self.stats["pumps"] += 1
+        self.stats["events"] += processed
+        self._busy_seconds += time.perf_counter() - now
+        return processed
+
+    def ms_until_next_pump(self):
+        """Upper bound for the main loop's idle wait, so Tk is served while the pet is idle."""
+        if self.windows_visible or self.backlog:
+            return self.window_interval_ms
+        return max(0.0, (self._next_idle_pump - time.perf_counter()) * 1000)
+
+    def summary(self):
+        pumps = self.stats["pumps"]
+        mean_ms = self._busy_seconds / pumps * 1000 if pumps else 0.0
+        return (f"{pumps} pumps ({mean_ms:.2f} ms mean), {self.stats['skipped']} skipped, "
+                f"{self.stats['events']} Tk events, {self.stats['over_budget']} over budget")
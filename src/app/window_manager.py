@@ -1,11 +1,12 @@
 # window_manager.py
+# Windows-only (ctypes.windll, pywin32): imported lazily through platform_backend.Win32Backend
 
 import ctypes
-from ctypes import Structure, c_short, c_long, c_byte, c_uint, c_int, byref, c_void_p
+from ctypes import Structure, c_short, c_long, c_byte, c_uint, c_int, c_uint8, byref, c_void_p, POINTER
 import numpy as np
-import pygame
 import win32con
 import win32gui
+from pixel_ops import surface_bgra_view, premultiply_into
 
 # === Windows API References ===
 user32 = ctypes.windll.user32
@@ -24,6 +25,18 @@ class BLENDFUNCTION(Structure):
     _fields_ = [("BlendOp", c_byte), ("BlendFlags", c_byte), ("SourceConstantAlpha", c_byte), ("AlphaFormat", c_byte)]
 
 
+class RECT(Structure):
+    _fields_ = [("left", c_long), ("top", c_long), ("right", c_long), ("bottom", c_long)]
+
+
+class UPDATELAYEREDWINDOWINFO(Structure):
+    _fields_ = [
+        ("cbSize", c_uint), ("hdcDst", c_void_p), ("pptDst", POINTER(POINT)), ("psize", POINTER(SIZE)),
+        ("hdcSrc", c_void_p), ("pptSrc", POINTER(POINT)), ("crKey", c_uint),
+        ("pblend", POINTER(BLENDFUNCTION)), ("dwFlags", c_uint), ("prcDirty", POINTER(RECT))
+    ]
+
+
 class BITMAPINFO(Structure):
     _fields_ = [
         ("biSize", c_uint), ("biWidth", c_int), ("biHeight", c_int),
@@ -38,88 +51,133 @@ ULW_ALPHA = 0x00000002
 AC_SRC_OVER = 0x00
 AC_SRC_ALPHA = 0x01
 
+# UpdateLayeredWindowIndirect (Vista+) accepts a dirty rectangle; older systems fall back to a full update
+_update_layered_window_indirect = getattr(user32, "UpdateLayeredWindowIndirect", None)
 
-def convert_to_bgra(surface):
-    """
-    Converts a Pygame Surface to BGRA byte data with pre-multiplied alpha,
-    which is required for UpdateLayeredWindow.
-    """
-    rgba_data = pygame.image.tostring(surface, "RGBA")
-    width, height = surface.get_size()
-
-    # Convert RGBA data to a NumPy array
-    arr = np.frombuffer(rgba_data, dtype=np.uint8).reshape(height, width, 4)
-
-    # Separate R, G, B, A channels
-    r, g, b, a = arr[..., 0], arr[..., 1], arr[..., 2], arr[..., 3]
-
-    # Critical: Pre-multiplied Alpha
-    a_f = a / 255.0
-    r_pre = (r * a_f).astype(np.uint8)
-    g_pre = (g * a_f).astype(np.uint8)
-    b_pre = (b * a_f).astype(np.uint8)
-
-    # Re-stack into BGRA order
-    bgra = np.dstack([b_pre, g_pre, r_pre, a])
-
-    return bgra.tobytes()
 
-
-def update_layered_window(hwnd, surface, window_x, window_y):
+class LayeredWindowPresenter:
     """
-    Updates the content and position of the layered window using UpdateLayeredWindow.
-    - hwnd: Window handle
-    - surface: Pygame Surface object
-    - window_x, window_y: Absolute screen coordinates of the window
+    Persistent UpdateLayeredWindow presenter.
+
+    The memory DC and 32-bit DIB section are created once per window size and kept
+    alive between frames; the DIB pixels are exposed as a NumPy view over ppv_bits,
+    so each frame is premultiplied straight from the surface buffer into the bitmap.
     """
-    width, height = surface.get_size()
-
-    hdc_screen = user32.GetDC(0)
-    hdc_mem = gdi32.CreateCompatibleDC(hdc_screen)
-
-    bmi = BITMAPINFO()
-    bmi.biSize = ctypes.sizeof(BITMAPINFO)
-    bmi.biWidth = width
-    bmi.biHeight = -height  # Negative height for top-down DIB
-    bmi.biPlanes = 1
-    bmi.biBitCount = 32
-    bmi.biCompression = 0
-
-    ppv_bits = c_void_p()
-    # Create DIB Section
-    hbitmap = gdi32.CreateDIBSection(hdc_screen, byref(bmi), 0, byref(ppv_bits), None, 0)
-    old_bitmap = gdi32.SelectObject(hdc_mem, hbitmap)
-
-    try:
-        # 1. Prepare BGRA data
-        bgra_data = convert_to_bgra(surface)
-
-        # 2. Copy data to DIB Section
-        ctypes.memmove(ppv_bits, bgra_data, width * height * 4)
-
-        # 3. Prepare Blend Function
-        blend = BLENDFUNCTION()
-        blend.BlendOp = AC_SRC_OVER
-        blend.SourceConstantAlpha = 255
-        blend.AlphaFormat = AC_SRC_ALPHA
-
-        # 4. Prepare size and position
-        size = SIZE(width, height)
-        src = POINT(0, 0)  # Starting point in the source DC
-        dst = POINT(window_x, window_y)  # Destination point on screen
 
-        # 5. Call the core Win32 function
-        user32.UpdateLayeredWindow(
-            hwnd, hdc_screen, byref(dst), byref(size),
-            hdc_mem, byref(src), 0, byref(blend), ULW_ALPHA
-        )
+    def __init__(self, hwnd):
+        self.hwnd = hwnd
+        self.size = None
+        self.pixels = None  # np.ndarray (h, w, 4) over the DIB section bits
+        self.allocations = 0
+        self.profiler = None  # Optional FrameProfiler: the pixel copy is charged to its "convert" stage
+
+        self._hdc_mem = None
+        self._hbitmap = None
+        self._old_bitmap = None
+        self._scratch = None
+
+        self._blend = BLENDFUNCTION()
+        self._blend.BlendOp = AC_SRC_OVER
+        self._blend.SourceConstantAlpha = 255
+        self._blend.AlphaFormat = AC_SRC_ALPHA
+
+    def _allocate(self, width, height):
+        """(Re)creates the memory DC and DIB section for a new window size."""
+        self.release()
+
+        hdc_screen = user32.GetDC(0)
+        try:
+            self._hdc_mem = gdi32.CreateCompatibleDC(hdc_screen)
+
+            bmi = BITMAPINFO()
+            bmi.biSize = ctypes.sizeof(BITMAPINFO)
+            bmi.biWidth = width
+            bmi.biHeight = -height  # Negative height for top-down DIB
+            bmi.biPlanes = 1
+            bmi.biBitCount = 32
+            bmi.biCompression = 0
+
+            ppv_bits = c_void_p()
+            self._hbitmap = gdi32.CreateDIBSection(hdc_screen, byref(bmi), 0, byref(ppv_bits), None, 0)
+            self._old_bitmap = gdi32.SelectObject(self._hdc_mem, self._hbitmap)
+        finally:
+            user32.ReleaseDC(0, hdc_screen)
+
+        bits = ctypes.cast(ppv_bits, POINTER(c_uint8))
+        self.pixels = np.ctypeslib.as_array(bits, shape=(height, width, 4))
+        self._scratch = np.empty((3, height, width), dtype=np.uint32)
+        self.size = (width, height)
+        self.allocations += 1
+
+    def present(self, surface, window_x, window_y, premultiplied=False, dirty_rect=None):
+        """
+        Copies the surface into the DIB section and updates the window.
+        Straight-alpha surfaces are premultiplied on the way; premultiplied ones are copied as-is.
+
+        With a dirty_rect (pygame.Rect) only that region is copied into the bitmap and handed to
+        UpdateLayeredWindowIndirect as prcDirty; the rest of the bitmap still holds the previous frame.
+        """
+        width, height = surface.get_size()
+        if self.size != (width, height):
+            self._allocate(width, height)
+            dirty_rect = None  # A fresh bitmap holds nothing yet
+
+        if dirty_rect is None:
+            rows, cols = slice(0, height), slice(0, width)
+        else:
+            rows, cols = slice(dirty_rect.top, dirty_rect.bottom), slice(dirty_rect.left, dirty_rect.right)
+
+        # Make sure GDI is done with the bitmap before writing to its bits
+        gdi32.GdiFlush()
+        source = surface_bgra_view(surface)[rows, cols]
+        if premultiplied:
+            np.copyto(self.pixels[rows, cols], source)
+        else:
+            premultiply_into(self.pixels[rows, cols], source, self._scratch[:, rows, cols])
+        del source
+        if self.profiler is not None:
+            self.profiler.mark("convert")
 
-    finally:
-        # Cleanup GDI objects
-        gdi32.SelectObject(hdc_mem, old_bitmap)
-        gdi32.DeleteObject(hbitmap)
-        gdi32.DeleteDC(hdc_mem)
-        user32.ReleaseDC(0, hdc_screen)
+        size = SIZE(width, height)
+        src = POINT(0, 0)
+        dst = POINT(window_x, window_y)
+
+        if dirty_rect is not None and _update_layered_window_indirect is not None:
+            dirty = RECT(dirty_rect.left, dirty_rect.top, dirty_rect.right, dirty_rect.bottom)
+            info = UPDATELAYEREDWINDOWINFO()
+            info.cbSize = ctypes.sizeof(UPDATELAYEREDWINDOWINFO)
+            info.hdcDst = None
+            info.pptDst = ctypes.pointer(dst)
+            info.psize = ctypes.pointer(size)
+            info.hdcSrc = self._hdc_mem
+            info.pptSrc = ctypes.pointer(src)
+            info.crKey = 0
+            info.pblend = ctypes.pointer(self._blend)
+            info.dwFlags = ULW_ALPHA
+            info.prcDirty = ctypes.pointer(dirty)
+            _update_layered_window_indirect(self.hwnd, byref(info))
+        else:
+            user32.UpdateLayeredWindow(
+                self.hwnd, None, byref(dst), byref(size),
+                self._hdc_mem, byref(src), 0, byref(self._blend), ULW_ALPHA
+            )
+
+    def move(self, window_x, window_y):
+        """Moves the window without touching its content (no source DC, no pixel copy)."""
+        dst = POINT(window_x, window_y)
+        user32.UpdateLayeredWindow(self.hwnd, None, byref(dst), None, None, None, 0, None, 0)
+
+    def release(self):
+        """Frees the GDI objects (called on resize and on shutdown)."""
+        if self._hdc_mem:
+            gdi32.SelectObject(self._hdc_mem, self._old_bitmap)
+            gdi32.DeleteObject(self._hbitmap)
+            gdi32.DeleteDC(self._hdc_mem)
+        self._hdc_mem = None
+        self._hbitmap = None
+        self._old_bitmap = None
+        self.pixels = None
+        self.size = None
 
 
 def setup_layered_window(hwnd, width, height, start_x, start_y):
@@ -152,6 +210,11 @@ def setup_layered_window(hwnd, width, height, start_x, start_y):
     print("✅ Desktop pet window configured: Always on top, transparent background, hidden from taskbar")
 
 
+def are_keys_down(*vk_codes):
+    """Whether all the given virtual keys are currently held (works without keyboard focus)."""
+    return all(user32.GetAsyncKeyState(vk) & 0x8000 for vk in vk_codes)
+
+
 def get_mouse_screen_pos():
     """Retrieves the absolute screen coordinates of the mouse cursor."""
     point = POINT()
@@ -176,4 +239,14 @@ def set_window_position(hwnd, x, y, width, height, is_topmost=False):
         x, y,
         width, height,
         flags | win32con.SWP_NOSIZE
-    )
\ No newline at end of file
+    )
+
+
+def set_topmost(hwnd, topmost=True):
+    """Puts the window into (or takes it out of) the topmost Z-order band without moving or resizing it."""
+    win32gui.SetWindowPos(
+        hwnd,
+        win32con.HWND_TOPMOST if topmost else win32con.HWND_NOTOPMOST,
+        0, 0, 0, 0,
+        win32con.SWP_NOMOVE | win32con.SWP_NOSIZE
+    )
@@ -0,0 +1,75 @@
+// deno-lint-ignore-file
+// 简单的 HTTP 压测脚本：固定并发数持续请求若干秒，输出 req/s、首字节时间 (TTFB) 和延迟分位数。
+// 用法: deno task load [url] [并发数] [秒数] [--revalidate] [--identity] [--range=0-65535]
+//   例: deno task load http://127.0.0.1:8000/pics/图片4.png 32 10
+//       deno task load "http://127.0.0.1:8000/stories?index=1" 32 10 --revalidate
+// 在修改前后的服务上各跑一次即可对比；也可以用 node 运行（Node 18+ 自带 fetch）。
+
+const args = globalThis.Deno ? Deno.args : process.argv.slice(2)
+const flags = args.filter((arg) => arg.startsWith('--'))
+const [url = 'http://127.0.0.1:8000/', concurrency = '16', seconds = '10'] = args.filter((arg) => !arg.startsWith('--'))
+// --revalidate: 带上首个响应的 ETag 发送 If-None-Match，测量 304 路径
+const revalidate = flags.includes('--revalidate')
+// --identity: 不接受压缩编码；--range=a-b: 只请求部分字节
+const identity = flags.includes('--identity')
+const range = flags.find((flag) => flag.startsWith('--range='))?.slice('--range='.length)
+
+const latencies = []
+const ttfbs = []
+let wireBytes = 0
+const statuses = {}
+let bytes = 0
+let etag = null
+
+const once = async () => {
+    const headers = revalidate && etag ? { 'If-None-Match': etag } : {}
+    if (identity) headers['Accept-Encoding'] = 'identity'
+    if (range) headers['Range'] = `bytes=${range}`
+    const start = performance.now()
+    // fetch 在收到响应头时返回
+    const response = await fetch(url, { headers })
+    ttfbs.push(performance.now() - start)
+    const body = new Uint8Array(await response.arrayBuffer())
+    latencies.push(performance.now() - start)
+    bytes += body.length
+    // 压缩响应的传输字节数（fetch 会自动解压）
+    wireBytes += Number(response.headers.get('Content-Length') ?? body.length)
+    statuses[response.status] = (statuses[response.status] ?? 0) + 1
+    etag ??= response.headers.get('ETag')
+}
+
+const worker = async (deadline) => {
+    while (performance.now() < deadline) {
+        try {
+            await once()
+        } catch (err) {
+            statuses.error = (statuses.error ?? 0) + 1
+        }
+    }
+}
+
+// 预热一次（拿到 ETag，并让服务端完成首次加载）
+await once()
+latencies.length = 0
+ttfbs.length = 0
+bytes = 0
+wireBytes = 0
+for (const key of Object.keys(statuses)) delete statuses[key]
+
+const started = performance.now()
+const deadline = started + Number(seconds) * 1000
+await Promise.all(Array.from({ length: Number(concurrency) }, () => worker(deadline)))
+const elapsed = (performance.now() - started) / 1000
+
+latencies.sort((a, b) => a - b)
+ttfbs.sort((a, b) => a - b)
+const percentile = (p, values = latencies) => values[Math.min(values.length - 1, Math.floor(values.length * p))] ?? 0
+console.log('-'.repeat(50))
+console.log(`${url}  (${concurrency} concurrent, ${seconds}s${revalidate ? ', If-None-Match' : ''}` +
+    `${identity ? ', identity' : ''}${range ? `, Range ${range}` : ''})`)
+console.log(`${(latencies.length / elapsed).toFixed(0)} req/s, ${(bytes / elapsed / 1024 / 1024).toFixed(1)} MiB/s decoded, ` +
+    `${(wireBytes / latencies.length / 1024).toFixed(1)} KiB/response on the wire`)
+console.log(`TTFB p50 ${percentile(0.5, ttfbs).toFixed(2)} ms, p99 ${percentile(0.99, ttfbs).toFixed(2)} ms`)
+console.log(`latency p50 ${percentile(0.5).toFixed(2)} ms, p99 ${percentile(0.99).toFixed(2)} ms`)
+console.log(`status ${JSON.stringify(statuses)}`)
+console.log('-'.repeat(50))
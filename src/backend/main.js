@@ -1,4 +1,5 @@
 // deno-lint-ignore-file
+import { brotliCompressSync, gzipSync } from 'node:zlib'
 // import { handleStaticFile } from './staticFile.js'
 // const config = JSON.parse(Deno.readTextFileSync('./src/backend/config.json'))
 const config = {
@@ -7,6 +8,158 @@ const config = {
 }
 const NotFound404 = () => new Response('404 Not Found', { status: 404 })
 
+// 整个进程共用一个 KV 句柄（首次使用时打开；打开失败时清掉，下一个请求重新打开）
+let kvPromise = null
+const getKv = () => {
+    kvPromise ??= Deno.openKv().catch((err) => {
+        kvPromise = null
+        throw err
+    })
+    return kvPromise
+}
+
+// 静态文件内存缓存：按总字节数限制（LRU 淘汰），用 mtime + size 校验文件是否变化
+const STATIC_CACHE_MAX_BYTES = 16 * 1024 * 1024
+// 超过这个大小的非文本文件不放进内存，直接从磁盘流式发送（pics/*.png 都在这之下，热点图片走内存更快）
+const STATIC_STREAM_BYTES = 1024 * 1024
+// 同一文件两次 stat 校验之间的最短间隔
+const STATIC_REVALIDATE_MS = 2000
+const staticCache = new Map() // filePath -> entry，Map 的插入顺序即 LRU 顺序
+let staticCacheBytes = 0
+
+// 简单的 MIME 类型映射
+const MIME_TYPES = {
+    html: 'text/html',
+    css: 'text/css',
+    js: 'application/javascript',
+    png: 'image/png',
+    jpg: 'image/jpg',
+    ico: 'image/x-icon',
+}
+// 文本资源：启动时预压缩为 brotli / gzip
+const COMPRESSIBLE = new Set(['html', 'css', 'js'])
+
+const entryBytes = (entry) =>
+    (entry.body?.length ?? 0) + (entry.encodings.br?.length ?? 0) + (entry.encodings.gzip?.length ?? 0)
+
+const evictStatic = (filePath) => {
+    const entry = staticCache.get(filePath)
+    if (!entry) return
+    staticCache.delete(filePath)
+    staticCacheBytes -= entryBytes(entry)
+}
+
+const touchStatic = (filePath, entry) => {
+    staticCache.delete(filePath)
+    staticCache.set(filePath, entry)
+    return entry
+}
+
+const loadStaticEntry = async (filePath) => {
+    const now = Date.now()
+    const cached = staticCache.get(filePath)
+    if (cached && now - cached.checkedAt < STATIC_REVALIDATE_MS) {
+        return touchStatic(filePath, cached)
+    }
+
+    const info = await Deno.stat(filePath)
+    if (!info.isFile) throw new Deno.errors.NotFound(filePath)
+    const mtime = info.mtime ? info.mtime.getTime() : 0
+    if (cached && cached.mtime === mtime && cached.size === info.size) {
+        cached.checkedAt = now
+        return touchStatic(filePath, cached)
+    }
+
+    evictStatic(filePath)
+    const ext = filePath.split('.').pop()
+    const compressible = COMPRESSIBLE.has(ext)
+    const streamed = !compressible && info.size > STATIC_STREAM_BYTES
+    const body = streamed ? null : await Deno.readFile(filePath)
+    const entry = {
+        body, // null: 从磁盘流式发送
+        encodings: compressible
+            ? { br: brotliCompressSync(body), gzip: gzipSync(body, { level: 9 }) }
+            : {},
+        etag: `"${info.size.toString(16)}-${mtime.toString(16)}"`,
+        mime: MIME_TYPES[ext ?? ''] || 'application/octet-stream',
+        // 页面本身每次都重新验证，其余资源允许浏览器缓存一小时
+        cacheControl: ext === 'html' ? 'no-cache' : 'public, max-age=3600',
+        mtime,
+        size: info.size,
+        checkedAt: now,
+    }
+    staticCache.set(filePath, entry)
+    staticCacheBytes += entryBytes(entry)
+    // 超出总量时淘汰最久未使用的文件
+    for (const key of staticCache.keys()) {
+        if (staticCacheBytes <= STATIC_CACHE_MAX_BYTES || key === filePath) break
+        evictStatic(key)
+    }
+    return entry
+}
+
+// 启动时把所有文本资源读入缓存并生成压缩版本，之后的请求不再压缩
+const precompressStatic = async (dir = config.staticpath) => {
+    for await (const item of Deno.readDir(dir)) {
+        const path = `${dir}/${item.name}`
+        if (item.isDirectory) {
+            await precompressStatic(path)
+        } else if (COMPRESSIBLE.has(item.name.split('.').pop())) {
+            await loadStaticEntry(path)
+        }
+    }
+}
+
+// 按 Accept-Encoding 选择压缩格式（br 优先，忽略 q=0 的项）
+const pickEncoding = (acceptEncoding, encodings) => {
+    const accepted = new Set(
+        (acceptEncoding ?? '').split(',')
+            .map((part) => part.trim().split(';'))
+            .filter(([, q]) => !q || !/^q=0(\.0*)?$/.test(q.trim()))
+            .map(([name]) => name.trim()),
+    )
+    if (encodings.br && accepted.has('br')) return 'br'
+    if (encodings.gzip && accepted.has('gzip')) return 'gzip'
+    return null
+}
+
+// 解析单个字节范围；多段范围不支持（返回 null，按完整响应处理），无法满足时返回 'invalid'
+const parseRange = (header, size) => {
+    const match = header?.match(/^bytes=(\d*)-(\d*)$/)
+    if (!match) return null
+    const [, first, last] = match
+    let start, end
+    if (first === '') {
+        if (last === '') return 'invalid'
+        start = Math.max(0, size - Number(last))
+        end = size - 1
+    } else {
+        start = Number(first)
+        end = last === '' ? size - 1 : Math.min(Number(last), size - 1)
+    }
+    if (start > end || start >= size) return 'invalid'
+    return { start, end }
+}
+
+// 只放行 length 个字节的流
+const limitStream = (length) => {
+    let remaining = length
+    return new TransformStream({
+        transform(chunk, controller) {
+            const part = chunk.subarray(0, remaining)
+            remaining -= part.length
+            controller.enqueue(part)
+            if (remaining <= 0) controller.terminate()
+        },
+    })
+}
+
+const openFileStream = async (filePath, start, length) => {
+    const file = await Deno.open(filePath, { read: true })
+    if (start > 0) await file.seek(start, Deno.SeekMode.Start)
+    return file.readable.pipeThrough(limitStream(length))
+}
+
 const handleStaticFile = async (req) => {
     const url = new URL(req.url)
     const path = decodeURIComponent(url.pathname)
@@ -16,24 +169,42 @@ const handleStaticFile = async (req) => {
         }`
 
     try {
-        await Deno.stat(filePath)
-        const file = await Deno.readFile(filePath)
-
-        // 简单的 MIME 类型映射
-        const ext = filePath.split('.').pop()
-        const mime = {
-            html: 'text/html',
-            css: 'text/css',
-            js: 'application/javascript',
-            png: 'image/png',
-            jpg: 'image/jpg',
-            ico: 'image/x-icon',
-        }[ext ?? ''] || 'application/octet-stream'
-
-        return new Response(file, {
-            headers: { 'Content-Type': mime },
-        })
+        const entry = await loadStaticEntry(filePath)
+        const encoding = pickEncoding(req.headers.get('Accept-Encoding'), entry.encodings)
+        const headers = {
+            'Content-Type': entry.mime,
+            // 不同编码是不同的字节序列，强 ETag 也必须不同
+            'ETag': encoding ? entry.etag.replace(/"$/, `-${encoding}"`) : entry.etag,
+            'Cache-Control': entry.cacheControl,
+            'Accept-Ranges': 'bytes',
+        }
+        if (Object.keys(entry.encodings).length) headers['Vary'] = 'Accept-Encoding'
+        if (matchesEtag(req.headers.get('If-None-Match'), headers['ETag'])) {
+            return new Response(null, { status: 304, headers })
+        }
+
+        if (encoding) {
+            const body = entry.encodings[encoding]
+            headers['Content-Encoding'] = encoding
+            headers['Content-Length'] = body.length.toString()
+            return new Response(body, { headers })
+        }
+
+        // Range 只作用于未压缩的原始字节；If-Range 的 ETag 不一致时返回完整内容
+        const ifRange = req.headers.get('If-Range')
+        const range = ifRange && ifRange !== entry.etag ? null : parseRange(req.headers.get('Range'), entry.size)
+        if (range === 'invalid') {
+            return new Response(null, { status: 416, headers: { ...headers, 'Content-Range': `bytes */${entry.size}` } })
+        }
+        const { start, end } = range ?? { start: 0, end: entry.size - 1 }
+        const length = end - start + 1
+        headers['Content-Length'] = length.toString()
+        if (range) headers['Content-Range'] = `bytes ${start}-${end}/${entry.size}`
+
+        const body = entry.body ? entry.body.subarray(start, end + 1) : await openFileStream(filePath, start, length)
+        return new Response(body, { status: range ? 206 : 200, headers })
     } catch (err) {
+        evictStatic(filePath)
         if (path === '/.well-known/appspecific/com.chrome.devtools.json') {
             return NotFound404()
         }
@@ -42,15 +213,89 @@ const handleStaticFile = async (req) => {
     }
 }
 
+// If-None-Match 可能是逗号分隔的列表，也可能带 W/ 前缀或为 *
+const matchesEtag = (ifNoneMatch, etag) => {
+    if (!ifNoneMatch) return false
+    return ifNoneMatch.split(',').some((tag) => {
+        tag = tag.trim()
+        return tag === '*' || tag.replace(/^W\//, '') === etag
+    })
+}
+
+// 批量读取上限；KV getMany 每次最多 10 个键
+const MAX_BATCH = 100
+const KV_GET_MANY_LIMIT = 10
+// 批量写入时每个 atomic 提交包含的条目数
+const KV_ATOMIC_BATCH = 10
+
+// 解析 index 参数：单个 "3"、列表 "1,2,3"、范围 "1-7"，或它们的组合 "1-7,11"
+const parseIndexList = (param) => {
+    const indices = []
+    for (const part of param.split(',')) {
+        const range = part.trim().match(/^(\d+)-(\d+)$/)
+        if (range) {
+            const [from, to] = [Number(range[1]), Number(range[2])]
+            if (to < from || to - from >= MAX_BATCH) return null
+            for (let i = from; i <= to; i++) indices.push(i.toString())
+        } else if (/^\d+$/.test(part.trim())) {
+            indices.push(part.trim())
+        } else {
+            return null
+        }
+    }
+    const unique = [...new Set(indices)]
+    return unique.length <= MAX_BATCH ? unique : null
+}
+
+const sha1Hex = async (text) => {
+    const digest = await crypto.subtle.digest('SHA-1', new TextEncoder().encode(text))
+    return [...new Uint8Array(digest)].map((b) => b.toString(16).padStart(2, '0')).join('')
+}
+
+// 批量读取：返回 { stories: { index: data }, etags: { index: etag } }，不存在的索引直接省略
+const handleDataGetMany = async (req, indices) => {
+    const kv = await getKv()
+    const stories = {}
+    const etags = {}
+    for (let i = 0; i < indices.length; i += KV_GET_MANY_LIMIT) {
+        const chunk = indices.slice(i, i + KV_GET_MANY_LIMIT)
+        const results = await kv.getMany(chunk.map((index) => ['zst', index]))
+        results.forEach((result, j) => {
+            if (result.value) {
+                stories[chunk[j]] = result.value
+                etags[chunk[j]] = `"${result.versionstamp}"`
+            }
+        })
+    }
+    // 整个批次的 ETag：各条目 versionstamp 的摘要
+    const etag = `"${await sha1Hex(JSON.stringify(etags))}"`
+    const headers = { 'ETag': etag, 'Cache-Control': 'no-cache', 'Content-Type': 'application/json' }
+    if (matchesEtag(req.headers.get('If-None-Match'), etag)) {
+        return new Response(null, { status: 304, headers })
+    }
+    return new Response(JSON.stringify({ stories, etags }), { headers })
+}
+
 const handleDataGet = async (req) => {
     const url = new URL(req.url)
     const index = url.searchParams.get('index')
     if (!index) return new Response('404 Not Found', { status: 404 })
-    const kv = await Deno.openKv()
+    if (/[,-]/.test(index)) {
+        const indices = parseIndexList(index)
+        if (!indices) return new Response('无效的索引列表', { status: 400 })
+        return await handleDataGetMany(req, indices)
+    }
+    const kv = await getKv()
 
     const result = await kv.get(['zst', index.toString()])
     if (result.value) {
-        return new Response(JSON.stringify(result.value))
+        // KV 的 versionstamp 每次写入都会变化，直接用作 ETag
+        const etag = `"${result.versionstamp}"`
+        const headers = { 'ETag': etag, 'Cache-Control': 'no-cache' }
+        if (matchesEtag(req.headers.get('If-None-Match'), etag)) {
+            return new Response(null, { status: 304, headers })
+        }
+        return new Response(JSON.stringify(result.value), { headers })
     } else {
         return new Response('404 Not Found', { status: 404 })
     }
@@ -59,11 +304,13 @@ const handleDataGet = async (req) => {
 const handleDataUpdate = async (req) => {
     const url = new URL(req.url)
     try {
-        const { index, data } = await req.json()
+        const body = await req.json()
+        if (Array.isArray(body)) return await handleDataUpdateMany(body)
+        const { index, data } = body
         if (!index || !data) {
             return new Response('无效的 JSON 请求体', { status: 400 })
         }
-        const kv = await Deno.openKv()
+        const kv = await getKv()
 
         const setResult = await kv.set(['zst', index.toString()], data)
         return new Response(`写入成功`)
@@ -73,6 +320,27 @@ const handleDataUpdate = async (req) => {
     }
 }
 
+// 批量写入：请求体为 [{ index, data }, ...]，每 KV_ATOMIC_BATCH 条一次 atomic 提交
+const handleDataUpdateMany = async (items) => {
+    if (items.length > MAX_BATCH || items.some((item) => !item || !item.index || !item.data)) {
+        return new Response('无效的 JSON 请求体', { status: 400 })
+    }
+    const kv = await getKv()
+    let written = 0
+    for (let i = 0; i < items.length; i += KV_ATOMIC_BATCH) {
+        const op = kv.atomic()
+        for (const { index, data } of items.slice(i, i + KV_ATOMIC_BATCH)) {
+            op.set(['zst', index.toString()], data)
+        }
+        const result = await op.commit()
+        if (!result.ok) {
+            return new Response(`写入失败, 已写入 ${written} 条`, { status: 500 })
+        }
+        written += Math.min(KV_ATOMIC_BATCH, items.length - i)
+    }
+    return new Response(`写入成功 ${written} 条`)
+}
+
 export const handleZST = async (req) => {
     if (req.method === 'GET') {
         return await handleDataGet(req)
@@ -83,6 +351,8 @@ export const handleZST = async (req) => {
     return new Response('404 Not Found', { status: 404 })
 }
 
+await precompressStatic().catch((err) => console.log(err))
+
 Deno.serve({
     onListen({ port, hostname }) {
         console.log(`Server running on http://${hostname}:${port}`)
@@ -0,0 +1,111 @@
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：无窗口运行 Pygame，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+sys.path.insert(0, str(APP_DIR))
+
+import pygame  # noqa: E402
+
+from animation_config import ANIMATION_CONFIG  # noqa: E402
+from frame_atlas import FrameAtlasCache, compute_atlas_key, ATLAS_FILE_NAME  # noqa: E402
+from sprite_animation import load_all_animations, LazyAnimationRegistry  # noqa: E402
+
+WIDTH, HEIGHT = 150, 150
+
+
+class BenchPet:
+    """最小化的桌面宠物上下文，仅包含加载动画所需的属性。"""
+
+    def __init__(self, frame_atlas=None, premultiplied_frames=False):
+        self.width = WIDTH
+        self.height = HEIGHT
+        self.animation_config = ANIMATION_CONFIG
+        self.all_animations = LazyAnimationRegistry()
+        self.animation_ranges = {}
+        self.frame_atlas = frame_atlas
+        self.premultiplied_frames = premultiplied_frames
+
+
+# ----------------------------------------------------------------------
+# 2. 三种启动路径
+# ----------------------------------------------------------------------
+
+def load_every_sheet(pet):
+    """注册并加载全部动画（等同于旧版的全量预加载）。"""
+    load_all_animations(pet)
+    for name in list(pet.all_animations.keys()):
+        pet.all_animations[name]
+
+
+def load_png_path():
+    """当前路径：每次启动都解码 PNG、切帧并缩放。"""
+    load_every_sheet(BenchPet())
+
+
+def load_with_atlas(atlas_path, premultiplied=False):
+    """图集路径：命中时直接读取 mmap，未命中时解码并烘焙。"""
+    cache = FrameAtlasCache(atlas_path, compute_atlas_key(ANIMATION_CONFIG, (WIDTH, HEIGHT)))
+    pet = BenchPet(cache, premultiplied)
+    load_every_sheet(pet)
+    cache.commit()
+    return pet
+
+
+def load_with_atlas_and_touch(atlas_path, premultiplied=False):
+    """图集路径，并访问每一帧（模拟所有动画都至少播放过一次）。"""
+    pet = load_with_atlas(atlas_path, premultiplied)
+    for name in pet.all_animations.keys():
+        frames = pet.all_animations[name]
+        for i in range(len(frames)):
+            frames[i]
+
+
+def measure(label, fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<34} median {statistics.median(samples):8.1f} ms   min {min(samples):8.1f} ms")
+    return statistics.median(samples)
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    print("-" * 50)
+    print(f"--- Frame atlas startup benchmark ({runs} runs each) ---")
+    print("-" * 50)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        atlas_path = os.path.join(tmp_dir, ATLAS_FILE_NAME)
+
+        def cold():
+            if os.path.exists(atlas_path):
+                os.remove(atlas_path)
+            load_with_atlas(atlas_path)
+
+        baseline = measure("PNG decode (current path)", load_png_path, runs)
+        measure("Atlas cold (decode + bake)", cold, runs)
+        warm = measure("Atlas warm (mmap)", lambda: load_with_atlas(atlas_path), runs)
+        measure("Atlas warm + every frame touched", lambda: load_with_atlas_and_touch(atlas_path), runs)
+        measure("  ... premultiplied (zero-copy)", lambda: load_with_atlas_and_touch(atlas_path, True), runs)
+
+        print("-" * 50)
+        print(f"Atlas size: {os.path.getsize(atlas_path) / (1024 * 1024):.1f} MB")
+        print(f"Warm start speed-up: {baseline / warm:.1f}x")
+        print("-" * 50)
+
+    pygame.quit()
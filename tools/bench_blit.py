@@ -0,0 +1,85 @@
+import ctypes
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：无窗口运行 Pygame，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+sys.path.insert(0, str(APP_DIR))
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+from pixel_ops import convert_to_bgra, surface_bgra_view, premultiply_into  # noqa: E402
+
+# 待测尺寸：待机窗口、展示窗口、1080p 与 4K 全屏（MagicState）
+SIZES = [(150, 150), (350, 350), (1920, 1080), (3840, 2160)]
+
+
+def make_surface(width, height):
+    """生成带随机半透明像素的测试 Surface。"""
+    rng = np.random.default_rng(0)
+    rgba = rng.integers(0, 256, size=(height, width, 4), dtype=np.uint8)
+    return pygame.image.frombuffer(rgba.tobytes(), (width, height), "RGBA").convert_alpha()
+
+
+def time_ms(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def bench_size(width, height, runs):
+    surface = make_surface(width, height)
+
+    # 旧路径：tostring + 浮点预乘 + dstack + tobytes，再 memmove 到每帧新建的 DIB 内存
+    def legacy():
+        dib = ctypes.create_string_buffer(width * height * 4)
+        ctypes.memmove(dib, convert_to_bgra(surface), width * height * 4)
+
+    # 新路径：直接从 Surface 缓冲区整数预乘到常驻的 DIB 视图
+    dib_view = np.empty((height, width, 4), dtype=np.uint8)
+    scratch = np.empty((3, height, width), dtype=np.uint32)
+
+    def presenter():
+        premultiply_into(dib_view, surface_bgra_view(surface), scratch)
+
+    legacy_ms = time_ms(legacy, runs)
+    presenter_ms = time_ms(presenter, runs)
+
+    # 正确性：与旧 convert_to_bgra 的结果最多相差 1（四舍五入 vs 截断）
+    expected = np.frombuffer(convert_to_bgra(surface), dtype=np.uint8).reshape(height, width, 4)
+    max_diff = int(np.abs(expected.astype(np.int16) - dib_view.astype(np.int16)).max())
+
+    print(f"{width:>5}x{height:<5} legacy {legacy_ms:8.2f} ms   presenter {presenter_ms:8.2f} ms"
+          f"   speed-up {legacy_ms / presenter_ms:5.1f}x   max diff {max_diff}")
+    return max_diff
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    print("-" * 50)
+    print(f"--- Layered window pixel conversion benchmark ({runs} runs each) ---")
+    print("-" * 50)
+
+    worst = max(bench_size(w, h, runs) for w, h in SIZES)
+
+    print("-" * 50)
+    print("✅ Output matches convert_to_bgra" if worst <= 1 else "❌ Output differs from convert_to_bgra")
+    print("-" * 50)
+
+    pygame.quit()
+    sys.exit(0 if worst <= 1 else 1)
@@ -0,0 +1,146 @@
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：无窗口运行 Pygame，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+sys.path.insert(0, str(APP_DIR))
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+from animation_config import ANIMATION_CONFIG  # noqa: E402
+from damage_tracker import DamageTracker, RENDER_SKIP, RENDER_MOVE, RENDER_PARTIAL  # noqa: E402
+from pixel_ops import surface_bgra_view  # noqa: E402
+from sprite_animation import load_frames_from_sheet  # noqa: E402
+
+SIZE = (150, 150)
+
+
+class FakePresenter:
+    """模拟 LayeredWindowPresenter 的 DIB 行为：只拷贝脏矩形，其余像素保留上一帧。"""
+
+    def __init__(self):
+        self.pixels = None
+        self.position = None
+
+    def present(self, surface, window_x, window_y, dirty_rect=None):
+        view = surface_bgra_view(surface)
+        if self.pixels is None or self.pixels.shape != view.shape:
+            self.pixels = np.empty_like(view)
+            dirty_rect = None
+        if dirty_rect is None:
+            np.copyto(self.pixels, view)
+        else:
+            rows = slice(dirty_rect.top, dirty_rect.bottom)
+            cols = slice(dirty_rect.left, dirty_rect.right)
+            np.copyto(self.pixels[rows, cols], view[rows, cols])
+        self.position = (window_x, window_y)
+
+    def move(self, window_x, window_y):
+        self.position = (window_x, window_y)
+
+
+def load_sheet(name):
+    cfg = ANIMATION_CONFIG[name]
+    return load_frames_from_sheet(cfg["filepath"], cfg["frame_w"], cfg["frame_h"], SIZE[0], SIZE[1],
+                                  cfg["total_frames"], premultiplied=True)
+
+
+def build_ticks():
+    """
+    15 FPS 的模拟时间线 (frame, window_pos)：
+    待机循环 → 拖动（帧不变、位置变化）→ 生气 one-shot 播完后停在最后一帧 → ByeState 停在最后一帧。
+    """
+    idle, angry, bye = load_sheet("idle"), load_sheet("angry"), load_sheet("bye")
+    ticks = []
+    pos = (800, 600)
+    for i in range(150):
+        ticks.append((idle[i % len(idle)], pos))
+    for i in range(45):
+        pos = (800 + i * 3, 600 - i)
+        ticks.append((idle[0], pos))
+    ticks += [(frame, pos) for frame in angry] + [(angry[-1], pos)] * 150
+    ticks += [(frame, pos) for frame in bye] + [(bye[-1], pos)] * 60
+    return ticks
+
+
+def render_full(draw_surface, frame):
+    draw_surface.fill((0, 0, 0, 0))
+    draw_surface.blit(frame, ((SIZE[0] - frame.get_width()) // 2, (SIZE[1] - frame.get_height()) // 2),
+                      special_flags=pygame.BLEND_PREMULTIPLIED)
+
+
+def run_legacy(ticks, draw_surface, presenter):
+    samples = []
+    for frame, pos in ticks:
+        start = time.perf_counter()
+        render_full(draw_surface, frame)
+        presenter.present(draw_surface, *pos)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def run_tracked(ticks, draw_surface, presenter, tracker, reference=None):
+    """与 DesktopPet.render 相同的决策流程；reference 不为 None 时逐帧校验 DIB 内容。"""
+    samples, max_diff = [], 0
+    for frame, pos in ticks:
+        start = time.perf_counter()
+        frame_pos = ((SIZE[0] - frame.get_width()) // 2, (SIZE[1] - frame.get_height()) // 2)
+        action, dirty_rect = tracker.plan(draw_surface, frame, frame_pos, pos)
+        if action == RENDER_MOVE:
+            presenter.move(*pos)
+        elif action == RENDER_PARTIAL:
+            draw_surface.fill((0, 0, 0, 0), dirty_rect)
+            draw_surface.set_clip(dirty_rect)
+            draw_surface.blit(frame, frame_pos, special_flags=pygame.BLEND_PREMULTIPLIED)
+            draw_surface.set_clip(None)
+            presenter.present(draw_surface, *pos, dirty_rect=dirty_rect)
+        elif action != RENDER_SKIP:
+            render_full(draw_surface, frame)
+            presenter.present(draw_surface, *pos)
+        samples.append((time.perf_counter() - start) * 1000)
+
+        if reference is not None:
+            render_full(reference, frame)
+            expected = surface_bgra_view(reference).astype(np.int16)
+            max_diff = max(max_diff, int(np.abs(expected - presenter.pixels.astype(np.int16)).max()))
+            assert presenter.position == pos
+    return samples, max_diff
+
+
+if __name__ == "__main__":
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    print("-" * 50)
+    print("--- Damage-tracked rendering: correctness and per-tick cost ---")
+    print("-" * 50)
+
+    ticks = build_ticks()
+
+    # 正确性：增量更新后的 DIB 必须与每帧全量重绘完全一致
+    _, max_diff = run_tracked(ticks, pygame.Surface(SIZE, pygame.SRCALPHA), FakePresenter(), DamageTracker(),
+                              reference=pygame.Surface(SIZE, pygame.SRCALPHA))
+
+    legacy = run_legacy(ticks, pygame.Surface(SIZE, pygame.SRCALPHA), FakePresenter())
+    tracker = DamageTracker()
+    tracked, _ = run_tracked(ticks, pygame.Surface(SIZE, pygame.SRCALPHA), FakePresenter(), tracker)
+
+    print(f"{len(ticks)} ticks   legacy total {sum(legacy):7.2f} ms (median {statistics.median(legacy):.3f})"
+          f"   tracked total {sum(tracked):7.2f} ms (median {statistics.median(tracked):.3f})")
+    print(f"Tracker: {tracker.summary()}")
+    print(f"Max diff vs full redraw: {max_diff}")
+
+    print("-" * 50)
+    print("✅ Incremental output matches full redraw" if max_diff == 0 else "❌ Incremental output differs")
+    print("-" * 50)
+
+    pygame.quit()
+    sys.exit(0 if max_diff == 0 else 1)
@@ -0,0 +1,186 @@
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：无窗口运行 Pygame，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+sys.path.insert(0, str(APP_DIR))
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+from effects import DynamicEffectController  # noqa: E402
+from pixel_ops import premultiply_into, surface_bgra_view  # noqa: E402
+
+SCREEN = (1920, 1080)
+COUNTS = [600, 2000, 10000, 20000]
+SCALE_SCREENS = [(1920, 1080), (2560, 1440), (3840, 2160)]
+SCALES = [1.0, 0.5]
+FRAME_BUDGET_MS = 1000 / 15
+
+
+# ----------------------------------------------------------------------
+# 2. 旧实现（每个雨滴一个对象，逐个 random.randint + pygame.draw.line），仅用于对比
+# ----------------------------------------------------------------------
+
+class LegacyRaindrop:
+    def __init__(self, screen_w, screen_h):
+        self.screen_w = screen_w
+        self.screen_h = screen_h
+        self.reset()
+
+    def reset(self):
+        self.x = random.randint(0, self.screen_w)
+        self.y = random.randint(-self.screen_h * 2, 0)
+        self.length = random.randint(20, 50)
+        self.speed = random.randint(10, 25)
+        self.color = (200, 200, 255, random.randint(150, 200))
+
+    def update(self):
+        self.y += self.speed
+        if self.y > self.screen_h + self.length:
+            self.reset()
+            self.speed = random.randint(10, 25)
+            self.length = random.randint(20, 50)
+
+    def draw(self, surface):
+        pygame.draw.line(surface, self.color, (self.x, int(self.y)), (self.x, int(self.y + self.length)), 1)
+
+
+class LegacyEffect:
+    def __init__(self, screen_w, screen_h, count):
+        self.drops = [LegacyRaindrop(screen_w, screen_h) for _ in range(count)]
+        self.dark_overlay = pygame.Surface((screen_w, screen_h), pygame.SRCALPHA)
+        self.dark_overlay.fill((0, 0, 0, 30))
+
+    def update_and_draw(self, surface):
+        surface.blit(self.dark_overlay, (0, 0))
+        for drop in self.drops:
+            drop.update()
+            drop.draw(surface)
+
+
+# ----------------------------------------------------------------------
+# 3. 正确性与性能
+# ----------------------------------------------------------------------
+
+def check_rasterization(count, frames=30):
+    """批量光栅化必须与按相同顺序逐条 pygame.draw.line 的结果逐像素一致。"""
+    effect = DynamicEffectController(*SCREEN, count=count, rng=np.random.default_rng(1))
+    bulk = pygame.Surface(SCREEN, pygame.SRCALPHA)
+    lines = pygame.Surface(SCREEN, pygame.SRCALPHA)
+    worst = 0
+    for _ in range(frames):
+        bulk.fill((0, 0, 0, 0))
+        effect.update_and_draw(bulk)
+
+        p = effect.particles
+        lines.fill((0, 0, 0, 0))
+        lines.blit(effect.dark_overlay, (0, 0))
+        for x, y, length, alpha in zip(p.x.tolist(), p.y.tolist(), p.length.tolist(), p.alpha.tolist()):
+            pygame.draw.line(lines, (200, 200, 255, alpha), (x, y), (x, y + length), 1)
+
+        diff = np.abs(surface_bgra_view(bulk).astype(np.int16) - surface_bgra_view(lines).astype(np.int16))
+        worst = max(worst, int(diff.max()))
+    return worst
+
+
+def check_premultiplied(count, frames=30):
+    """直接写入预乘缓冲区 == 先画直通 alpha 再整体预乘（误差 ≤ 1，取整差异）。"""
+    straight_fx = DynamicEffectController(*SCREEN, count=count, rng=np.random.default_rng(2))
+    premul_fx = DynamicEffectController(*SCREEN, count=count, rng=np.random.default_rng(2))
+    straight = pygame.Surface(SCREEN, pygame.SRCALPHA)
+    premul = pygame.Surface(SCREEN, pygame.SRCALPHA)
+    expected = np.empty((SCREEN[1], SCREEN[0], 4), dtype=np.uint8)
+    worst = 0
+    for _ in range(frames):
+        straight.fill((0, 0, 0, 0))
+        straight_fx.update_and_draw(straight)
+        premultiply_into(expected, surface_bgra_view(straight))
+
+        premul.fill((0, 0, 0, 0))
+        premul_fx.update_and_draw(premul, premultiplied=True)
+        worst = max(worst, int(np.abs(expected.astype(np.int16)
+                                      - surface_bgra_view(premul).astype(np.int16)).max()))
+    return worst
+
+
+def per_frame_ms(effect, surface, frames, **kwargs):
+    samples = []
+    for _ in range(frames):
+        surface.fill((0, 0, 0, 0))
+        start = time.perf_counter()
+        effect.update_and_draw(surface, **kwargs)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def bench_scales(frames):
+    """
+    MagicState 整帧合成耗时（清屏 + 雨滴特效 + 原生分辨率精灵帧），按分辨率与特效缩放比例。
+    与 DesktopPet.render 的全量路径一致：缩放模式下特效层直接覆盖整个 Surface，省去清屏。
+    """
+    sprite = pygame.Surface((400, 400), pygame.SRCALPHA)
+    sprite.fill((120, 80, 40, 200))
+    for size in SCALE_SCREENS:
+        surface = pygame.Surface(size, pygame.SRCALPHA)
+        row = []
+        for scale in SCALES:
+            effect = DynamicEffectController(*size, count=600, scale=scale)
+
+            def frame():
+                if not effect.replaces_target:
+                    surface.fill((0, 0, 0, 0))
+                effect.update_and_draw(surface, premultiplied=True)
+                surface.blit(sprite, ((size[0] - 400) // 2, (size[1] - 400) // 2),
+                             special_flags=pygame.BLEND_PREMULTIPLIED)
+
+            samples = []
+            for _ in range(frames):
+                start = time.perf_counter()
+                frame()
+                samples.append((time.perf_counter() - start) * 1000)
+            row.append(f"x{scale:<4} {statistics.median(samples):6.2f} ms")
+        print(f"{size[0]:>5}x{size[1]:<5} " + "   ".join(row))
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    print("-" * 50)
+    print(f"--- Rain effect at {SCREEN[0]}x{SCREEN[1]} ({frames} frames each) ---")
+    print("-" * 50)
+
+    raster_diff = check_rasterization(600)
+    premul_diff = check_premultiplied(600)
+    print(f"Bulk raster vs draw.line: max diff {raster_diff}   premultiplied vs straight+premultiply: max diff {premul_diff}")
+
+    surface = pygame.Surface(SCREEN, pygame.SRCALPHA)
+    for count in COUNTS:
+        legacy_ms = per_frame_ms(LegacyEffect(*SCREEN, count), surface, frames)
+        vector_ms = per_frame_ms(DynamicEffectController(*SCREEN, count=count), surface, frames, premultiplied=True)
+        verdict = "fits" if vector_ms < FRAME_BUDGET_MS else "exceeds"
+        print(f"{count:>6} drops   legacy {legacy_ms:7.2f} ms   vectorized {vector_ms:7.2f} ms"
+              f"   speed-up {legacy_ms / vector_ms:5.1f}x   ({verdict} the 15 FPS budget)")
+
+    print("-" * 50)
+    print("--- Magic frame (effect + native sprite) by effect_scale ---")
+    bench_scales(frames)
+
+    ok = raster_diff == 0 and premul_diff <= 1
+    print("-" * 50)
+    print("✅ Same look as the per-object rain" if ok else "❌ Rain output differs")
+    print("-" * 50)
+
+    pygame.quit()
+    sys.exit(0 if ok else 1)
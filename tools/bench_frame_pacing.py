@@ -0,0 +1,177 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：无窗口运行 Pygame（真实时钟），用户数据写到临时目录，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="deskfox-pacing-")
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "src" / "config" / "pet_config.json"
+sys.path.insert(0, str(APP_DIR))
+
+import pygame  # noqa: E402
+
+from animation_config import ANIMATION_CONFIG  # noqa: E402
+from frame_scheduler import FrameScheduler, MODE_IDLE  # noqa: E402
+from pet_desktop import DesktopPet  # noqa: E402
+from pet_states import IdleState  # noqa: E402
+from platform_backend import HeadlessBackend  # noqa: E402
+
+FPS = 15
+IDLE_FPS = 2
+SEED = 7
+# 低功耗阈值（秒）：测量前先让宠物这么久没有输入
+LOW_POWER_SECONDS = 2
+# 定时器测试里每个 tick 模拟的主线程工作量
+TICK_WORK_MS = 2.0
+
+# 光标不在屏幕上（没有输入），各个定时器都远在测量时间之后
+CONFIG_OVERRIDES = {
+    "current_x": 100,
+    "current_y": 100,
+    "idle_fps": IDLE_FPS,
+    "web_service_url": "http://127.0.0.1:9",
+}
+
+
+def tick_work():
+    end = time.process_time() + TICK_WORK_MS / 1000
+    while time.process_time() < end:
+        pass
+
+
+def cpu_per_hour(cpu, wall):
+    return cpu / wall * 3600
+
+
+def run_pet(seconds, low_power_seconds):
+    """
+    真实的 DesktopPet（无窗口后端、真实时钟）在待机状态下运行：先等 low_power_seconds + 1 秒，
+    再测量 seconds 秒内的帧数、呈现的帧数和 CPU-s/h，最后发一个鼠标事件看调度器是否回到满帧率。
+    low_power_seconds 为 0 时不启用低功耗。
+    """
+    with open(CONFIG_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(CONFIG_OVERRIDES, idle_low_power_seconds=low_power_seconds)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        pet = DesktopPet(150, 150, FPS, ANIMATION_CONFIG, config, backend=HeadlessBackend(seed=SEED, realtime=True))
+        warmup_end = time.perf_counter() + low_power_seconds + 1
+        while time.perf_counter() < warmup_end:
+            pet.run(max_frames=1)
+
+        presenter = pet.backend.presenter
+        frames = presented = 0
+        last_digest = presenter.digest()
+        cpu0, wall0 = time.process_time(), time.perf_counter()
+        while time.perf_counter() - wall0 < seconds:
+            pet.run(max_frames=1)
+            frames += 1
+            digest = presenter.digest()
+            presented += digest != last_digest
+            last_digest = digest
+        cpu_h = cpu_per_hour(time.process_time() - cpu0, time.perf_counter() - wall0)
+        idle = isinstance(pet.state, IdleState)
+        mode = pet.scheduler.mode
+
+        # 鼠标移动一下：下一帧起恢复满帧率
+        pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=(10, 10), rel=(1, 1), buttons=(0, 0, 0)))
+        pet.run(max_frames=2)
+        woken_mode = pet.scheduler.mode
+        pet.cleanup(exit_process=False)
+    return frames, presented, cpu_h, idle, mode, woken_mode
+
+
+def run_scheduled(seconds, deadline_in_ms=None):
+    """新主循环：画面静止（渲染被跳过）时降到 IDLE_FPS，并且不会睡过下一个定时器。"""
+    scheduler = FrameScheduler(FPS, IDLE_FPS)
+    start = time.perf_counter()
+    deadline = start + deadline_in_ms / 1000 if deadline_in_ms is not None else None
+    fired_late_ms = None
+    ticks = 0
+    while time.perf_counter() - start < seconds:
+        pygame.event.get()
+        tick_work()
+        now = time.perf_counter()
+        if deadline is not None and now >= deadline:
+            fired_late_ms = (now - deadline) * 1000
+            deadline = None
+        scheduler.frame_done(presented=False)
+        ticks += 1
+        scheduler.wait((deadline - now) * 1000 if deadline is not None else None)
+    return ticks, scheduler, fired_late_ms
+
+
+def wake_latency(delay_s=0.3):
+    """空闲模式下从另一个线程投递鼠标事件，测量主循环被唤醒的延迟。"""
+    scheduler = FrameScheduler(FPS, IDLE_FPS)
+    for _ in range(FPS):
+        scheduler.frame_done(presented=False)
+    assert scheduler.mode == MODE_IDLE
+    pygame.event.clear()
+
+    posted_at = []
+
+    def post():
+        time.sleep(delay_s)
+        posted_at.append(time.perf_counter())
+        pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=(10, 10), rel=(1, 1), buttons=(0, 0, 0)))
+
+    threading.Thread(target=post).start()
+    # 等待可能跨越多个空闲周期（每个最长 1 / IDLE_FPS 秒）
+    event = None
+    while event is None:
+        event = scheduler.wait()
+    woke_at = time.perf_counter()
+    return (woke_at - posted_at[0]) * 1000, scheduler.mode
+
+
+def check(label, ok, detail):
+    print(f"{'✅' if ok else '❌'} {label}: {detail}")
+    return ok
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    print("-" * 50)
+    print(f"--- Idle pet CPU cost: real DesktopPet, headless backend, real clock ({seconds:.0f}s each) ---")
+    print("-" * 50)
+
+    full = run_pet(seconds, 0)
+    low = run_pet(seconds, LOW_POWER_SECONDS)
+    for name, (frames, presented, cpu_h, _, mode, _) in (("idle loop at full FPS", full),
+                                                       (f"low power after {LOW_POWER_SECONDS} s", low)):
+        print(f"   {name:<22} {frames:5d} frames ({frames / seconds:5.1f}/s), {presented:5d} presented "
+              f"({presented / seconds:4.1f}/s), {cpu_h:7.1f} CPU-s/h, scheduler {mode}")
+    print("-" * 50)
+
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    _, _, late_ms = run_scheduled(2, deadline_in_ms=1234)
+    latency_ms, mode = wake_latency()
+    pygame.quit()
+
+    results = [
+        check("Low-power idle", low[3] and low[4] == MODE_IDLE and low[1] <= seconds * IDLE_FPS + 1,
+              f"{low[1] / seconds:.1f} presented frames/s (idle_fps {IDLE_FPS}), still in IdleState, scheduler {low[4]}"),
+        check("Input ends low power", low[5] != MODE_IDLE,
+              f"scheduler {low[5]} on the frames after a mouse event"),
+        check("CPU saving", low[2] < full[2],
+              f"{low[2]:.1f} vs {full[2]:.1f} CPU-s/h with the idle loop at {FPS} FPS"),
+        check("Timer deadline", late_ms is not None and late_ms < 1000 / IDLE_FPS,
+              f"deadline at 1234 ms handled {late_ms:.1f} ms late (idle period {1000 / IDLE_FPS:.0f} ms)"),
+        check("Input wakeup", mode != MODE_IDLE,
+              f"mouse event ended the idle wait after {latency_ms:.1f} ms (mode afterwards: {mode})"),
+    ]
+    print("-" * 50)
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,158 @@
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+sys.path.insert(0, str(APP_DIR))
+
+import requests  # noqa: E402
+
+from story_manager import StoryManager  # noqa: E402
+
+# 本地服务没有 DNS / TLS；每个新连接额外等待这么久，代替到 deskfox.deno.dev 的握手往返
+CONNECT_DELAY_MS = 40
+REQUESTS = 40
+THREADS = 4
+
+
+class MockPet:
+    last_read_index = 0
+
+
+class StoryHandler(BaseHTTPRequestHandler):
+    """模拟 Deno 故事服务：GET ?index=N 返回故事，POST 返回“写入成功”。"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # 头和正文分两次写出，否则每个响应都会撞上 40 ms 的延迟 ACK
+    connections = 0
+    fail_next = {}  # index -> 还要返回 503 的次数
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StoryHandler.lock:
+            StoryHandler.connections += 1
+        time.sleep(CONNECT_DELAY_MS / 1000)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        index = parse_qs(urlparse(self.path).query).get("index", ["0"])[0]
+        with StoryHandler.lock:
+            remaining = StoryHandler.fail_next.get(index, 0)
+            if remaining:
+                StoryHandler.fail_next[index] = remaining - 1
+        if remaining:
+            self._send(503, "busy", "text/plain")
+            return
+        story = {"title": f"Story {index}", "author": "Fox", "content": "从前有一只狐狸……" * 20}
+        self._send(200, json.dumps(story, ensure_ascii=False), "application/json")
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send(200, "写入成功", "text/plain; charset=utf-8")
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StoryHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def timed(fn, count):
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        result = fn(i + 1)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert result, "request failed"
+    return latencies
+
+
+def report(label, latencies, connections):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<26} mean {statistics.mean(latencies):6.1f} ms   p50 {statistics.median(latencies):6.1f} ms   "
+          f"p95 {p95:6.1f} ms   connections {connections}")
+
+
+def unpooled_get(url):
+    """旧实现：每次调用裸 requests.get，每个请求都新建连接。"""
+    def fetch(index):
+        response = requests.get(url, params={"index": index}, timeout=5)
+        return response.status_code == 200 and response.json()
+    return fetch
+
+
+def concurrent(fn, threads, per_thread):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        result = timed(fn, per_thread)
+        with lock:
+            latencies.extend(result)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return latencies
+
+
+def measure(label, fn, count):
+    before = StoryHandler.connections
+    latencies = fn(count)
+    report(label, latencies, StoryHandler.connections - before)
+
+
+if __name__ == "__main__":
+    server = start_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    manager = StoryManager(MockPet(), base_url, "/stories")
+    url = manager.full_url
+
+    print("-" * 50)
+    print(f"--- Story API latency: bare requests vs pooled session ({CONNECT_DELAY_MS} ms simulated handshake) ---")
+    print("-" * 50)
+
+    measure("GET bare requests.get", lambda n: timed(unpooled_get(url), n), REQUESTS)
+    measure("GET pooled session", lambda n: timed(manager.fetch_story_sync, n), REQUESTS)
+    measure("POST pooled session", lambda n: timed(lambda i: manager.write_data_sync(i, {"title": "t"}), n), REQUESTS)
+    measure(f"GET bare, {THREADS} threads",
+            lambda n: concurrent(unpooled_get(url), THREADS, n // THREADS), REQUESTS)
+    measure(f"GET pooled, {THREADS} threads",
+            lambda n: concurrent(manager.fetch_story_sync, THREADS, n // THREADS), REQUESTS)
+
+    # 重试：前两次返回 503，第三次成功
+    StoryHandler.fail_next["99"] = 2
+    start = time.perf_counter()
+    story = manager.fetch_story_sync(99)
+    retry_ms = (time.perf_counter() - start) * 1000
+    print(f"GET after 2x 503:          {'ok' if story else 'failed'} in {retry_ms:.0f} ms (with backoff)")
+
+    manager.close()
+    server.shutdown()
+    print("-" * 50)
+    print("✅ Pooled session reuses connections" if story else "❌ Retry did not recover")
+    print("-" * 50)
@@ -0,0 +1,126 @@
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：无窗口运行 Pygame（真实时钟），用户数据写到临时目录，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="deskfox-bus-")
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "src" / "config" / "pet_config.json"
+sys.path.insert(0, str(APP_DIR))
+
+import pygame  # noqa: E402
+
+from animation_config import ANIMATION_CONFIG  # noqa: E402
+from frame_scheduler import FrameScheduler  # noqa: E402
+from message_bus import MessageBus  # noqa: E402
+from pet_desktop import DesktopPet  # noqa: E402
+from platform_backend import HeadlessBackend  # noqa: E402
+
+FPS = 15
+MESSAGES = 30
+BURST = 20
+SEED = 7
+
+# 工作线程发送的测试消息（不触发故事弹窗等副作用）
+Ping = namedtuple("Ping", ["index"])
+
+
+def check(label, ok, detail):
+    print(f"{'✅' if ok else '❌'} {label}: {detail}")
+    return ok
+
+
+def run_scenario(pet, wakeup, active, messages=MESSAGES, burst=False):
+    """
+    工作线程在随机时刻发送消息，主循环照常运行；返回这一轮的 MessageBus 和每条消息被处理时的帧号。
+    wakeup: False 时模拟没有唤醒通道（消息只在每帧开始时取）。
+    active: 每帧保持满帧率（精灵在动）；否则把每帧都当作“画面没变”，让调度器进入低帧率等待。
+    """
+    bus = MessageBus(wakeup=wakeup)
+    handled = {}
+    frame = [0]
+    bus.subscribe(Ping, lambda message: handled.__setitem__(message.index, frame[0]))
+    pet.bus = bus
+    pet.scheduler.message_bus = bus if wakeup else None
+    scheduler = pet.scheduler
+    scheduler.frame_done = lambda presented: FrameScheduler.frame_done(scheduler, active)
+
+    rng = random.Random(SEED)
+
+    def worker():
+        if burst:
+            time.sleep(0.3)
+            for index in range(messages):
+                bus.post(Ping(index))
+            return
+        for index in range(messages):
+            time.sleep(rng.uniform(0.05, 0.4))
+            bus.post(Ping(index))
+
+    # 先让调度器进入对应的节奏
+    for _ in range(FPS + 1):
+        pet.run(max_frames=1)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    while len(handled) < messages:
+        pet.run(max_frames=1)
+        frame[0] += 1
+    thread.join()
+    return bus, handled
+
+
+if __name__ == "__main__":
+    print("-" * 50)
+    print(f"--- Worker -> main loop queue latency ({MESSAGES} messages per scenario, "
+          f"video driver {os.environ['SDL_VIDEODRIVER']}) ---")
+    print("-" * 50)
+
+    with open(CONFIG_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    config.update({"current_x": 100, "current_y": 100, "web_service_url": "http://127.0.0.1:9"})
+
+    scenarios = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        pet = DesktopPet(150, 150, FPS, ANIMATION_CONFIG, config, backend=HeadlessBackend(seed=SEED, realtime=True))
+        driver = pygame.display.get_driver()
+        for wakeup in (False, True):
+            for active in (False, True):
+                name = f"{'wakeup' if wakeup else 'per-frame poll'} / {'active' if active else 'idle'}"
+                scenarios[name] = run_scenario(pet, wakeup, active)
+        burst_bus, burst_frames = run_scenario(pet, True, False, messages=BURST, burst=True)
+        pet.cleanup(exit_process=False)
+
+    for name, (bus, _) in scenarios.items():
+        print(f"   {name:<24} {bus.latency['Ping'].summary()}")
+    print(f"   {'burst of ' + str(BURST):<24} {burst_bus.latency['Ping'].summary()}")
+    print("-" * 50)
+
+    polled = scenarios["per-frame poll / idle"][0].latency["Ping"]
+    woken = scenarios["wakeup / idle"][0].latency["Ping"]
+    active_polled = scenarios["per-frame poll / active"][0].latency["Ping"]
+    active_woken = scenarios["wakeup / active"][0].latency["Ping"]
+    results = [
+        check("Idle wakeup", woken.percentile(0.99) <= 5,
+              f"max {woken.max_ms:.1f} ms vs {polled.max_ms:.1f} ms waiting for the next idle tick (driver {driver})"),
+        check("Active wakeup", active_woken.percentile(0.99) <= 5,
+              f"max {active_woken.max_ms:.1f} ms vs {active_polled.max_ms:.1f} ms waiting for the next frame"),
+        check("Same-frame burst", len(set(burst_frames.values())) == 1,
+              f"{BURST} messages handled in {len(set(burst_frames.values()))} frame(s) (was 5 per 250 ms poll)"),
+        check("Typed dispatch", all(bus.stats["unhandled"] == 0 for bus, _ in scenarios.values()),
+              "every message reached its handler"),
+    ]
+    print("-" * 50)
+    sys.exit(0 if all(results) else 1)
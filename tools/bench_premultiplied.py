@@ -0,0 +1,119 @@
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：无窗口运行 Pygame，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+sys.path.insert(0, str(APP_DIR))
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+from animation_config import ANIMATION_CONFIG  # noqa: E402
+from effects import DynamicEffectController  # noqa: E402
+from pixel_ops import convert_to_bgra, surface_bgra_view  # noqa: E402
+from sprite_animation import load_frames_from_sheet  # noqa: E402
+
+# (动画名, 窗口尺寸, 是否不缩放) —— 与 DesktopPet 中的用法一致
+CASES = [("idle", (150, 150), False), ("display", (350, 350), True)]
+EFFECT_SIZE = (1920, 1080)
+
+
+def load_sheet(name, size, no_scaling, premultiplied):
+    cfg = ANIMATION_CONFIG[name]
+    return load_frames_from_sheet(cfg["filepath"], cfg["frame_w"], cfg["frame_h"], size[0], size[1],
+                                  cfg["total_frames"], no_scaling=no_scaling, premultiplied=premultiplied)
+
+
+def render_legacy(draw_surface, frame, effect=None):
+    """旧渲染路径：直通 alpha 合成，再由 convert_to_bgra 逐帧预乘。"""
+    draw_surface.fill((0, 0, 0, 0))
+    if effect is not None:
+        effect.update_and_draw(draw_surface)
+    draw_surface.blit(frame, ((draw_surface.get_width() - frame.get_width()) // 2,
+                              (draw_surface.get_height() - frame.get_height()) // 2))
+    return np.frombuffer(convert_to_bgra(draw_surface), dtype=np.uint8)
+
+
+def render_premultiplied(draw_surface, frame, dib, effect=None):
+    """新渲染路径：帧已预乘，动态特效直接写入预乘像素，结果直接拷贝到 DIB。"""
+    draw_surface.fill((0, 0, 0, 0))
+    if effect is not None:
+        effect.update_and_draw(draw_surface, premultiplied=True)
+    draw_surface.blit(frame, ((draw_surface.get_width() - frame.get_width()) // 2,
+                              (draw_surface.get_height() - frame.get_height()) // 2),
+                      special_flags=pygame.BLEND_PREMULTIPLIED)
+    np.copyto(dib, surface_bgra_view(draw_surface))
+    return dib.reshape(-1)
+
+
+def per_frame_ms(fn, frames):
+    samples = []
+    for frame in frames:
+        start = time.perf_counter()
+        fn(frame)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def check_and_bench(name, size, no_scaling):
+    straight = load_sheet(name, size, no_scaling, premultiplied=False)
+    premultiplied = load_sheet(name, size, no_scaling, premultiplied=True)
+
+    draw_surface = pygame.Surface(size, pygame.SRCALPHA)
+    dib = np.empty((size[1], size[0], 4), dtype=np.uint8)
+
+    # 正确性：逐帧与 convert_to_bgra 的输出比较
+    max_diff = 0
+    for a, b in zip(straight, premultiplied):
+        expected = render_legacy(draw_surface, a).astype(np.int16)
+        got = render_premultiplied(draw_surface, b, dib).astype(np.int16)
+        max_diff = max(max_diff, int(np.abs(expected - got).max()))
+
+    legacy_ms = per_frame_ms(lambda f: render_legacy(draw_surface, f), straight)
+    new_ms = per_frame_ms(lambda f: render_premultiplied(draw_surface, f, dib), premultiplied)
+    print(f"{name:<10} {size[0]}x{size[1]:<5} legacy {legacy_ms:6.3f} ms/frame   premultiplied {new_ms:6.3f} ms/frame"
+          f"   max diff {max_diff}")
+    return max_diff
+
+
+def bench_effect():
+    """全屏 MagicState：雨滴特效 + 精灵帧，均无需逐帧预乘转换。"""
+    cfg = ANIMATION_CONFIG["magic"]
+    frame_size = (cfg["frame_w"], cfg["frame_h"])
+    straight = load_sheet("magic", frame_size, True, premultiplied=False)[:15]
+    premultiplied = load_sheet("magic", frame_size, True, premultiplied=True)[:15]
+
+    draw_surface = pygame.Surface(EFFECT_SIZE, pygame.SRCALPHA)
+    dib = np.empty((EFFECT_SIZE[1], EFFECT_SIZE[0], 4), dtype=np.uint8)
+    effect = DynamicEffectController(*EFFECT_SIZE, count=600)
+
+    legacy_ms = per_frame_ms(lambda f: render_legacy(draw_surface, f, effect), straight)
+    new_ms = per_frame_ms(lambda f: render_premultiplied(draw_surface, f, dib, effect), premultiplied)
+    print(f"{'magic+rain':<10} {EFFECT_SIZE[0]}x{EFFECT_SIZE[1]:<5} legacy {legacy_ms:6.3f} ms/frame"
+          f"   premultiplied {new_ms:6.3f} ms/frame")
+
+
+if __name__ == "__main__":
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+
+    print("-" * 50)
+    print("--- Premultiplied frame storage: correctness and per-frame cost ---")
+    print("-" * 50)
+
+    worst = max(check_and_bench(name, size, no_scaling) for name, size, no_scaling in CASES)
+    bench_effect()
+
+    print("-" * 50)
+    print("✅ Output matches convert_to_bgra" if worst <= 1 else "❌ Output differs from convert_to_bgra")
+    print("-" * 50)
+
+    pygame.quit()
+    sys.exit(0 if worst <= 1 else 1)
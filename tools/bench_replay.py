@@ -0,0 +1,265 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：无窗口运行 Pygame，用户数据写到临时目录，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="deskfox-replay-")
+ROOT_DIR = Path(__file__).resolve().parents[1]
+APP_DIR = ROOT_DIR / "src" / "app"
+CONFIG_PATH = ROOT_DIR / "src" / "config" / "pet_config.json"
+sys.path.insert(0, str(APP_DIR))
+
+import pygame  # noqa: E402
+
+from animation_config import ANIMATION_CONFIG  # noqa: E402
+from config_manager import PERSISTENT_CONFIG_KEYS  # noqa: E402
+from pet_desktop import DesktopPet  # noqa: E402
+from pet_states import DisplayState, IdleState, ByeState  # noqa: E402
+from platform_backend import HeadlessBackend, ScriptedCursor  # noqa: E402
+
+WIDTH, HEIGHT, FPS = 150, 150, 15
+SEED = 7
+STATES = ["Idle", "Dragging", "Display", "Teleport", "Magic", "Fishing", "Upset", "Angry", "Butterfly", "Bye"]
+PERCENTILES = (0.5, 0.95, 0.99)
+
+# 所有回放共用的配置：窗口在 (100, 100)，故事请求打到不可达地址（不依赖网络）
+BASE_CONFIG = {
+    "current_x": 100,
+    "current_y": 100,
+    "rest_interval_minutes": 30,
+    "rest_duration_seconds": 30,
+    "web_service_url": "http://127.0.0.1:9",
+}
+
+# ----------------------------------------------------------------------
+# 2. 内置的输入轨迹（格式见 ScriptedCursor.from_trace）
+#    事件 [虚拟毫秒, 类型, ...]：move / hover / down / up 驱动光标，
+#    settings_open / settings_close / quit 模拟设置窗口里的操作。
+#    也可以用 --trace 回放录制好的 JSON 轨迹：{"name", "duration_ms", "config", "events"}
+# ----------------------------------------------------------------------
+
+
+def drag(t, start, end, hold_ms=1500, steps=20):
+    """按下并停顿一下 -> 按帧采样移动到 end -> 松开（和录制的轨迹一样每帧一个 move 事件）。"""
+    events = [[t, "hover", *start], [t + 200, "down"], [t + 400, "move", *start]]
+    for i in range(1, steps + 1):
+        x = start[0] + (end[0] - start[0]) * i // steps
+        y = start[1] + (end[1] - start[1]) * i // steps
+        events.append([t + 400 + hold_ms * i // steps, "move", x, y])
+    events.append([t + 600 + hold_ms, "up"])
+    return events
+
+
+def drag_path(t, points, interval_ms=10000):
+    """依次拖动：每次从上一次松开的位置（仍在精灵身上）抓起；间隔足够让生气动画播完。"""
+    events = []
+    for i, (start, end) in enumerate(zip(points, points[1:])):
+        events += drag(t + i * interval_ms, start, end)
+    return events
+
+
+TRACES = [
+    {
+        # 悬停头部召唤蝴蝶，然后离开；大部分时间在待机
+        "name": "hover",
+        "duration_ms": 20000,
+        "events": [[1000, "hover", 175, 125], [6000, "hover", 175, 190], [7000, "hover", -500, -500],
+                   [12000, "hover", 160, 120], [16000, "hover", -500, -500]],
+    },
+    {
+        # 连续拖动：每次松开都有概率生气
+        "name": "drag",
+        "duration_ms": 70000,
+        "config": {"angry_possibility": 0.54},
+        "events": drag_path(1000, [(175, 190), (700, 420), (300, 300), (900, 600), (500, 200), (200, 500),
+                                   (800, 300)]) + [[61000, "hover", -500, -500]],
+    },
+    {
+        # 打开设置窗口（宠物放大跟随），再关闭
+        "name": "settings",
+        "duration_ms": 15000,
+        "events": [[1000, "settings_open"], [9000, "settings_close"]],
+    },
+    {
+        # 长时间无人操作：钓鱼、闹脾气、休息（瞬移 + 全屏魔法雨）
+        "name": "unattended",
+        "duration_ms": 150000,
+        "config": {"fishing_cooldown_minutes": 0.25, "upset_interval_minutes": 2.2,
+                   "rest_interval_minutes": 1, "rest_duration_seconds": 8},
+        "events": [],
+    },
+    {
+        # 退出：告别动画
+        "name": "bye",
+        "duration_ms": 10000,
+        "events": [[1000, "quit"]],
+    },
+]
+
+
+def apply_gui_action(pet, kind):
+    """模拟 SettingsWindow 对状态机的操作。"""
+    if kind == "settings_open":
+        pet.change_state(DisplayState(pet))
+    elif kind == "settings_close":
+        if isinstance(pet.state, DisplayState):
+            pet.change_state(IdleState(pet))
+    elif kind == "quit":
+        pet.change_state(ByeState(pet))
+
+
+def replay(trace, seed):
+    """
+    在虚拟时间里回放一条轨迹，返回 {状态名: [每帧耗时 ms, ...]} 和运行信息。
+    每帧的墙钟耗时记在这一帧开始时的状态上。
+    """
+    with open(CONFIG_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(BASE_CONFIG)
+    config.update(trace.get("config", {}))
+
+    backend = HeadlessBackend(ScriptedCursor.from_trace(trace["events"]), seed=seed)
+    actions = sorted((event[0], event[1]) for event in trace["events"]
+                     if event[1] in ("settings_open", "settings_close", "quit"))
+    samples = defaultdict(list)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        pet = DesktopPet(WIDTH, HEIGHT, FPS, ANIMATION_CONFIG, config, backend=backend)
+        pet.persistent_keys = PERSISTENT_CONFIG_KEYS
+
+        wall_start = time.perf_counter()
+        while pet.running and backend.clock_ms < trace["duration_ms"]:
+            while actions and actions[0][0] <= backend.clock_ms:
+                apply_gui_action(pet, actions.pop(0)[1])
+            state = type(pet.state).__name__.removesuffix("State")
+            start = time.perf_counter()
+            pet.run(max_frames=1)
+            samples[state].append((time.perf_counter() - start) * 1000)
+        wall_seconds = time.perf_counter() - wall_start
+
+        if pet.running:
+            pet.cleanup(exit_process=False)
+
+    info = {
+        "frames": sum(len(values) for values in samples.values()),
+        "virtual_seconds": round(backend.clock_ms / 1000, 3),
+        "wall_seconds": round(wall_seconds, 3),
+        "frames_per_state": {state: len(values) for state, values in sorted(samples.items())},
+    }
+    return samples, info
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def summarize(values):
+    if not values:
+        return {"frames": 0}
+    values = sorted(values)
+    result = {"frames": len(values)}
+    for p in PERCENTILES:
+        result[f"p{round(p * 100)}_ms"] = round(percentile(values, p), 3)
+    result["max_ms"] = round(values[-1], 3)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results, baseline=None):
+    print(f"{'state':<10} {'frames':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+          + ("   p95 vs baseline" if baseline else ""))
+    for state in STATES:
+        row = results["states"][state]
+        if not row["frames"]:
+            print(f"{state:<10} {0:>7}")
+            continue
+        line = (f"{state:<10} {row['frames']:>7} {row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f} "
+                f"{row['p99_ms']:>8.3f} {row['max_ms']:>8.2f}")
+        old = (baseline or {}).get("states", {}).get(state, {})
+        if old.get("frames"):
+            change = (row["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+            line += f"   {change:+6.1f}%"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在无窗口后端上回放输入轨迹，统计各状态的帧耗时分位数")
+    parser.add_argument("--trace", action="append", default=[], help="录制的轨迹 JSON 文件（可多次指定，默认用内置轨迹）")
+    parser.add_argument("--repeat", type=int, default=3, help="每条轨迹回放次数（结果合并），默认 3")
+    parser.add_argument("--seed", type=int, default=SEED, help=f"随机种子，默认 {SEED}")
+    parser.add_argument("--output", help="把结果写入这个 JSON 文件")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果对比 p95")
+    args = parser.parse_args()
+
+    traces = TRACES
+    if args.trace:
+        traces = []
+        for path in args.trace:
+            with open(path, encoding="utf-8") as f:
+                traces.append(json.load(f))
+
+    print("-" * 50)
+    print(f"--- Replay benchmark: {len(traces)} traces x {args.repeat}, headless, seed {args.seed} ---")
+    print("-" * 50)
+
+    all_samples = defaultdict(list)
+    trace_results = {}
+    for trace in traces:
+        for run in range(args.repeat):
+            samples, info = replay(trace, args.seed)
+            for state, values in samples.items():
+                all_samples[state].extend(values)
+        # 回放是确定的，每次运行经过的状态和帧数都一样；记录最后一次
+        trace_results[trace["name"]] = info
+        print(f"   {trace['name']:<11} {info['frames']:5d} frames, {info['virtual_seconds']:6.1f} s virtual "
+              f"in {info['wall_seconds']:.2f} s wall: {info['frames_per_state']}")
+
+    results = {
+        "benchmark": "replay",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "fps": FPS,
+        "traces": trace_results,
+        "states": {state: summarize(all_samples.get(state, [])) for state in STATES},
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print("-" * 50)
+    print_table(results, baseline)
+    print("-" * 50)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"✅ Results written to {args.output}")
+    missing = [state for state in STATES if not results["states"][state]["frames"]]
+    if missing and not args.trace:
+        print(f"❌ Built-in traces never reached: {', '.join(missing)}")
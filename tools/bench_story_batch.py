@@ -0,0 +1,130 @@
+import json
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+sys.path.insert(0, str(APP_DIR))
+
+from story_manager import StoryManager, BATCH_SIZE  # noqa: E402
+from story_cache import StoryCache  # noqa: E402
+
+# 模拟到 deskfox.deno.dev 的往返时间
+RTT_MS = 80
+MAX_FOX_STORY_NUM = 7
+RANDOM_STORY_IDS = range(11, 20)
+UPLOADS = 100
+
+
+class MockPet:
+    last_read_index = 0
+
+
+class BatchStoryHandler(BaseHTTPRequestHandler):
+    """模拟 main.js：index 支持 "1,2,3" / "1-7"，POST 支持数组请求体。"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    store = {}
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        BatchStoryHandler.requests += 1
+        time.sleep(RTT_MS / 1000)
+        param = parse_qs(urlparse(self.path).query).get("index", [""])[0]
+        if not re.search(r"[,-]", param):
+            story = self.store.get(param)
+            self._send(200, json.dumps(story)) if story else self._send(404, "404 Not Found")
+            return
+        indices = []
+        for part in param.split(","):
+            if "-" in part:
+                first, last = map(int, part.split("-"))
+                indices += [str(i) for i in range(first, last + 1)]
+            else:
+                indices.append(part)
+        stories = {i: self.store[i] for i in indices if i in self.store}
+        self._send(200, json.dumps({"stories": stories, "etags": {i: f'"v-{i}"' for i in stories}}))
+
+    def do_POST(self):
+        BatchStoryHandler.requests += 1
+        time.sleep(RTT_MS / 1000)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        items = body if isinstance(body, list) else [body]
+        for item in items:
+            self.store[str(item["index"])] = item["data"]
+        self._send(200, f"写入成功 {len(items)} 条" if isinstance(body, list) else "写入成功")
+
+
+def timed(label, fn):
+    BatchStoryHandler.requests = 0
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<34} {BatchStoryHandler.requests:4d} requests   {elapsed:7.0f} ms")
+    return result
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BatchStoryHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    manager = StoryManager(MockPet(), base_url, "/stories")
+
+    stories = {i: {"title": f"Story {i}", "author": "Fox", "content": "……"} for i in range(1, UPLOADS + 1)}
+    candidates = list(range(1, MAX_FOX_STORY_NUM + 1)) + list(RANDOM_STORY_IDS)
+
+    print("-" * 50)
+    print(f"--- Single vs batch story requests ({RTT_MS} ms round trip) ---")
+    print("-" * 50)
+
+    timed(f"Upload {UPLOADS}, one POST each:", lambda: [manager.write_data_sync(i, s) for i, s in stories.items()])
+    reply = timed(f"Upload {UPLOADS}, write_data_many:", lambda: manager.write_data_many(stories))
+
+    single = timed(f"Fetch {len(candidates)} candidates one by one:",
+                   lambda: {i: manager.fetch_story_sync(i) for i in candidates})
+    batch = timed(f"Fetch {len(candidates)} candidates, batched:", lambda: manager.fetch_stories_many(candidates))
+
+    # 预热缓存之后，钓鱼结果全部命中缓存
+    cached = StoryManager(MockPet(), base_url, "/stories", cache=StoryCache(tempfile.mkdtemp()))
+    timed("Warm cache via prefetch_many:", lambda: cached.prefetch_many(candidates).future.result())
+    timed("Fetch candidates after warm-up:", lambda: [cached.fetch_story_sync(i) for i in candidates])
+
+    # 只有一个索引的批次：单独一个过期条目，或 BATCH_SIZE + 1 个索引时的最后一块
+    one = timed("Fetch a one-index batch:", lambda: manager.fetch_stories_many([3]))
+    tail = StoryManager(MockPet(), base_url, "/stories", cache=StoryCache(tempfile.mkdtemp()))
+    tail_indices = list(range(1, BATCH_SIZE + 2))
+    tail_batch = timed(f"Fetch {len(tail_indices)} (last chunk of one):", lambda: tail.fetch_stories_many(tail_indices))
+    tail_cached = [i for i in tail_indices if tail.cache.get(i) is not None]
+
+    manager.close()
+    cached.close()
+    tail.close()
+    server.shutdown()
+    ok = reply is not None and batch == single
+    one_ok = one == {3: stories[3]} and len(tail_batch) == len(tail_cached) == len(tail_indices)
+    print("-" * 50)
+    print("✅ Batch results match single requests" if ok else "❌ Batch results differ")
+    print(f"{'✅' if one_ok else '❌'} One-index batches: {len(one)} of 1 fetched; last chunk of one: "
+          f"{len(tail_batch)} of {len(tail_indices)} fetched, {len(tail_cached)} cached")
+    print("-" * 50)
@@ -0,0 +1,117 @@
+import json
+import random
+import shutil
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+sys.path.insert(0, str(APP_DIR))
+
+from story_manager import StoryManager  # noqa: E402
+from story_cache import StoryCache  # noqa: E402
+
+FISHES = 300
+FOX_STORY_POSSIBILITY = 0.61  # 与 pet_config.json 一致
+MAX_FOX_STORY_NUM = 7
+
+
+class MockPet:
+    last_read_index = 0
+
+
+class StoryHandler(BaseHTTPRequestHandler):
+    """模拟 Deno 故事服务（与 main.js 一样返回 ETag，并对 If-None-Match 返回 304）。"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    requests = {"200": 0, "304": 0}
+    bytes_sent = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        index = parse_qs(urlparse(self.path).query).get("index", ["0"])[0]
+        etag = f'"v1-{index}"'
+        if self.headers.get("If-None-Match") == etag:
+            StoryHandler.requests["304"] += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        story = {"title": f"Story {index}", "author": "Fox", "content": "从前有一只狐狸……" * 200}
+        data = json.dumps(story, ensure_ascii=False).encode("utf-8")
+        StoryHandler.requests["200"] += 1
+        StoryHandler.bytes_sent += len(data)
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def fishing_ids(rng, count):
+    """与 FishingState.handle_fishing_finished 相同的抽取方式（狐狸故事按顺序，其他随机 11..19）。"""
+    ids = []
+    next_fox = 1
+    for _ in range(count):
+        if rng.random() < FOX_STORY_POSSIBILITY and next_fox <= MAX_FOX_STORY_NUM:
+            ids.append(next_fox)
+            next_fox += 1
+        else:
+            ids.append(rng.choice(range(11, 20)))
+    return ids
+
+
+def run_session(label, manager, ids):
+    StoryHandler.requests = {"200": 0, "304": 0}
+    StoryHandler.bytes_sent = 0
+    manager.cache.stats = {key: 0 for key in manager.cache.stats}
+    failures = sum(1 for index in ids if manager.fetch_story_sync(index) is None)
+    print(f"{label:<22} {manager.cache.summary()}")
+    print(f"{'':<22} network: {StoryHandler.requests['200']} downloads "
+          f"({StoryHandler.bytes_sent / 1024:.0f} KiB), {StoryHandler.requests['304']} not-modified, "
+          f"{failures} failed fishes")
+    return failures
+
+
+if __name__ == "__main__":
+    rng = random.Random(7)
+    cache_dir = tempfile.mkdtemp()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StoryHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print("-" * 50)
+    print(f"--- Story cache over {FISHES} successful fishes ---")
+    print("-" * 50)
+
+    ids = fishing_ids(rng, FISHES)
+    manager = StoryManager(MockPet(), base_url, "/stories", cache=StoryCache(cache_dir))
+    run_session("Cold cache:", manager, ids)
+
+    # 新进程 + TTL 已过期：所有条目都要用 ETag 重新验证
+    manager = StoryManager(MockPet(), base_url, "/stories", cache=StoryCache(cache_dir, ttl_seconds=0))
+    run_session("Expired TTL:", manager, ids)
+
+    # 服务器不可达：过期条目依然可用
+    server.shutdown()
+    server.server_close()
+    manager = StoryManager(MockPet(), base_url, "/stories", max_retries=0,
+                           cache=StoryCache(cache_dir, ttl_seconds=0))
+    offline_failures = run_session("Offline:", manager, sorted(set(ids)))
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    print("-" * 50)
+    print("✅ Offline fishes served from cache" if offline_failures == 0 else "❌ Offline fishes failed")
+    print("-" * 50)
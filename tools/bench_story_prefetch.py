@@ -0,0 +1,111 @@
+import json
+import queue
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+sys.path.insert(0, str(APP_DIR))
+
+from message_bus import MessageBus  # noqa: E402
+from story_manager import StoryManager  # noqa: E402
+
+# 模拟到 deskfox.deno.dev 的请求耗时（冷启动的 Deno Deploy 实例 + KV 读取）
+SERVER_DELAY_MS = 300
+# 钓鱼动画（真实为 120 帧 @ 15 FPS = 8 s；这里缩短以加快测量，只要长于请求耗时即可）
+ANIMATION_SECONDS = 0.8
+# 原 DesktopPet._process_queue 的轮询间隔（现在结果到达即唤醒主循环；这里保留轮询模型，便于和之前的结果对比）
+QUEUE_POLL_MS = 250
+FISHES = 8
+
+
+class MockPet:
+    last_read_index = 0
+
+    def __init__(self):
+        self.bus = MessageBus()
+
+
+class SlowStoryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        index = parse_qs(urlparse(self.path).query).get("index", ["0"])[0]
+        time.sleep(SERVER_DELAY_MS / 1000)
+        data = json.dumps({"title": f"Story {index}", "author": "Fox", "content": "……"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def wait_for_queue(pet, finished_at):
+    """模拟 Tk 轮询：每 QUEUE_POLL_MS 检查一次结果队列。"""
+    while True:
+        try:
+            pet.bus.get(block=False)
+            return (time.perf_counter() - finished_at) * 1000
+        except queue.Empty:
+            time.sleep(QUEUE_POLL_MS / 1000)
+
+
+def fish_after_animation(manager, pet, story_id):
+    """旧流程：动画结束后才发起请求。"""
+    time.sleep(ANIMATION_SECONDS)
+    finished_at = time.perf_counter()
+    manager.fetch_story_async(story_id)
+    return wait_for_queue(pet, finished_at)
+
+
+def fish_with_prefetch(manager, pet, story_id):
+    """新流程：进入钓鱼状态时预取，动画结束时直接取结果。"""
+    manager.prefetch(story_id)
+    time.sleep(ANIMATION_SECONDS)
+    finished_at = time.perf_counter()
+    ready, story = manager.take_prefetched(story_id)
+    if ready:
+        return (time.perf_counter() - finished_at) * 1000
+    manager.fetch_story_async(story_id)
+    return wait_for_queue(pet, finished_at)
+
+
+def measure(label, fish, manager, pet, first_id):
+    latencies = [fish(manager, pet, first_id + i) for i in range(FISHES)]
+    print(f"{label:<28} median {statistics.median(latencies):7.1f} ms   max {max(latencies):7.1f} ms")
+    return latencies
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowStoryHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    pet = MockPet()
+    # 不带缓存：每次都是新故事（最坏情况）
+    manager = StoryManager(pet, base_url, "/stories")
+
+    print("-" * 50)
+    print(f"--- End-of-animation -> prompt latency ({SERVER_DELAY_MS} ms server, {QUEUE_POLL_MS} ms queue poll) ---")
+    print("-" * 50)
+
+    measure("Fetch after animation:", fish_after_animation, manager, pet, 100)
+    prefetched = measure("Prefetch during animation:", fish_with_prefetch, manager, pet, 200)
+
+    manager.close()
+    server.shutdown()
+    print("-" * 50)
+    print("✅ Story ready when the animation ends" if max(prefetched) < 5 else "❌ Prefetch did not hide the latency")
+    print("-" * 50)
@@ -0,0 +1,204 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：Pygame 不开窗口（精灵画到内存里），Tk 需要真实的显示器；
+#    用户数据写到临时目录，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="deskfox-tkpump-")
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "src" / "config" / "pet_config.json"
+sys.path.insert(0, str(APP_DIR))
+
+import tkinter as tk  # noqa: E402
+
+from animation_config import ANIMATION_CONFIG  # noqa: E402
+from config_manager import PERSISTENT_CONFIG_KEYS  # noqa: E402
+from frame_profiler import STAGES  # noqa: E402
+from pet_desktop import DesktopPet  # noqa: E402
+from platform_backend import HeadlessBackend  # noqa: E402
+
+WIDTH, HEIGHT, FPS = 150, 150, 15
+SEED = 7
+# 设置窗口打开期间，每隔几帧移动一次窗口（<Configure> + CustomTkinter 重绘 + 宠物跟随）
+MOVE_EVERY_FRAMES = 3
+
+CONFIG_OVERRIDES = {
+    "current_x": 300,
+    "current_y": 300,
+    "web_service_url": "http://127.0.0.1:9",
+}
+# 没有 $DISPLAY 时自己起一个虚拟显示器（需要 Xvfb）
+XVFB_DISPLAY = ":97"
+
+
+class LegacyTkPump:
+    """对照组：改动前的做法，每帧 update_idletasks() + update()，不看有没有 Tk 窗口。"""
+
+    windows_visible = False
+    backlog = False
+
+    def __init__(self, root):
+        self.root = root
+
+    def pump(self):
+        try:
+            self.root.update_idletasks()
+            self.root.update()
+        except tk.TclError:
+            pass
+        return 0
+
+    def ms_until_next_pump(self):
+        return None
+
+    def summary(self):
+        return "update_idletasks() + update() every frame"
+
+
+def start_virtual_display():
+    """
+    没有 $DISPLAY 且装了 Xvfb 时启动 Xvfb 并设置 DISPLAY；返回进程（用完要 terminate），否则返回 None。
+    """
+    if os.environ.get("DISPLAY") or not shutil.which("Xvfb"):
+        return None
+    process = subprocess.Popen(["Xvfb", XVFB_DISPLAY, "-screen", "0", "1920x1080x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socket = Path("/tmp/.X11-unix") / f"X{XVFB_DISPLAY[1:]}"
+    end = time.perf_counter() + 5
+    while not socket.exists() and process.poll() is None and time.perf_counter() < end:
+        time.sleep(0.05)
+    os.environ["DISPLAY"] = XVFB_DISPLAY
+    return process
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+def run_for(pet, seconds, settings=None):
+    """
+    跑 seconds 秒，强制保持满帧率节奏（每帧都应在上一帧开始后 1 / FPS 开始）。
+    返回帧间隔 (ms) 和每帧 Tk 阶段耗时 (ms)。
+    """
+    intervals = []
+    frames = 0
+    last = None
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end and pet.running:
+        pet.scheduler.note_activity()
+        start = time.perf_counter()
+        if last is not None:
+            intervals.append((start - last) * 1000)
+        last = start
+
+        if settings is not None and frames % MOVE_EVERY_FRAMES == 0:
+            offset = 40 if (frames // MOVE_EVERY_FRAMES) % 2 else 0
+            settings.geometry(f"+{600 + offset}+{200 + offset}")
+        pet.run(max_frames=1)
+        frames += 1
+
+    tk_ms = pet.profiler.recent(frames)[:, STAGES.index("tk")].tolist()
+    return intervals, tk_ms
+
+
+def summarize(intervals, tk_ms):
+    target = 1000 / FPS
+    jitter = [abs(value - target) for value in intervals]
+    return {
+        "frames": len(intervals),
+        "interval_p50_ms": round(percentile(intervals, 0.5), 3),
+        "interval_p99_ms": round(percentile(intervals, 0.99), 3),
+        "interval_max_ms": round(max(intervals, default=0.0), 3),
+        "jitter_p95_ms": round(percentile(jitter, 0.95), 3),
+        "jitter_p99_ms": round(percentile(jitter, 0.99), 3),
+        "tk_p50_ms": round(percentile(tk_ms, 0.5), 3),
+        "tk_p99_ms": round(percentile(tk_ms, 0.99), 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="设置窗口关闭 / 打开时的帧间隔抖动：每帧 update() 与 TkPump 对比")
+    parser.add_argument("--seconds", type=float, default=10, help="每个阶段的测量时长（秒），默认 10")
+    parser.add_argument("--output", help="把结果写入这个 JSON 文件")
+    args = parser.parse_args()
+
+    xvfb = start_virtual_display()
+    print("-" * 50)
+    print(f"--- Frame jitter with the Settings window closed / open ({args.seconds:.0f} s each, {FPS} FPS, "
+          f"display {os.environ.get('DISPLAY', 'none')}{' via Xvfb' if xvfb else ''}) ---")
+    print("-" * 50)
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"❌ Tk could not open a display: {e} (set $DISPLAY or install Xvfb)")
+        if xvfb is not None:
+            xvfb.terminate()
+        sys.exit(1)
+    try:
+        from settings_gui import SettingsWindow  # noqa: F401
+    except ImportError as e:
+        print(f"❌ The Settings window is not available: {e}")
+        root.destroy()
+        if xvfb is not None:
+            xvfb.terminate()
+        sys.exit(1)
+
+    with open(CONFIG_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(CONFIG_OVERRIDES)
+    root.withdraw()
+    root.config = config
+
+    results = {}
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        pet = DesktopPet(WIDTH, HEIGHT, FPS, ANIMATION_CONFIG, config,
+                         backend=HeadlessBackend(seed=SEED, realtime=True))
+        pet.persistent_keys = PERSISTENT_CONFIG_KEYS
+        pet.attach_tk_root(root)
+        tk_pump = pet.tk_pump
+
+        for pump_name, pump in (("update", LegacyTkPump(root)), ("TkPump", tk_pump)):
+            pet.tk_pump = pump
+            run_for(pet, 1)
+            results[f"{pump_name} / closed"] = summarize(*run_for(pet, args.seconds))
+
+            pet.open_settings()
+            # 等窗口画出来、宠物进入跟随状态
+            run_for(pet, 1.5)
+            results[f"{pump_name} / open"] = summarize(*run_for(pet, args.seconds, pet.settings_window))
+            pet.settings_window.close_window()
+
+        pet.cleanup(exit_process=False)
+    root.destroy()
+    if xvfb is not None:
+        xvfb.terminate()
+
+    print(f"{'pump / settings':<18} {'frames':>6} {'int p50':>8} {'int p99':>8} {'int max':>8} "
+          f"{'jit p95':>8} {'jit p99':>8} {'tk p99':>8}")
+    for name, row in results.items():
+        print(f"{name:<18} {row['frames']:>6} {row['interval_p50_ms']:>8.2f} {row['interval_p99_ms']:>8.2f} "
+              f"{row['interval_max_ms']:>8.2f} {row['jitter_p95_ms']:>8.2f} {row['jitter_p99_ms']:>8.2f} "
+              f"{row['tk_p99_ms']:>8.3f}")
+    print("-" * 50)
+    print(f"   target interval {1000 / FPS:.2f} ms; jitter = |interval - target|; TkPump: {tk_pump.summary()}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"fps": FPS, "seconds": args.seconds, "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"✅ Results written to {args.output}")
@@ -0,0 +1,111 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：无窗口运行 Pygame，用户数据写到临时目录，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="deskfox-transitions-")
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "src" / "config" / "pet_config.json"
+sys.path.insert(0, str(APP_DIR))
+
+from animation_config import ANIMATION_CONFIG  # noqa: E402
+from pet_desktop import DesktopPet  # noqa: E402
+from platform_backend import HeadlessBackend  # noqa: E402
+
+REPEAT = 5
+# 从待机切换过去的序列（和它们的帧源）
+TRANSITIONS = [("teleport", "teleport"), ("magic_start", "magic"), ("fishing", "fishing"),
+               ("upset", "upset"), ("angry", "angry"), ("butterfly", "butterfly"),
+               ("display", "display")]
+
+CONFIG_OVERRIDES = {
+    "current_x": 100,
+    "current_y": 100,
+    "web_service_url": "http://127.0.0.1:9",
+}
+
+
+def check(label, ok, detail):
+    print(f"{'✅' if ok else '❌'} {label}: {detail}")
+    return ok
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def transition_ms(pet, sequence, source, prefetch, atlas=True):
+    """
+    待机 -> sequence 的首帧耗时（AnimationController.first_frame_ms 记录的值）。
+    prefetch: 先让 AnimationPrefetcher 在后台解码好帧源（模拟定时器到期前的预取）；否则帧源不在内存里（冷启动）。
+    atlas: False 时不用烘焙好的帧图集，冷启动要从 PNG 解码（首次运行或图集写不进去时的情况）。
+    """
+    animator, registry, prefetcher = pet.animator, pet.all_animations, pet.prefetcher
+    animator.set_animation("idle")
+    registry.discard(source)
+    baked = pet.frame_atlas.atlas
+    if not atlas:
+        pet.frame_atlas.atlas = None
+    if prefetch:
+        prefetcher.release()
+        prefetcher.request(source)
+        while not registry.is_resident(source):
+            time.sleep(0.001)
+            prefetcher.pump()
+    animator.set_animation(sequence)
+    pet.frame_atlas.atlas = baked
+    # 从 PNG 解码的帧会被暂存起来等待烘焙，基准里不需要
+    pet.frame_atlas._pending.clear()
+    return animator.first_frame_ms[sequence][-1]
+
+
+if __name__ == "__main__":
+    print("-" * 50)
+    print(f"--- Time to first frame: cold vs prefetched transitions (median of {REPEAT}) ---")
+    print("-" * 50)
+
+    with open(CONFIG_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(CONFIG_OVERRIDES)
+
+    rows = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        # 第一次创建会烘焙帧图集；冷启动测的是之后常见的情况（从图集加载）
+        DesktopPet(150, 150, 15, ANIMATION_CONFIG, config, backend=HeadlessBackend()).cleanup(exit_process=False)
+        pet = DesktopPet(150, 150, 15, ANIMATION_CONFIG, config, backend=HeadlessBackend())
+        for sequence, source in TRANSITIONS:
+            decoded = [transition_ms(pet, sequence, source, prefetch=False, atlas=False) for _ in range(REPEAT)]
+            cold = [transition_ms(pet, sequence, source, prefetch=False) for _ in range(REPEAT)]
+            warm = [transition_ms(pet, sequence, source, prefetch=True) for _ in range(REPEAT)]
+            rows.append((sequence, median(decoded), median(cold), median(warm)))
+        summary = pet.animator.first_frame_summary()
+        pet.cleanup(exit_process=False)
+
+    print(f"{'sequence':<12} {'cold, PNG ms':>13} {'cold, atlas ms':>15} {'prefetched ms':>14}")
+    for sequence, decoded, cold, warm in rows:
+        print(f"{sequence:<12} {decoded:>13.2f} {cold:>15.3f} {warm:>14.3f}")
+    print("-" * 50)
+    print(f"   cleanup summary: {summary}")
+
+    worst_warm = max(warm for _, _, _, warm in rows)
+    worst_cold = max(cold for _, _, cold, _ in rows)
+    results = [
+        check("Prefetched transitions", all(warm < decoded for _, decoded, _, warm in rows),
+              f"every prefetched transition beats the cold PNG decode (slowest prefetched {worst_warm:.3f} ms)"),
+        check("Atlas cold start", worst_cold < min(decoded for _, decoded, _, _ in rows),
+              f"cold loads from the baked atlas take at most {worst_cold:.3f} ms (zero-copy views)"),
+        check("Measurable", all(sequence in summary for sequence, _, _, _ in rows),
+              "every transition shows up in the time-to-first-frame summary"),
+    ]
+    print("-" * 50)
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,152 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：无窗口运行 Pygame，用户数据写到临时目录，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="deskfox-animmem-")
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "src" / "config" / "pet_config.json"
+sys.path.insert(0, str(APP_DIR))
+
+from animation_config import ANIMATION_CONFIG  # noqa: E402
+from pet_desktop import DesktopPet  # noqa: E402
+from pet_states import DisplayState  # noqa: E402
+from platform_backend import HeadlessBackend, ScriptedCursor  # noqa: E402
+
+SEED = 7
+
+# 和 bench_replay 的 "unattended" 轨迹相同：无人操作，钓鱼、闹脾气、休息（瞬移 + 魔法雨）轮流出现
+UNATTENDED_MS = 150000
+UNATTENDED_CONFIG = {"fishing_cooldown_minutes": 0.25, "upset_interval_minutes": 2.2,
+                     "rest_interval_minutes": 1, "rest_duration_seconds": 8}
+# 光标停在精灵身上（拖动的几套动画都在预取范围内）
+RESTING_CURSOR = [(0, 175, 190, False)]
+RESTING_MS = 30000
+DISPLAY_FRAMES = 150
+
+CONFIG_OVERRIDES = {
+    "current_x": 100,
+    "current_y": 100,
+    "web_service_url": "http://127.0.0.1:9",
+}
+
+
+def check(label, ok, detail):
+    print(f"{'✅' if ok else '❌'} {label}: {detail}")
+    return ok
+
+
+def make_pet(overrides=None, cursor=None):
+    """创建宠物并统计之后每个动画源被真正加载（解码 + 安装）的次数。"""
+    with open(CONFIG_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(CONFIG_OVERRIDES)
+    config.update(overrides or {})
+    backend = HeadlessBackend(cursor or ScriptedCursor(), seed=SEED)
+    with contextlib.redirect_stdout(io.StringIO()):
+        pet = DesktopPet(150, 150, 15, ANIMATION_CONFIG, config, backend=backend)
+
+    registry = pet.all_animations
+    # 首次运行烘焙帧图集时的加载 / 淘汰不算在内
+    registry.stats.update(loads=0, evictions=0)
+    loads = Counter()
+    install = registry.install
+
+    def counting_install(name, decoded):
+        if not registry.is_resident(name):
+            loads[name] += 1
+        return install(name, decoded)
+
+    registry.install = counting_install
+    pet.state_changes = 0
+    change_state = pet.change_state
+
+    def counting_change_state(new_state):
+        pet.state_changes += 1
+        change_state(new_state)
+
+    pet.change_state = counting_change_state
+    return pet, loads
+
+
+def run_until(pet, end_ms):
+    with contextlib.redirect_stdout(io.StringIO()):
+        frames = 0
+        while pet.running and pet.backend.clock_ms < end_ms:
+            pet.run(max_frames=1)
+            frames += 1
+    return frames
+
+
+def finish(pet):
+    with contextlib.redirect_stdout(io.StringIO()):
+        pet.cleanup(exit_process=False)
+
+
+if __name__ == "__main__":
+    print("-" * 50)
+    print("--- Animation sheet loads with a memory budget and background prefetch ---")
+    print("-" * 50)
+
+    # 1. 无人操作的回放：每次进入新状态最多加载一次，预取的每张图每段需要期内最多解码一次
+    pet, loads = make_pet(UNATTENDED_CONFIG)
+    frames = run_until(pet, UNATTENDED_MS)
+    sources = len(pet.all_animations.keys())
+    unattended = (sum(loads.values()), pet.all_animations.stats["evictions"], pet.state_changes,
+                  pet.prefetcher.stats["requested"], frames)
+    finish(pet)
+
+    # 2. 光标一直停在精灵身上：拖动动画只预取一次
+    pet, loads = make_pet(cursor=ScriptedCursor(RESTING_CURSOR))
+    run_until(pet, RESTING_MS)
+    resting = (max(loads.values(), default=0), pet.prefetcher.stats["requested"])
+    finish(pet)
+
+    # 3. 设置窗口打开（DisplayState）时休息、钓鱼、闹脾气三个定时器都已到期
+    pet, loads = make_pet()
+    with contextlib.redirect_stdout(io.StringIO()):
+        pet.change_state(DisplayState(pet))
+    pet.expired_timers.update(("rest", "fishing", "upset"))
+    run_until(pet, pet.backend.clock_ms + DISPLAY_FRAMES * 1000 / 15)
+    display = (sum(loads.values()), max(loads.values(), default=0))
+
+    # 4. 播放中的大图（display）不会因为别的图加载而被淘汰，resident_bytes 仍然算上它
+    registry = pet.all_animations
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name in ("teleport", "magic", "fishing", "upset", "butterfly", "angry"):
+            registry[name]
+    playing = pet.animator.current_source_name
+    playing_kept = (playing, registry.is_resident(playing), registry.resident_bytes / (1024 * 1024),
+                    registry.memory_budget_bytes / (1024 * 1024))
+    finish(pet)
+
+    total, evictions, changes, requested, frames = unattended
+    print(f"   unattended: {frames} frames, {changes} state changes, {total} loads, {evictions} evictions, "
+          f"{requested} prefetch requests ({sources} sources)")
+    print(f"   cursor resting on the sprite: {resting[1]} prefetch requests, at most {resting[0]} load(s) per source")
+    print(f"   display with expired timers: {display[0]} loads in {DISPLAY_FRAMES} frames")
+    print(f"   after loading six more sheets while '{playing_kept[0]}' plays: resident {playing_kept[2]:.1f} MB "
+          f"(budget {playing_kept[3]:.0f} MB)")
+    print("-" * 50)
+
+    results = [
+        check("Unattended loads bounded", total <= changes + sources and evictions <= total,
+              f"{total} loads / {evictions} evictions for {changes} state changes (bound {changes + sources})"),
+        check("Standing prefetch", resting[0] <= 1,
+              f"each drag sheet decoded at most once while the cursor rests on the sprite ({resting[1]} requests)"),
+        check("No reloads while busy", display[1] <= 1,
+              f"{display[0]} loads in {DISPLAY_FRAMES} frames, no source loaded twice"),
+        check("Playing sheet stays resident", playing_kept[1],
+              f"'{playing_kept[0]}' is still resident and counted in resident_bytes"),
+    ]
+    print("-" * 50)
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,109 @@
+import contextlib
+import errno
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：无窗口运行 Pygame，用户数据写到临时目录，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="deskfox-atlas-")
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "src" / "config" / "pet_config.json"
+sys.path.insert(0, str(APP_DIR))
+
+import frame_atlas  # noqa: E402
+import pet_desktop  # noqa: E402
+from animation_config import ANIMATION_CONFIG  # noqa: E402
+from config_manager import get_user_data_dir  # noqa: E402
+from platform_backend import HeadlessBackend  # noqa: E402
+
+# 启动之后才用到的几张非常驻的图（模拟之后播放的动画）
+LATER_SHEETS = ("teleport", "fishing", "upset")
+DiskUsage = namedtuple("DiskUsage", ["total", "used", "free"])
+
+CONFIG_OVERRIDES = {
+    "current_x": 100,
+    "current_y": 100,
+    "web_service_url": "http://127.0.0.1:9",
+}
+
+
+def check(label, ok, detail):
+    print(f"{'✅' if ok else '❌'} {label}: {detail}")
+    return ok
+
+
+def launch(atlas_file_name):
+    """
+    启动一次宠物（帧图集写到 atlas_file_name），再加载几张之后才用到的图。
+    返回 (启动时加载的图数, 是否还在暂存待烘焙的帧, 图集是否可用, 是否还在记录)。
+    """
+    with open(CONFIG_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(CONFIG_OVERRIDES)
+    pet_desktop.ATLAS_FILE_NAME = atlas_file_name
+    with contextlib.redirect_stdout(io.StringIO()):
+        pet = pet_desktop.DesktopPet(150, 150, 15, ANIMATION_CONFIG, config, backend=HeadlessBackend())
+        startup_loads = pet.all_animations.stats["loads"]
+        for name in LATER_SHEETS:
+            pet.all_animations[name]
+        atlas = pet.frame_atlas
+        result = (startup_loads, bool(atlas._pending), atlas.is_valid, atlas.recording)
+        pet.cleanup(exit_process=False)
+    return result
+
+
+def failing_write(path, key, sheets):
+    raise OSError(errno.ENOSPC, "No space left on device")
+
+
+if __name__ == "__main__":
+    print("-" * 50)
+    print("--- Frame atlas that cannot be written (read-only / full profile directory) ---")
+    print("-" * 50)
+
+    data_dir = get_user_data_dir()
+    # 1. 目录不可写：图集路径的上一级是普通文件（root 也写不进去）
+    Path(data_dir, "blocker").write_bytes(b"")
+    read_only = launch(os.path.join("blocker", frame_atlas.ATLAS_FILE_NAME))
+
+    # 2. 磁盘满：烘焙时写入失败
+    write_atlas = frame_atlas.write_atlas
+    frame_atlas.write_atlas = failing_write
+    full = launch(frame_atlas.ATLAS_FILE_NAME)
+    frame_atlas.write_atlas = write_atlas
+
+    # 3. 下一次启动时空间仍然不够 -> 不再烘焙；4. 空间够了 -> 烘焙，之后命中图集
+    frame_atlas.shutil = type("FullDisk", (), {"disk_usage": staticmethod(lambda path: DiskUsage(1, 1, 0))})
+    still_full = launch(frame_atlas.ATLAS_FILE_NAME)
+    frame_atlas.shutil = shutil
+    freed = launch(frame_atlas.ATLAS_FILE_NAME)
+    warm = launch(frame_atlas.ATLAS_FILE_NAME)
+
+    for name, (loads, pending, valid, recording) in (("read-only directory", read_only), ("disk full", full),
+                                                     ("next launch, still full", still_full),
+                                                     ("space freed", freed), ("warm launch", warm)):
+        print(f"   {name:<24} {loads:2d} sheets loaded at startup, staged frames {pending}, "
+              f"atlas valid {valid}, recording {recording}")
+    print("-" * 50)
+
+    results = [
+        check("Read-only directory", read_only[0] == 1 and not read_only[1] and not read_only[3],
+              "no first-run bake, nothing staged, sheets decoded on demand"),
+        check("Failed write", not full[1] and not full[3],
+              "recording stops for the session, later sheets are not staged"),
+        check("No retry while full", still_full[0] == 1 and not still_full[3],
+              "the next launch skips the bake while the disk lacks the space the failed write needed"),
+        check("Bake after space is freed", freed[0] > 1 and warm[2] and warm[0] == 1,
+              f"baked {freed[0]} sheets once, then served from the atlas"),
+    ]
+    print("-" * 50)
+    sys.exit(0 if all(results) else 1)
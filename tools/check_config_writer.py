@@ -0,0 +1,147 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+sys.path.insert(0, str(APP_DIR))
+
+from config_manager import ConfigWriter, PERSISTENT_CONFIG_KEYS  # noqa: E402
+from state_store import JournaledStateStore  # noqa: E402
+
+DEBOUNCE_SECONDS = 0.05
+STRESS_ROUNDS = 200
+
+
+class LastComerFirstLock:
+    """
+    代替 ConfigWriter._write_lock 的锁：释放时交给最后一个开始等待的线程。
+    用来强制“后台线程先等锁，主线程的 save_now 后来却先写”的交错顺序。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._held = False
+        self.waiters = []
+
+    def acquire(self):
+        with self._cond:
+            ticket = object()
+            self.waiters.append(ticket)
+            while self._held or self.waiters[-1] is not ticket:
+                self._cond.wait()
+            self.waiters.pop()
+            self._held = True
+        return True
+
+    def release(self):
+        with self._cond:
+            self._held = False
+            self._cond.notify_all()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def wait_until(predicate, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > end:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def stored_value(path, key):
+    return JournaledStateStore(path).load().get(key)
+
+
+def check(label, ok, detail):
+    print(f"{'✅' if ok else '❌'} {label}: {detail}")
+    return ok
+
+
+def forced_interleaving(directory):
+    """
+    1. 后台线程的防抖到期，开始等写锁（此时拿着旧快照 x=1 的实现会出错）
+    2. 主线程 save_now(x=2)，也在等写锁
+    3. 释放写锁，主线程先写 -> 后台线程之后不能再写回 x=1
+    """
+    path = os.path.join(directory, "forced.json")
+    writer = ConfigWriter(JournaledStateStore(path), debounce_seconds=DEBOUNCE_SECONDS,
+                          max_delay_seconds=DEBOUNCE_SECONDS)
+    gate = LastComerFirstLock()
+    writer._write_lock = gate
+
+    gate.acquire()
+    writer.mark_dirty({"current_x": 1}, PERSISTENT_CONFIG_KEYS)
+    worker_waiting = wait_until(lambda: len(gate.waiters) == 1)
+
+    saver = threading.Thread(target=writer.save_now, args=({"current_x": 2}, PERSISTENT_CONFIG_KEYS))
+    saver.start()
+    saver_waiting = wait_until(lambda: len(gate.waiters) == 2)
+    gate.release()
+    saver.join()
+    wait_until(lambda: not gate.waiters)
+    time.sleep(DEBOUNCE_SECONDS * 4)
+    writer.close()
+    return worker_waiting and saver_waiting, stored_value(path, "current_x")
+
+
+def stress(directory):
+    """
+    拖动（每帧 mark_dirty）和设置窗口的 save_now 同时进行，两者都快照同一个配置字典（和程序里一样）；
+    每次 save_now 返回后，存储里必须是它保存的值。
+    """
+    path = os.path.join(directory, "stress.json")
+    writer = ConfigWriter(JournaledStateStore(path), debounce_seconds=0.001, max_delay_seconds=0.002)
+    config = {"current_x": -1, "current_y": 0}
+    stop = threading.Event()
+
+    def dragging():
+        while not stop.is_set():
+            config["current_y"] -= 1
+            writer.mark_dirty(config, PERSISTENT_CONFIG_KEYS)
+            time.sleep(0.0005)
+
+    drag_thread = threading.Thread(target=dragging)
+    drag_thread.start()
+    reverted = 0
+    for value in range(STRESS_ROUNDS):
+        config["current_x"] = value
+        writer.save_now(config, PERSISTENT_CONFIG_KEYS)
+        time.sleep(0.003)
+        if writer.store.state.get("current_x") != value:
+            reverted += 1
+    stop.set()
+    drag_thread.join()
+    writer.close()
+    return reverted, stored_value(path, "current_x")
+
+
+if __name__ == "__main__":
+    print("-" * 50)
+    print("--- ConfigWriter: immediate saves vs. the debounced worker ---")
+    print("-" * 50)
+
+    with tempfile.TemporaryDirectory() as directory:
+        forced, final_x = forced_interleaving(directory)
+        reverted, stress_x = stress(directory)
+
+    results = [
+        check("Forced interleaving", forced and final_x == 2,
+              f"worker waited for the write lock, save_now(x=2) wrote first; on disk x={final_x}"),
+        check("Save/drag stress", reverted == 0 and stress_x == STRESS_ROUNDS - 1,
+              f"{STRESS_ROUNDS} save_now calls during a drag, {reverted} reverted, final x={stress_x}"),
+    ]
+    print("-" * 50)
+    sys.exit(0 if all(results) else 1)
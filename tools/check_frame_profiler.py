@@ -0,0 +1,107 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：无窗口运行 Pygame，用户数据写到临时目录，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="deskfox-profile-")
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "src" / "config" / "pet_config.json"
+sys.path.insert(0, str(APP_DIR))
+
+import pygame  # noqa: E402
+
+from animation_config import ANIMATION_CONFIG  # noqa: E402
+from config_manager import PERSISTENT_CONFIG_KEYS  # noqa: E402
+from frame_profiler import STAGES  # noqa: E402
+from pet_desktop import DesktopPet  # noqa: E402
+from platform_backend import HeadlessBackend, ScriptedCursor, profiler_hotkey_event  # noqa: E402
+
+FRAMES = 600
+SEED = 7
+
+CONFIG_OVERRIDES = {
+    "current_x": 100,
+    "current_y": 100,
+    "web_service_url": "http://127.0.0.1:9",
+}
+
+
+def check(label, ok, detail):
+    print(f"{'✅' if ok else '❌'} {label}: {detail}")
+    return ok
+
+
+def run_frames(pet, count):
+    for _ in range(count):
+        if not pet.running:
+            break
+        pet.run(max_frames=1)
+
+
+if __name__ == "__main__":
+    print("-" * 50)
+    print(f"--- Frame profiler on the headless backend ({FRAMES} frames) ---")
+    print("-" * 50)
+
+    with open(CONFIG_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(CONFIG_OVERRIDES)
+
+    # 悬停在头部，让精灵持续动起来
+    backend = HeadlessBackend(ScriptedCursor([(500, 175, 125, False)]), seed=SEED)
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        pet = DesktopPet(150, 150, 15, ANIMATION_CONFIG, config, backend=backend)
+        pet.persistent_keys = PERSISTENT_CONFIG_KEYS
+        profiler = pet.profiler
+        # 每帧都检查是否到了导出时间
+        profiler.dump_interval = 0
+
+        run_frames(pet, FRAMES // 2)
+        corner_before = backend.presenter.pixels[:8, :40].copy()
+
+        # Ctrl + Shift + F3 -> 叠加层出现在左上角
+        pygame.event.post(profiler_hotkey_event())
+        run_frames(pet, FRAMES // 2)
+        corner_after = backend.presenter.pixels[:8, :40].copy()
+        overlay_visible = profiler.overlay_visible
+
+        # 再按一次 -> 叠加层消失
+        pygame.event.post(profiler_hotkey_event())
+        run_frames(pet, 2)
+        corner_hidden = backend.presenter.pixels[:8, :40].copy()
+
+        dump_path = profiler.dump_path
+        pet.cleanup(exit_process=False)
+
+    rows = profiler.recent()
+    stats = profiler.stage_stats(rows)
+    print(f"   {profiler.count} frames profiled; mean ms per stage:")
+    print("   " + ", ".join(f"{name} {stats[name]['mean_ms']:.3f}" for name in STAGES))
+    print(f"   busy p50 {stats['busy']['p50_ms']:.3f} ms, p95 {stats['busy']['p95_ms']:.3f} ms")
+
+    with open(dump_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    results = [
+        check("Stage timing", profiler.count == FRAMES + 2 and all(name in stats for name in STAGES),
+              f"{profiler.count} frames with {len(STAGES)} stages each"),
+        check("Hotkey overlay", overlay_visible and not (corner_after == corner_before).all(),
+              "Ctrl + Shift + F3 draws the overlay into the presented window"),
+        check("Overlay hidden", not profiler.overlay_visible and not (corner_hidden == corner_after).all(),
+              "a second press removes it again"),
+        check("JSONL export", len(records) > 1 and sum(r["frames"] for r in records) == profiler.count
+              and set(STAGES) <= set(records[-1]["stages"]),
+              f"{len(records)} records covering every frame in {os.path.basename(dump_path)}"),
+        check("Cleanup summary", "Frame profile: last" in log.getvalue(), profiler.summary()),
+    ]
+    print("-" * 50)
+    sys.exit(0 if all(results) else 1)
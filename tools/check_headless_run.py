@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：无窗口运行 Pygame，并让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+CONFIG_PATH = Path(__file__).resolve().parents[1] / "src" / "config" / "pet_config.json"
+sys.path.insert(0, str(APP_DIR))
+
+FRAMES = 1800
+SEED = 7
+
+# 光标脚本（虚拟毫秒, 屏幕 x, 屏幕 y, 左键按下）；窗口左上角在 (100, 100)，精灵 150x150
+CURSOR_SCRIPT = [
+    (500, 175, 125, False),    # 悬停在头部 -> 约 2 秒后出现蝴蝶
+    (4000, 175, 125, False),
+    (4200, 175, 190, False),   # 移到身体上
+    (4500, 175, 190, True),    # 按下并拖动
+    (7000, 700, 420, True),
+    (7500, 700, 420, False),   # 松开
+    (8000, -500, -500, False),  # 移出窗口
+]
+
+# 缩短各个定时器，让一次运行覆盖钓鱼、休息（瞬移 + 全屏魔法雨）等状态
+CONFIG_OVERRIDES = {
+    "current_x": 100,
+    "current_y": 100,
+    "rest_interval_minutes": 1.5,
+    "rest_duration_seconds": 5,
+    "fishing_cooldown_minutes": 0.5,
+    "upset_interval_minutes": 3,
+    # 不可达的地址：故事请求立即失败，不依赖网络
+    "web_service_url": "http://127.0.0.1:9",
+}
+
+
+def run_child():
+    """在独立进程中驱动 DesktopPet 跑 FRAMES 帧，输出帧日志摘要（JSON）。"""
+    import contextlib
+    import io
+
+    from animation_config import ANIMATION_CONFIG
+    from config_manager import PERSISTENT_CONFIG_KEYS
+    from pet_desktop import DesktopPet
+    from platform_backend import HeadlessBackend, ScriptedCursor
+
+    with open(CONFIG_PATH, encoding="utf-8") as f:
+        config = json.load(f)
+    config.update(CONFIG_OVERRIDES)
+
+    backend = HeadlessBackend(ScriptedCursor(CURSOR_SCRIPT), seed=SEED, record=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        pet = DesktopPet(150, 150, 15, ANIMATION_CONFIG, config, backend=backend)
+        pet.persistent_keys = PERSISTENT_CONFIG_KEYS
+
+    states = []
+    frame_ms = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        while len(states) < FRAMES and pet.running:
+            start = time.perf_counter()
+            pet.run(max_frames=1)
+            frame_ms.append((time.perf_counter() - start) * 1000)
+            states.append(type(pet.state).__name__ if pet.state is not None else "None")
+        pet.cleanup(exit_process=False)
+
+    log = json.dumps(backend.frame_log).encode("utf-8")
+    frame_ms.sort()
+    print(json.dumps({
+        "frames": len(states),
+        "virtual_seconds": backend.clock_ms / 1000,
+        "digest": hashlib.sha256(log).hexdigest(),
+        "state_digest": hashlib.sha256(json.dumps(states).encode("utf-8")).hexdigest(),
+        "states": Counter(states),
+        "frame_ms_p50": frame_ms[len(frame_ms) // 2],
+        "frame_ms_max": frame_ms[-1],
+    }))
+
+
+def spawn():
+    """每次运行使用全新的用户数据目录（帧图集、配置、故事缓存）。"""
+    env = dict(os.environ, APPDATA=tempfile.mkdtemp(), LOCALAPPDATA="")
+    output = subprocess.run([sys.executable, __file__, "--child"], env=env, capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check(label, ok, detail):
+    print(f"{'✅' if ok else '❌'} {label}: {detail}")
+    return ok
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        run_child()
+        sys.exit(0)
+
+    print("-" * 50)
+    print(f"--- DesktopPet.run on the headless backend ({FRAMES} frames, seed {SEED}) ---")
+    print("-" * 50)
+
+    first, second = spawn(), spawn()
+    visited = ", ".join(f"{name} {count}" for name, count in sorted(first["states"].items()))
+    print(f"   {first['frames']} frames = {first['virtual_seconds']:.0f} s virtual time; states: {visited}")
+    print(f"   wall time per frame: p50 {first['frame_ms_p50']:.2f} ms, max {first['frame_ms_max']:.1f} ms")
+
+    results = [
+        check("Runs headless", first["frames"] == FRAMES, f"{first['frames']} frames without a window"),
+        check("Deterministic frames", first["digest"] == second["digest"],
+              f"window content + position per frame identical across runs ({first['digest'][:12]})"),
+        check("Deterministic states", first["state_digest"] == second["state_digest"],
+              "same state sequence in both runs"),
+        check("Scripted input", {"ButterflyState", "DraggingState"} <= set(first["states"]),
+              "hover and drag from the cursor script reached the state machine"),
+    ]
+    print("-" * 50)
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,130 @@
+import json
+import queue
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+sys.path.insert(0, str(APP_DIR))
+
+from io_service import IOService  # noqa: E402
+from message_bus import MessageBus  # noqa: E402
+from story_manager import StoryManager  # noqa: E402
+
+SERVER_DELAY_MS = 200
+WORKERS = 2
+
+
+class MockPet:
+    last_read_index = 0
+
+    def __init__(self):
+        self.bus = MessageBus()
+
+
+class SlowStoryHandler(BaseHTTPRequestHandler):
+    """记录请求次数和同时在处理的请求数。"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    lock = threading.Lock()
+    requests = 0
+    active = 0
+    max_active = 0
+    hang = threading.Event()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        cls = SlowStoryHandler
+        with cls.lock:
+            cls.requests += 1
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+        index = parse_qs(urlparse(self.path).query).get("index", ["0"])[0]
+        if index == "999":
+            cls.hang.wait(10)  # 模拟卡住的请求
+        time.sleep(SERVER_DELAY_MS / 1000)
+        with cls.lock:
+            cls.active -= 1
+        data = json.dumps({"title": f"Story {index}", "author": "Fox", "content": "……"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def drain(pet, count, timeout=5.0):
+    items = []
+    end = time.perf_counter() + timeout
+    while len(items) < count and time.perf_counter() < end:
+        try:
+            items.append(pet.bus.get(timeout=0.05))
+        except queue.Empty:
+            pass
+    return items
+
+
+def check(label, ok, detail):
+    print(f"{'✅' if ok else '❌'} {label}: {detail}")
+    return ok
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowStoryHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    pet = MockPet()
+    io = IOService(max_workers=WORKERS, name="StoryIO")
+    manager = StoryManager(pet, base_url, "/stories", io_service=io)
+    results = []
+
+    print("-" * 50)
+    print(f"--- IOService self-check ({WORKERS} workers, {SERVER_DELAY_MS} ms server) ---")
+    print("-" * 50)
+
+    # 1. 去重 + 并发上限：5 个 ID 各请求 4 次
+    for _ in range(4):
+        for story_id in range(1, 6):
+            manager.fetch_story_async(story_id)
+    items = drain(pet, 20)
+    results.append(check("Deduplication", SlowStoryHandler.requests == 5 and len(items) == 20,
+                         f"20 fetches -> {SlowStoryHandler.requests} requests, {len(items)} results delivered"))
+    results.append(check("Bounded concurrency", SlowStoryHandler.max_active <= WORKERS,
+                         f"at most {SlowStoryHandler.max_active} requests in flight"))
+
+    # 2. 取消：排队中的任务不会发出请求，进行中的任务结果被丢弃
+    SlowStoryHandler.requests = 0
+    tasks = [manager.fetch_story_async(story_id) for story_id in range(10, 16)]
+    for task in tasks:
+        task.cancel()
+    items = drain(pet, 1, timeout=1.0)
+    results.append(check("Cancellation", not items and SlowStoryHandler.requests <= WORKERS,
+                         f"{len(items)} results delivered, {SlowStoryHandler.requests} of 6 requests sent"))
+
+    # 3. 关闭：请求卡住时 shutdown 立即返回，结果不会再送入队列
+    manager.fetch_story_async(999)
+    time.sleep(0.1)
+    start = time.perf_counter()
+    io.shutdown()
+    shutdown_ms = (time.perf_counter() - start) * 1000
+    SlowStoryHandler.hang.set()
+    items = drain(pet, 1, timeout=SERVER_DELAY_MS / 1000 + 0.5)
+    results.append(check("Shutdown", shutdown_ms < 50 and not items,
+                         f"returned in {shutdown_ms:.1f} ms with a hanging request, {len(items)} stale results"))
+    print(f"   {io.summary()}")
+
+    manager.close()
+    server.shutdown()
+    print("-" * 50)
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,160 @@
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：让仓库根目录（tools.upload_stories）可被导入
+# ----------------------------------------------------------------------
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from tools.upload_stories import MockDesktopPet, StoryManager, batch_upload_stories  # noqa: E402
+from state_store import JournaledStateStore  # noqa: E402
+
+STORIES = 250
+WORKERS = 4
+BATCH_SIZE = 20
+SERVER_DELAY_MS = 20
+
+
+class FlakyStoryServer(BaseHTTPRequestHandler):
+    """
+    模拟 main.js 的批量写入，并按 fail_rate 注入故障：
+    503（客户端会重试）、写入一半后返回 500（部分批次已落库）、直接断开连接。
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    store = {}
+    fail_rate = 0.0
+    rng = random.Random(3)
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        cls = FlakyStoryServer
+        items = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with cls.lock:
+            cls.active += 1
+            cls.max_active = max(cls.max_active, cls.active)
+            roll = cls.rng.random()
+            fault = cls.rng.choice(["503", "partial", "drop"]) if roll < cls.fail_rate else None
+        try:
+            time.sleep(SERVER_DELAY_MS / 1000)
+            if fault == "503":
+                self._send(503, "busy")
+                return
+            if fault == "drop":
+                self.close_connection = True
+                return
+            written = items[:len(items) // 2] if fault == "partial" else items
+            with cls.lock:
+                for item in written:
+                    cls.store[item["index"]] = item["data"]
+            if fault == "partial":
+                self._send(500, f"写入失败, 已写入 {len(written)} 条")
+            else:
+                self._send(200, f"写入成功 {len(items)} 条")
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+
+def run_upload(manager, stories, progress_path):
+    """运行一次上传器（输出被收起），返回统计和进度日志中已确认的故事。"""
+    progress = JournaledStateStore(progress_path)
+    progress.load()
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = batch_upload_stories(manager, stories, progress, workers=WORKERS, batch_size=BATCH_SIZE)
+    acknowledged = {key.rsplit("|", 1)[1] for key in progress.state}
+    progress.close()
+    return stats, acknowledged
+
+
+def check(label, ok, detail):
+    print(f"{'✅' if ok else '❌'} {label}: {detail}")
+    return ok
+
+
+if __name__ == "__main__":
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyStoryServer)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    manager = StoryManager(MockDesktopPet(), base_url, "/stories", pool_size=WORKERS, backoff_factor=0.01)
+
+    rng = random.Random(11)
+    stories = {i: {"title": f"Story {i}", "author": "Fox", "content": "狐" * rng.randint(100, 3000)}
+               for i in range(1, STORIES + 1)}
+    progress_path = os.path.join(tempfile.mkdtemp(), "upload_progress.json")
+    results = []
+
+    print("-" * 50)
+    print(f"--- Resumable uploader against a flaky mock server ({STORIES} stories, {WORKERS} workers) ---")
+    print("-" * 50)
+
+    # 1. 大量故障：部分批次失败，但已确认的故事必须真的在服务器上且内容一致
+    FlakyStoryServer.fail_rate = 0.6
+    stats, acknowledged = run_upload(manager, stories, progress_path)
+    consistent = all(FlakyStoryServer.store.get(i) == stories[int(i)] for i in acknowledged)
+    results.append(check("Run with injected failures", consistent and stats["failed"] > 0,
+                         f"{stats['uploaded']} uploaded, {stats['failed']} failed; "
+                         f"all {len(acknowledged)} acknowledged IDs are on the server"))
+    results.append(check("Bounded concurrency", FlakyStoryServer.max_active <= WORKERS,
+                         f"at most {FlakyStoryServer.max_active} requests in flight"))
+
+    # 2. 恢复：只重传未确认的故事
+    FlakyStoryServer.fail_rate = 0.0
+    failed_before = stats["failed"]
+    stats, acknowledged = run_upload(manager, stories, progress_path)
+    complete = all(FlakyStoryServer.store.get(str(i)) == story for i, story in stories.items())
+    results.append(check("Resume", complete and stats["uploaded"] == failed_before,
+                         f"re-sent {stats['uploaded']} of {STORIES} ({stats['skipped']} skipped), server complete"))
+
+    # 3. 全部已确认：不发任何请求
+    stats, _ = run_upload(manager, stories, progress_path)
+    results.append(check("Rerun", stats["requests"] == 0 and stats["skipped"] == STORIES,
+                         f"{stats['requests']} requests, {stats['skipped']} skipped"))
+
+    # 4. 修改 3 个故事：只上传这 3 个
+    for i in (5, 77, 200):
+        stories[i] = dict(stories[i], content=stories[i]["content"] + "（修订）")
+    stats, _ = run_upload(manager, stories, progress_path)
+    updated = all(FlakyStoryServer.store.get(str(i)) == stories[i] for i in (5, 77, 200))
+    results.append(check("Changed stories", stats["uploaded"] == 3 and updated,
+                         f"{stats['uploaded']} uploaded in {stats['requests']} request(s)"))
+
+    # 吞吐对比：1 路（旧的顺序上传）与 WORKERS 路并发
+    for workers in (1, WORKERS):
+        progress = JournaledStateStore(os.path.join(tempfile.mkdtemp(), "p.json"))
+        progress.load()
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = batch_upload_stories(manager, stories, progress, workers=workers, batch_size=BATCH_SIZE)
+        progress.close()
+        print(f"   {workers} worker(s): {STORIES / stats['seconds']:.0f} stories/s "
+              f"({stats['requests']} requests in {stats['seconds']:.2f} s)")
+
+    manager.close()
+    server.shutdown()
+    print("-" * 50)
+    sys.exit(0 if all(results) else 1)
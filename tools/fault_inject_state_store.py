@@ -0,0 +1,201 @@
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+# ----------------------------------------------------------------------
+# 1. 环境准备：让 src/app 的模块可被导入
+# ----------------------------------------------------------------------
+
+APP_DIR = Path(__file__).resolve().parents[1] / "src" / "app"
+sys.path.insert(0, str(APP_DIR))
+
+import state_store  # noqa: E402
+from state_store import JournaledStateStore  # noqa: E402
+
+KEYS = ["current_x", "current_y", "last_read_index", "rest_interval_minutes", "rest_duration_seconds"]
+
+
+class SimulatedCrash(Exception):
+    """进程在写入途中被杀死。"""
+
+
+class CrashingStore(JournaledStateStore):
+    """
+    写入字节数达到 budget 时“崩溃”：只写出前面一部分字节，然后抛出 SimulatedCrash。
+    崩溃后不做任何清理（真实的进程崩溃不会执行回滚）。
+    """
+
+    def __init__(self, path, budget, crash_before_truncate=False):
+        super().__init__(path)
+        self.budget = budget
+        self.crash_before_truncate = crash_before_truncate
+
+    def _write_bytes(self, f, data):
+        if len(data) <= self.budget:
+            f.write(data)
+            self.budget -= len(data)
+            return
+        f.write(data[:self.budget])
+        f.flush()
+        self.budget = 0
+        raise SimulatedCrash()
+
+    def _rollback_append(self):
+        pass
+
+    def _truncate_journal(self):
+        if self.crash_before_truncate:
+            # 快照已替换，但日志尚未清空
+            raise SimulatedCrash()
+        super()._truncate_journal()
+
+
+def random_updates(rng, count):
+    updates = []
+    for _ in range(count):
+        keys = rng.sample(KEYS, rng.randint(1, 3))
+        updates.append({key: rng.randint(0, 3000) for key in keys})
+    return updates
+
+
+def run_until_crash(path, updates, budget, crash_before_truncate=False):
+    """
+    依次写入 updates，直到模拟崩溃。
+
+    Returns:
+        tuple: (已确认的状态, 包含崩溃中那次更新的状态, 是否发生崩溃)
+    """
+    store = CrashingStore(path, budget, crash_before_truncate)
+    store.load()
+    acked = dict(store.state)
+    for values in updates:
+        attempted = dict(acked)
+        attempted.update(values)
+        try:
+            store.update(values)
+        except SimulatedCrash:
+            store._close_journal()
+            # update() 返回前崩溃：这次更新可能尚未确认；若崩溃发生在压缩阶段，记录其实已经落盘
+            return acked, attempted, True
+        acked = attempted
+    store._close_journal()
+    return acked, acked, False
+
+
+def check_recovery(path, acked, attempted, rng):
+    """重新打开存储：恢复的状态必须是一致状态，且恢复后仍能继续正常写入。"""
+    store = JournaledStateStore(path)
+    recovered = store.load()
+    if recovered != acked and recovered != attempted:
+        return f"recovered {recovered}, expected {acked} or {attempted}"
+
+    expected = dict(recovered)
+    for values in random_updates(rng, 5):
+        store.update(values)
+        expected.update(values)
+    store.close()
+
+    reopened = JournaledStateStore(path).load()
+    if reopened != expected:
+        return f"after recovery writes: {reopened}, expected {expected}"
+    return None
+
+
+def fresh_dir():
+    tmp_dir = tempfile.mkdtemp()
+    return tmp_dir, os.path.join(tmp_dir, "user_data.json")
+
+
+def exhaustive_offsets(rng):
+    """把同一组更新在每一个字节偏移处“杀掉”一次。"""
+    updates = random_updates(rng, 12)
+    _, path = fresh_dir()
+    probe = CrashingStore(path, budget=10 ** 9)
+    probe.load()
+    for values in updates:
+        probe.update(values)
+    total = probe.journal_bytes
+    probe._close_journal()
+
+    failures = 0
+    for budget in range(total + 1):
+        _, path = fresh_dir()
+        acked, attempted, _ = run_until_crash(path, updates, budget)
+        error = check_recovery(path, acked, attempted, rng)
+        if error:
+            failures += 1
+            print(f"  offset {budget}: {error}")
+    return total + 1, failures
+
+
+def random_trials(rng, trials):
+    """随机压缩阈值、随机崩溃偏移，覆盖追加、快照写入以及“快照替换后、日志清空前”三种崩溃点。"""
+    failures = 0
+    crashes = {"append/snapshot": 0, "before truncate": 0, "none": 0}
+    default_records = state_store.COMPACT_JOURNAL_RECORDS
+    for _ in range(trials):
+        state_store.COMPACT_JOURNAL_RECORDS = rng.randint(3, 40)
+        updates = random_updates(rng, rng.randint(1, 120))
+        _, path = fresh_dir()
+
+        crash_before_truncate = rng.random() < 0.2
+        budget = rng.randint(0, 60 * len(updates) * 4) if not crash_before_truncate else 10 ** 9
+        acked, attempted, crashed = run_until_crash(path, updates, budget, crash_before_truncate)
+        if not crashed:
+            crashes["none"] += 1
+        elif crash_before_truncate:
+            crashes["before truncate"] += 1
+        else:
+            crashes["append/snapshot"] += 1
+
+        error = check_recovery(path, acked, attempted, rng)
+        if error:
+            failures += 1
+            print(f"  trial: {error}")
+    state_store.COMPACT_JOURNAL_RECORDS = default_records
+    return crashes, failures
+
+
+def record_sizes(rng):
+    """每条日志记录只包含变化的键：与每次重写整个 JSON 文件相比的写入量。"""
+    _, path = fresh_dir()
+    store = JournaledStateStore(path)
+    store.load()
+    state = {key: 0 for key in KEYS}
+    store.update(state)
+    full_json = len(state_store.json.dumps(state, indent=4).encode("utf-8"))
+    before = store.journal_bytes
+    drags = 200
+    for i in range(drags):
+        state["current_x"], state["current_y"] = 100 + i, 200 + i
+        store.update(state)
+    per_record = (store.journal_bytes - before) / drags
+    store.close()
+    return per_record, full_json
+
+
+if __name__ == "__main__":
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 1234
+    trials = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rng = random.Random(seed)
+
+    print("-" * 50)
+    print(f"--- Journaled state store fault injection (seed {seed}) ---")
+    print("-" * 50)
+
+    offsets, exhaustive_failures = exhaustive_offsets(rng)
+    print(f"Exhaustive: killed at {offsets} byte offsets, {exhaustive_failures} inconsistent recoveries")
+
+    crashes, random_failures = random_trials(rng, trials)
+    print(f"Random: {trials} trials {crashes}, {random_failures} inconsistent recoveries")
+
+    per_record, full_json = record_sizes(rng)
+    print(f"Drag update: {per_record:.0f} bytes per journal record vs {full_json} bytes per full JSON rewrite")
+
+    ok = exhaustive_failures == 0 and random_failures == 0
+    print("-" * 50)
+    print("✅ Every crash recovered to a consistent state" if ok else "❌ Inconsistent recovery detected")
+    print("-" * 50)
+    sys.exit(0 if ok else 1)
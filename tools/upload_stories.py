@@ -1,5 +1,9 @@
+import argparse
+import hashlib
 import json
 import sys
+import time
+from concurrent.futures import as_completed
 from pathlib import Path
 from typing import Dict
 
@@ -7,8 +11,19 @@ from typing import Dict
 # 1. 导入实际的 StoryManager 和最小化依赖
 # ----------------------------------------------------------------------
 
+# story_manager 依赖 src/app 下的其他模块（io_service 等），需要把该目录加入导入路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "app"))
+
 # 直接导入实际的 StoryManager 类
-from src.app.story_manager import StoryManager
+from src.app.story_manager import StoryManager, format_index_list
+from io_service import IOService
+from state_store import JournaledStateStore
+
+# 并发上传的批次数（同时在途的 POST 请求）与每批故事数
+UPLOAD_WORKERS = 4
+UPLOAD_BATCH_SIZE = 20
+# 上传进度日志：记录服务器已确认的故事及其内容哈希，重新运行时跳过
+PROGRESS_PATH = Path("temp") / "upload_progress.json"
 
 
 class MockDesktopPet:
@@ -41,36 +56,81 @@ def load_local_stories() -> Dict[int, str]:
         print(f"ERROR: 无法解析或读取 stories.json: {e}")
         sys.exit(1)
 
-def batch_upload_stories(manager: StoryManager, stories: Dict[int, str]):
-    """
-    遍历本地故事字典，并逐个上传到 Web 服务。
-    """
-    total_count = len(stories)
-    success_count = 0
+def story_hash(content) -> str:
+    """故事内容的哈希（键排序后的 JSON），内容不变则哈希不变。"""
+    canonical = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
 
-    print(f"\n--- 开始批量上传 ({total_count} 个故事) ---")
 
-    # 按照 ID 升序上传，确保顺序
-    sorted_story_ids = sorted(stories.keys())
+def progress_key(manager: StoryManager, index) -> str:
+    # 按目标地址区分，换了服务器就会重新上传
+    return f"{manager.full_url}|{index}"
+
 
-    for index in sorted_story_ids:
-        content = stories[index]
+def batch_upload_stories(manager: StoryManager, stories: Dict[int, str], progress: JournaledStateStore = None,
+                         workers: int = UPLOAD_WORKERS, batch_size: int = UPLOAD_BATCH_SIZE) -> Dict:
+    """
+    并发分批上传本地故事（每批一次 POST，最多 workers 个批次同时在途）。
 
-        print(f"\n[{success_count + 1}/{total_count}] 正在上传 ID {index}...")
+    服务器确认一批后，把该批故事的内容哈希写入进度日志 progress；
+    重新运行时，哈希与日志一致的故事（已上传且未修改）直接跳过，中途失败只需重传剩下的部分。
 
-        # 调用 StoryManager 的同步写入方法
-        result = manager.write_data_sync(index, content)
+    Returns:
+        dict: 上传统计（uploaded / skipped / failed / requests / bytes / seconds）。
+    """
+    hashes = {index: story_hash(content) for index, content in stories.items()}
+    acknowledged = progress.state if progress is not None else {}
 
-        # 假设 StoryManager.write_data_sync 的输出中包含 "写入成功" 字符串
+    # 按照 ID 升序上传，确保顺序
+    pending_ids = [index for index in sorted(stories)
+                   if acknowledged.get(progress_key(manager, index)) != hashes[index]]
+    skipped = len(stories) - len(pending_ids)
+    batches = [pending_ids[start:start + batch_size] for start in range(0, len(pending_ids), batch_size)]
+
+    stats = {"uploaded": 0, "skipped": skipped, "failed": 0, "requests": len(batches), "bytes": 0, "seconds": 0.0}
+    print(f"\n--- 开始批量上传 ({len(pending_ids)} 个故事，{len(batches)} 批，{workers} 路并发；"
+          f"跳过未修改的 {skipped} 个) ---")
+    if not batches:
+        return stats
+
+    io = IOService(max_workers=workers, name="Uploader")
+    start_time = time.perf_counter()
+    tasks = {}
+    for batch_no, batch_ids in enumerate(batches):
+        batch = {index: stories[index] for index in batch_ids}
+        stats["bytes"] += sum(len(json.dumps(content, ensure_ascii=False).encode('utf-8'))
+                              for content in batch.values())
+        task = io.submit(("upload", batch_no), manager.write_data_many, batch)
+        tasks[task.future] = batch_ids
+
+    done_count = 0
+    for future in as_completed(tasks):
+        batch_ids = tasks[future]
+        result = future.result() if future.exception() is None else None
+        done_count += len(batch_ids)
+        label = f"[{done_count}/{len(pending_ids)}] ID {format_index_list(batch_ids)}"
+
+        # 批量写入成功时服务端返回 "写入成功 N 条"
         if result and "写入成功" in result:
-            print(f"  ✅ 成功: ID {index} 上传成功。")
-            success_count += 1
+            stats["uploaded"] += len(batch_ids)
+            if progress is not None:
+                # 只在服务器确认之后才记录进度（主线程写入，日志逐条 fsync）
+                progress.update({progress_key(manager, index): hashes[index] for index in batch_ids})
+            print(f"  ✅ {label} 上传成功。")
         else:
-            print(f"  ❌ 失败: ID {index} 上传失败。服务器响应: {result}")
+            stats["failed"] += len(batch_ids)
+            print(f"  ❌ {label} 上传失败。服务器响应: {result}")
 
+    stats["seconds"] = time.perf_counter() - start_time
+    io.shutdown()
+
+    rate = stats["uploaded"] / stats["seconds"] if stats["seconds"] else 0
     print("\n" + "-" * 50)
-    print(f"批量上传完成：成功 {success_count} 个，失败 {total_count - success_count} 个。")
+    print(f"批量上传完成：成功 {stats['uploaded']} 个，失败 {stats['failed']} 个，跳过 {stats['skipped']} 个。")
+    print(f"吞吐：{stats['requests']} 个请求，{stats['seconds']:.2f} s，{rate:.1f} 个故事/s，"
+          f"{stats['bytes'] / 1024 / max(stats['seconds'], 1e-9):.1f} KiB/s")
     print("-" * 50)
+    return stats
 
 
 # ----------------------------------------------------------------------
@@ -84,9 +144,17 @@ if __name__ == "__main__":
     WEB_PATHNAME = "/stories"
     # ---------------------------
 
+    parser = argparse.ArgumentParser(description="Deskfox 故事批量上传器")
+    parser.add_argument("--url", default=WEB_BASE_URL, help="Web 服务地址")
+    parser.add_argument("--workers", type=int, default=UPLOAD_WORKERS, help="同时在途的批次数")
+    parser.add_argument("--batch-size", type=int, default=UPLOAD_BATCH_SIZE, help="每批故事数（服务端上限 100）")
+    parser.add_argument("--progress", default=str(PROGRESS_PATH), help="上传进度日志路径")
+    parser.add_argument("--restart", action="store_true", help="忽略进度日志，全部重新上传")
+    args = parser.parse_args()
+
     print("-" * 50)
     print("--- Deskfox 故事批量上传器 ---")
-    print(f"目标 Web 服务: {WEB_BASE_URL}{WEB_PATHNAME}")
+    print(f"目标 Web 服务: {args.url}{WEB_PATHNAME}")
     print("-" * 50)
 
     # 1. 加载本地故事
@@ -97,13 +165,26 @@ if __name__ == "__main__":
         print("没有故事可供上传。退出。")
         sys.exit(0)
 
-    # 2. 初始化 StoryManager
+    # 2. 初始化 StoryManager 与进度日志
     mock_pet = MockDesktopPet()
     story_manager = StoryManager(
         pet_context=mock_pet,
-        base_url=WEB_BASE_URL,
-        pathname=WEB_PATHNAME
+        base_url=args.url,
+        pathname=WEB_PATHNAME,
+        pool_size=args.workers
     )
+    Path(args.progress).parent.mkdir(parents=True, exist_ok=True)
+    upload_progress = JournaledStateStore(args.progress)
+    if args.restart:
+        for progress_file in (upload_progress.path, upload_progress.journal_path):
+            Path(progress_file).unlink(missing_ok=True)
+    upload_progress.load()
 
     # 3. 执行批量上传
-    batch_upload_stories(story_manager, local_stories)
\ No newline at end of file
+    try:
+        result_stats = batch_upload_stories(story_manager, local_stories, upload_progress,
+                                            workers=args.workers, batch_size=args.batch_size)
+    finally:
+        upload_progress.close()
+        story_manager.close()
+    sys.exit(1 if result_stats["failed"] else 0)